@@ -2,16 +2,59 @@
 
 __version__ = "3.1.0"
 
+from .acknowledger import Acknowledger
 from .aws_sqs_batchlib import (
+    MAX_BATCH_ENTRIES,
+    MAX_PAYLOAD_SIZE,
+    change_message_visibility_batch,
+    clear_client_cache,
     create_sqs_client,
     delete_message_batch,
+    iter_change_message_visibility_batch,
+    iter_delete_message_batch,
+    iter_messages,
+    iter_send_message_batch,
     receive_message,
     send_message_batch,
 )
+from .batcher import BatchEntryError
+from .codec import Codec, CompressionCodec
+from .consumer import Consumer
+from .dedup import DuplicateFilter
+from .heartbeat import VisibilityHeartbeat
+from .instrumentation import Instrumentation, set_instrumentation
+from .limiter import AdaptiveLimiter
+from .multiqueue import delete_received_messages, receive_message_from_queues
+from .offload import S3OffloadCodec
+from .producer import Producer
+from .retry import RetryPolicy
 
 __all__ = [
+    "Acknowledger",
+    "AdaptiveLimiter",
+    "BatchEntryError",
+    "Codec",
+    "CompressionCodec",
+    "Consumer",
+    "DuplicateFilter",
+    "Instrumentation",
+    "MAX_BATCH_ENTRIES",
+    "MAX_PAYLOAD_SIZE",
+    "Producer",
+    "RetryPolicy",
+    "S3OffloadCodec",
+    "VisibilityHeartbeat",
+    "change_message_visibility_batch",
+    "clear_client_cache",
     "create_sqs_client",
     "delete_message_batch",
+    "delete_received_messages",
+    "iter_change_message_visibility_batch",
+    "iter_delete_message_batch",
+    "iter_messages",
+    "iter_send_message_batch",
     "receive_message",
+    "receive_message_from_queues",
     "send_message_batch",
+    "set_instrumentation",
 ]
@@ -0,0 +1,96 @@
+"""Write-behind deletes of individual Amazon SQS messages"""
+
+import concurrent.futures
+import functools
+from typing import TYPE_CHECKING, Optional
+
+import boto3.session
+
+from .aws_sqs_batchlib import (
+    DEFAULT_MAX_POOL_CONNECTIONS,
+    create_sqs_client,
+    delete_message_batch,
+)
+from .batcher import _Batcher
+from .codec import Codec
+from .retry import RetryPolicy
+
+if TYPE_CHECKING:  # pragma: no cover
+    from mypy_boto3_sqs import SQSClient
+
+
+class Acknowledger(_Batcher):
+    """Delete individual messages from an Amazon SQS queue in batches.
+
+    Acknowledger accepts receipt handles one at a time and deletes them with
+    delete_message_batch() in the background. Full batches of 10 messages are
+    deleted right away. Partial batches are deleted once the oldest message
+    has waited for `linger` seconds, or when flush() or close() is called.
+
+    ack() returns a Future that resolves to the Successful result entry of the
+    message, or fails with BatchEntryError if the message could not be
+    deleted.
+
+    Example:
+        >>> with Acknowledger(queue_url) as acknowledger:
+        ...     for message in messages:
+        ...         process(message)
+        ...         acknowledger.ack(message["ReceiptHandle"])
+    """
+
+    def __init__(
+        self,
+        queue_url: str,
+        sqs_client: Optional["SQSClient"] = None,
+        session: Optional[boto3.session.Session] = None,
+        linger: float = 0.1,
+        max_workers: int = 1,
+        retry_policy: Optional[RetryPolicy] = None,
+        codec: Optional[Codec] = None,
+    ):
+        """Create an Acknowledger.
+
+        Args:
+            queue_url: URL of the queue to delete messages from.
+            sqs_client: boto3 SQS client to use. Optional. Default: client
+                        created with default session and configuration.
+            session: boto3 Session to use for creating SQS client if
+                     sqs_client is not provided. Optional. Default: boto3
+                     default session.
+            linger: Maximum time (in seconds) to wait for a batch to fill up
+                    before deleting a partial batch. Optional. Default: 0.1.
+            max_workers: Maximum number of delete_message_batch() requests to
+                         have in flight concurrently. Optional. Default: 1.
+            retry_policy: Retry policy for messages that fail with a retryable
+                          error. Optional. Default: RetryPolicy().
+            codec: Codec the messages were decoded with, e.g. for cleaning up
+                   S3 objects of offloaded messages. Optional.
+        """
+        self.queue_url = queue_url
+        self.sqs_client = sqs_client or create_sqs_client(
+            session, max(max_workers, DEFAULT_MAX_POOL_CONNECTIONS)
+        )
+        super().__init__(
+            functools.partial(
+                delete_message_batch,
+                QueueUrl=queue_url,
+                sqs_client=self.sqs_client,
+                max_workers=max_workers,
+                retry_policy=retry_policy,
+                codec=codec,
+            ),
+            linger,
+        )
+
+    def __enter__(self) -> "Acknowledger":
+        return self
+
+    def ack(self, receipt_handle: str) -> concurrent.futures.Future:
+        """Delete a message from the queue.
+
+        Args:
+            receipt_handle: Receipt handle of the message to delete.
+
+        Returns: Future for the result of the delete.
+        """
+        return self._submit({"ReceiptHandle": receipt_handle})
@@ -0,0 +1,447 @@
+"""Amazon SQS Batchlib for asyncio"""
+
+import asyncio
+import collections
+import contextlib
+import inspect
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+import boto3.session
+import botocore.exceptions
+
+from .aws_sqs_batchlib import (
+    DEFAULT_MAX_POOL_CONNECTIONS,
+    _BatchReceiver,
+    _collect_response,
+    _EntryQueue,
+    _message_size,
+    _operation_name,
+    _rejected_failure,
+    _throttled_response,
+    create_sqs_client,
+)
+from .codec import Codec, _map_receipt_handles, _request_attributes
+from .dedup import DuplicateFilter
+from .instrumentation import get_instrumentation
+from .limiter import _is_throttling_error
+from .retry import DEFAULT_RETRY_POLICY, RetryPolicy, _RetryState
+
+if TYPE_CHECKING:  # pragma: no cover
+    from mypy_boto3_sqs.type_defs import (
+        ChangeMessageVisibilityBatchRequestEntryTypeDef,
+        DeleteMessageBatchRequestEntryTypeDef,
+        MessageTypeDef,
+        SendMessageBatchRequestEntryTypeDef,
+    )
+
+    from .aws_sqs_batchlib import (
+        ChangeMessageVisibilityBatchResultTypeDef,
+        DeleteMessageBatchResultTypeDef,
+        ReceiveMessageResultTypeDef,
+        SendMessageBatchResultTypeDef,
+    )
+
+DEFAULT_MAX_WORKERS = 10
+"""Default number of concurrent requests per call."""
+
+
+async def receive_message(
+    sqs_client: Optional[Any] = None,
+    session: Optional[boto3.session.Session] = None,
+    pollers: int = 1,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    codec: Optional[Codec] = None,
+    dedup: Optional[DuplicateFilter] = None,
+    **kwargs,
+) -> "ReceiveMessageResultTypeDef":
+    """Receive an arbitrary number of messages from an Amazon SQS queue.
+
+    Asynchronous version of aws_sqs_batchlib.receive_message(). Accepts the
+    same arguments and has the same response structure.
+
+    Args:
+        sqs_client: SQS client to use. Either an asynchronous client (e.g.
+                    aiobotocore) or a boto3 SQS client whose requests are run
+                    in a thread. Optional. Default: boto3 client created with
+                    default session and configuration.
+        session: boto3 Session to use for creating SQS client if sqs_client is
+                 not provided. Optional. Default: boto3 default session.
+        pollers: Number of concurrent pollers to use for filling the batch.
+                 Optional. Default: 1.
+        semaphore: Semaphore for limiting the number of in-flight requests,
+                   e.g. across multiple concurrent calls. Optional.
+        codec: Codec for decoding received messages. Optional. Default:
+               messages are returned as they are.
+        dedup: Duplicate filter for removing duplicate deliveries from the
+               received messages. Optional. Default: duplicates are returned.
+        **kwargs: keyword arguments to pass to SQS receive_message() method
+
+    Returns:
+        SQS messages similar to boto3 SQS receive_message() method.
+    """
+    if pollers < 1:
+        raise ValueError(f"pollers must be 1 or greater (got {pollers})")
+
+    sqs_client = sqs_client or create_sqs_client(
+        session, max(pollers, DEFAULT_MAX_POOL_CONNECTIONS)
+    )
+
+    if codec is not None:
+        kwargs = _request_attributes(codec.attribute_names, kwargs)
+    if dedup is not None:
+        kwargs = _request_attributes(dedup.attribute_names, kwargs)
+
+    batch_size = kwargs.get("MaxNumberOfMessages", 1)
+    batching_window = kwargs.get("WaitTimeSeconds", 1)
+
+    receiver = _BatchReceiver(sqs_client, kwargs, batch_size, batching_window)
+    cond = asyncio.Condition()
+    await asyncio.gather(*(_poll(receiver, cond, semaphore) for _ in range(pollers)))
+
+    messages = receiver.batch
+    if codec is not None:
+        messages = await asyncio.to_thread(codec.decode_all, messages)
+    if dedup is not None:
+        messages, duplicates = dedup.filter(messages, kwargs.get("VisibilityTimeout"))
+        if duplicates:
+            await delete_message_batch(
+                QueueUrl=kwargs["QueueUrl"],
+                Entries=[
+                    {"Id": str(i), "ReceiptHandle": msg["ReceiptHandle"]}
+                    for i, msg in enumerate(duplicates)
+                ],
+                sqs_client=sqs_client,
+                semaphore=semaphore,
+                codec=codec,
+            )
+    return {"Messages": messages}
+
+
+async def _poll(
+    receiver: _BatchReceiver,
+    cond: asyncio.Condition,
+    semaphore: Optional[asyncio.Semaphore],
+) -> None:
+    """Poll the queue for messages until the batch is full or the batching
+    window has elapsed."""
+    while True:
+        async with cond:
+            while (count := _try_reserve(receiver)) is None:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(
+                        cond.wait(), timeout=receiver.deadline - time.time()
+                    )
+
+        if not count:
+            return
+
+        messages: List["MessageTypeDef"] = []
+        try:
+            res = await _call(
+                receiver.sqs_client.receive_message,
+                semaphore,
+                **receiver.build_request(count),
+            )
+            messages = res.get("Messages", [])
+            get_instrumentation().received(count, len(messages))
+        finally:
+            async with cond:
+                with receiver.cond:
+                    receiver.complete(count, messages)
+                cond.notify_all()
+
+
+def _try_reserve(receiver: _BatchReceiver) -> Optional[int]:
+    """Helper to reserve messages from the batch of a receiver."""
+    with receiver.cond:
+        return receiver.try_reserve()
+
+
+async def change_message_visibility_batch(
+    QueueUrl: str,  # pylint: disable=invalid-name
+    Entries: Iterable[  # pylint: disable=invalid-name
+        "ChangeMessageVisibilityBatchRequestEntryTypeDef"
+    ],
+    sqs_client: Optional[Any] = None,
+    session: Optional[boto3.session.Session] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    codec: Optional[Codec] = None,
+) -> "ChangeMessageVisibilityBatchResultTypeDef":
+    """Change the visibility timeout of an arbitrary number of messages.
+
+    Asynchronous version of aws_sqs_batchlib.change_message_visibility_batch().
+    Accepts the same arguments and has the same response structure.
+
+    Args:
+        QueueUrl: The URL of the Amazon SQS queue whose messages' visibility
+                  is changed.
+        Entries: A list or other iterable of receipt handles and visibility
+                 timeouts for the messages whose visibility timeout is
+                 changed.
+        sqs_client: SQS client to use. Either an asynchronous client (e.g.
+                    aiobotocore) or a boto3 SQS client whose requests are run
+                    in a thread. Optional. Default: boto3 client created with
+                    default session and configuration.
+        session: boto3 Session to use for creating SQS client if sqs_client is
+                 not provided. Optional. Default: boto3 default session.
+        max_workers: Maximum number of change_message_visibility_batch()
+                     requests to have in flight concurrently. Optional.
+                     Default: 10.
+        semaphore: Semaphore for limiting the number of in-flight requests,
+                   e.g. across multiple concurrent calls. Optional.
+        retry_policy: Retry policy for entries that fail with a retryable
+                      error. Optional. Default: RetryPolicy().
+        codec: Codec that decoded the messages, for mapping their receipt
+               handles back to SQS receipt handles. Optional.
+    Returns:
+        Results similar to boto3 SQS change_message_visibility_batch() method.
+    """
+    sqs_client = sqs_client or create_sqs_client(
+        session, max(max_workers, DEFAULT_MAX_POOL_CONNECTIONS)
+    )
+    if codec is not None:
+        Entries = _map_receipt_handles(codec, Entries)
+
+    result: "ChangeMessageVisibilityBatchResultTypeDef" = {
+        "Successful": [],
+        "Failed": [],
+    }
+    await _batch_request(
+        sqs_client.change_message_visibility_batch,
+        QueueUrl,
+        Entries,
+        result,
+        max_workers,
+        semaphore,
+        retry_policy,
+    )
+    return result
+
+
+async def delete_message_batch(
+    QueueUrl: str,  # pylint: disable=invalid-name
+    Entries: Iterable[  # pylint: disable=invalid-name
+        "DeleteMessageBatchRequestEntryTypeDef"
+    ],
+    sqs_client: Optional[Any] = None,
+    session: Optional[boto3.session.Session] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    codec: Optional[Codec] = None,
+) -> "DeleteMessageBatchResultTypeDef":
+    """Delete an arbitrary number of messages from an Amazon SQS queue.
+
+    Asynchronous version of aws_sqs_batchlib.delete_message_batch(). Accepts
+    the same arguments and has the same response structure.
+
+    Args:
+        QueueUrl: The URL of the Amazon SQS queue from which messages are deleted.
+        Entries: A list or other iterable of receipt handles for the messages
+                 to be deleted.
+        sqs_client: SQS client to use. Either an asynchronous client (e.g.
+                    aiobotocore) or a boto3 SQS client whose requests are run
+                    in a thread. Optional. Default: boto3 client created with
+                    default session and configuration.
+        session: boto3 Session to use for creating SQS client if sqs_client is
+                 not provided. Optional. Default: boto3 default session.
+        max_workers: Maximum number of delete_message_batch() requests to have
+                     in flight concurrently. Optional. Default: 10.
+        semaphore: Semaphore for limiting the number of in-flight requests,
+                   e.g. across multiple concurrent calls. Optional.
+        retry_policy: Retry policy for entries that fail with a retryable
+                      error. Optional. Default: RetryPolicy().
+        codec: Codec that decoded the messages, for mapping their receipt
+               handles back to SQS receipt handles and cleaning up after
+               deleted messages. Optional.
+    Returns:
+        Results similar to boto3 SQS delete_message_batch() method.
+    """
+    sqs_client = sqs_client or create_sqs_client(
+        session, max(max_workers, DEFAULT_MAX_POOL_CONNECTIONS)
+    )
+    receipt_handles: Dict[str, str] = {}
+    if codec is not None:
+        Entries = _map_receipt_handles(codec, Entries, receipt_handles)
+
+    result: "DeleteMessageBatchResultTypeDef" = {"Successful": [], "Failed": []}
+    await _batch_request(
+        sqs_client.delete_message_batch,
+        QueueUrl,
+        Entries,
+        result,
+        max_workers,
+        semaphore,
+        retry_policy,
+    )
+
+    if codec is not None:
+        await asyncio.to_thread(
+            codec.deleted,
+            [receipt_handles[res["Id"]] for res in result["Successful"]],
+        )
+    return result
+
+
+async def send_message_batch(
+    QueueUrl: str,  # pylint: disable=invalid-name
+    Entries: Iterable[  # pylint: disable=invalid-name
+        "SendMessageBatchRequestEntryTypeDef"
+    ],
+    sqs_client: Optional[Any] = None,
+    session: Optional[boto3.session.Session] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    codec: Optional[Codec] = None,
+) -> "SendMessageBatchResultTypeDef":
+    """Send an arbitrary number of messages to an Amazon SQS queue.
+
+    Asynchronous version of aws_sqs_batchlib.send_message_batch(). Accepts
+    the same arguments and has the same response structure.
+
+    Args:
+        QueueUrl: The URL of the Amazon SQS queue to which batched messages
+                  are sent.
+        Entries: A list or other iterable of send message entries for the
+                 messages to send to SQS.
+        sqs_client: SQS client to use. Either an asynchronous client (e.g.
+                    aiobotocore) or a boto3 SQS client whose requests are run
+                    in a thread. Optional. Default: boto3 client created with
+                    default session and configuration.
+        session: boto3 Session to use for creating SQS client if sqs_client is
+                 not provided. Optional. Default: boto3 default session.
+        max_workers: Maximum number of send_message_batch() requests to have
+                     in flight concurrently. Optional. Default: 10. Use 1 with
+                     FIFO queues as concurrent requests do not retain message
+                     order.
+        semaphore: Semaphore for limiting the number of in-flight requests,
+                   e.g. across multiple concurrent calls. Optional.
+        codec: Codec for encoding the messages before they are sent. Entries
+               are encoded in a thread before the requests are made.
+               Optional. Default: messages are sent as they are.
+
+    Returns:
+        Results similar to boto3 SQS send_message_batch() method.
+    """
+    sqs_client = sqs_client or create_sqs_client(
+        session, max(max_workers, DEFAULT_MAX_POOL_CONNECTIONS)
+    )
+    if codec is not None:
+        # Encode in a thread as codecs may block (e.g. uploads to S3)
+        Entries = await asyncio.to_thread(list, codec.encode_all(Entries))
+
+    result: "SendMessageBatchResultTypeDef" = {"Successful": [], "Failed": []}
+    await _batch_request(
+        sqs_client.send_message_batch,
+        QueueUrl,
+        Entries,
+        result,
+        max_workers,
+        semaphore,
+        retry_policy,
+        entry_size=_message_size,
+    )
+    return result
+
+
+async def _batch_request(
+    operation: Callable[..., Any],
+    queue_url: str,
+    entries: Iterable[Any],
+    result: Any,
+    max_workers: int,
+    semaphore: Optional[asyncio.Semaphore],
+    retry_policy: Optional[RetryPolicy] = None,
+    entry_size: Optional[Callable[[Any], int]] = None,
+) -> None:
+    """Helper to perform a batch operation on an arbitrary number of entries.
+
+    Asynchronous version of aws_sqs_batchlib._iter_batch_request() that
+    collects the results into the given result. Requests are run as tasks,
+    keeping up to max_workers requests in flight.
+    """
+    if max_workers < 1:
+        raise ValueError(f"max_workers must be 1 or greater (got {max_workers})")
+
+    queue = _EntryQueue(entries, ordered=max_workers == 1)
+    retry = _RetryState(retry_policy or DEFAULT_RETRY_POLICY)
+    inflight: Deque[Tuple[list, "asyncio.Task[Any]"]] = collections.deque()
+    try:
+        while queue or inflight:
+            while len(inflight) < max_workers and queue.ready():
+                chunk, rejected = queue.next_chunk(entry_size)
+                result["Failed"].extend(map(_rejected_failure, rejected))
+                if chunk:
+                    task = asyncio.create_task(
+                        _call(operation, semaphore, QueueUrl=queue_url, Entries=chunk)
+                    )
+                    inflight.append((chunk, task))
+
+            if not inflight:
+                await asyncio.sleep(queue.ready_in())
+                continue
+
+            chunk, task = inflight[0]
+            if len(inflight) < max_workers and queue.delayed:
+                # Wake up to send retried entries once their delay elapses
+                await asyncio.wait([task], timeout=queue.ready_in())
+                if not task.done():
+                    continue
+
+            inflight.popleft()
+            try:
+                res = await task
+            except botocore.exceptions.ClientError as exc:
+                if not _is_throttling_error(exc):
+                    raise
+                res = _throttled_response(chunk, exc)
+
+            _collect_response(
+                _operation_name(operation), res, chunk, result, queue, retry
+            )
+    finally:
+        for _, task in inflight:
+            task.cancel()
+
+
+async def _call(
+    method: Callable[..., Any], semaphore: Optional[asyncio.Semaphore], **kwargs
+) -> Any:
+    """Helper to call a method of an asynchronous or a synchronous SQS client.
+
+    Methods of synchronous clients are run in a thread to avoid blocking the
+    event loop. Requests are reported to the installed instrumentation.
+    """
+    async with semaphore or contextlib.nullcontext():
+        started = time.monotonic()
+        error: Optional[Exception] = None
+        try:
+            if inspect.iscoroutinefunction(method):
+                return await method(**kwargs)
+            return await asyncio.to_thread(method, **kwargs)
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            size = (
+                len(kwargs["Entries"])
+                if "Entries" in kwargs
+                else kwargs.get("MaxNumberOfMessages", 1)
+            )
+            get_instrumentation().request(
+                _operation_name(method), time.monotonic() - started, size, error
+            )
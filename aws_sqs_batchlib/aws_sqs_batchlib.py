@@ -1,16 +1,82 @@
 """Amazon SQS Batchlib"""
 
+import collections
+import concurrent.futures
+import functools
+import heapq
+import itertools
+import os
+import threading
 import time
 import uuid
-from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple, overload
+from queue import SimpleQueue
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Counter,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    overload,
+)
 
 import boto3
 import boto3.session
+import botocore.config
+import botocore.exceptions
+
+from .codec import Codec, _FailedEntry, _map_receipt_handles, _request_attributes
+from .dedup import DuplicateFilter
+from .instrumentation import get_instrumentation
+from .limiter import AdaptiveLimiter, _is_throttling_error
+from .retry import DEFAULT_RETRY_POLICY, RetryPolicy, _RetryState
+
+MAX_BATCH_ENTRIES = 10
+"""Maximum number of entries in a single SQS batch request."""
+
+MAX_PAYLOAD_SIZE = 1024 * 1024
+"""Maximum size of a message and a batch of messages in bytes."""
+
+CLIENT_CACHE_SIZE = 16
+"""Maximum number of SQS clients to cache in create_sqs_client()."""
+
+DEFAULT_MAX_POOL_CONNECTIONS = 10
+"""Default size of the connection pool of SQS clients."""
+
+_SESSION_ENVIRONMENT = (
+    "AWS_REGION",
+    "AWS_DEFAULT_REGION",
+    "AWS_PROFILE",
+    "AWS_DEFAULT_PROFILE",
+    "AWS_ACCESS_KEY_ID",
+    "AWS_SECRET_ACCESS_KEY",
+    "AWS_SESSION_TOKEN",
+    "AWS_CONFIG_FILE",
+    "AWS_SHARED_CREDENTIALS_FILE",
+)
+"""Environment variables that configure the default session."""
+
+MAX_WAIT_TIME_SECONDS = 20
+"""Maximum long poll duration of a single SQS receive_message() request."""
+
+OUT_OF_ORDER = "OutOfOrder"
+"""Error code of FIFO entries that failed with a retryable error after later
+messages of their message group were sent, i.e. that cannot be retried
+without breaking the order of the message group."""
 
 if TYPE_CHECKING:  # pragma: no cover
     from mypy_boto3_sqs import SQSClient
     from mypy_boto3_sqs.type_defs import (
         BatchResultErrorEntryTypeDef,
+        ChangeMessageVisibilityBatchRequestEntryTypeDef,
+        ChangeMessageVisibilityBatchResultEntryTypeDef,
         DeleteMessageBatchRequestEntryTypeDef,
         DeleteMessageBatchResultEntryTypeDef,
         MessageTypeDef,
@@ -24,6 +90,14 @@ if TYPE_CHECKING:  # pragma: no cover
         {"Messages": List["MessageTypeDef"]},
     )
 
+    ChangeMessageVisibilityBatchResultTypeDef = TypedDict(
+        "ChangeMessageVisibilityBatchResultTypeDef",
+        {
+            "Successful": List["ChangeMessageVisibilityBatchResultEntryTypeDef"],
+            "Failed": List["BatchResultErrorEntryTypeDef"],
+        },
+    )
+
     DeleteMessageBatchResultTypeDef = TypedDict(
         "DeleteMessageBatchResultTypeDef",
         {
@@ -41,21 +115,71 @@ if TYPE_CHECKING:  # pragma: no cover
     )
 
 
-def create_sqs_client(session: Optional[boto3.session.Session] = None) -> "SQSClient":
+def create_sqs_client(
+    session: Optional[boto3.session.Session] = None,
+    max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS,
+) -> "SQSClient":
     """Create default SQS client.
 
+    Clients are cached per session, region and configuration. Up-to
+    CLIENT_CACHE_SIZE most recently used clients are kept in the cache so that
+    repeated calls reuse existing clients and their warm connections. Clients
+    use TCP keep-alive for their connections.
+
+    Cached clients keep the credentials they were created with. Clients of
+    the default session are cached per AWS_PROFILE and credential
+    environment variables, but credentials that change otherwise (e.g. in the
+    shared credentials file) are not picked up until clear_client_cache() is
+    called.
+
     Args:
         session: boto3 Session to use for creating SQS client. Optional.
                  Default: boto3 default session.
+        max_pool_connections: Maximum number of connections the client keeps
+                 in its connection pool. Optional. Default: 10.
+    """
+    environment: Tuple[Optional[str], ...] = ()
+    if session is None:
+        environment = tuple(os.environ.get(name) for name in _SESSION_ENVIRONMENT)
+    return _create_cached_sqs_client(session, environment, max_pool_connections)
+
+
+def clear_client_cache() -> None:
+    """Clear the cache of clients created by create_sqs_client(). Clients
+    created after this use the current credentials and configuration."""
+    _create_cached_sqs_client.cache_clear()
+
+
+@functools.lru_cache(maxsize=CLIENT_CACHE_SIZE)
+def _create_cached_sqs_client(
+    session: Optional[boto3.session.Session],
+    environment: Tuple[Optional[str], ...],  # pylint: disable=unused-argument
+    max_pool_connections: int,
+) -> "SQSClient":
+    """Helper to create SQS clients for create_sqs_client().
+
+    Environment is part of the cache key only. It is used to create new
+    clients for the default session if the region, profile or credentials
+    configured in the environment change.
     """
     session = session or boto3.session.Session()
-    region = session.region_name
-    return boto3.client("sqs", endpoint_url=f"https://sqs.{region}.amazonaws.com")
+    config = botocore.config.Config(
+        max_pool_connections=max_pool_connections, tcp_keepalive=True
+    )
+    return session.client(
+        "sqs",
+        endpoint_url=f"https://sqs.{session.region_name}.amazonaws.com",
+        config=config,
+    )
 
 
 def receive_message(
     sqs_client: Optional["SQSClient"] = None,
     session: Optional[boto3.session.Session] = None,
+    pollers: int = 1,
+    limiter: Optional[AdaptiveLimiter] = None,
+    codec: Optional[Codec] = None,
+    dedup: Optional[DuplicateFilter] = None,
     **kwargs,
 ) -> "ReceiveMessageResultTypeDef":
     """Receive an arbitrary number of messages from an Amazon SQS queue.
@@ -73,41 +197,449 @@ def receive_message(
     provide a ReceiveRequestAttemptId, receive_message() sends each SQS
     request without ReceiveRequestAttemptId argument.
 
+    Use the pollers argument to make multiple receive_message() calls
+    concurrently. Pollers share the batching window and the batch size, i.e.
+    receive_message() still returns after `WaitTimeSeconds` and never returns
+    more than `MaxNumberOfMessages` messages.
+
+    Use iter_messages() to process messages as soon as they are received
+    instead of waiting for the whole batch.
+
     Args:
         sqs_client: boto3 SQS client to use. Optional. Default: client created
                     with default session and configuration.
         session: boto3 Session to use for creating SQS client if sqs_client is
                  not provided. Optional. Default: boto3 default session.
+        pollers: Number of concurrent pollers to use for filling the batch.
+                 Optional. Default: 1.
+        limiter: Adaptive limiter for the number of concurrent requests. The
+                 number of concurrent requests is bounded by both pollers and
+                 the limit of the limiter. Throttled requests are counted as
+                 empty receives. Optional. Default: no limiter.
+        codec: Codec for decoding received messages, e.g. CompressionCodec.
+               The message attributes the codec needs are requested in
+               addition to MessageAttributeNames. Optional. Default: messages
+               are returned as they are.
+        dedup: Duplicate filter for removing duplicate deliveries from the
+               received messages. Duplicates of messages the filter has seen
+               processed are deleted from the queue. Optional. Default:
+               duplicates are returned.
         **kwargs: keyword arguments to pass to boto3 SQS receive_message()
                   method
 
     Returns:
         SQS messages similar to boto3 SQS receive_message() method.
     """
-    sqs_client = sqs_client or create_sqs_client(session)
+    return {
+        "Messages": [
+            message
+            for messages in iter_messages(
+                sqs_client=sqs_client,
+                session=session,
+                pollers=pollers,
+                limiter=limiter,
+                codec=codec,
+                dedup=dedup,
+                **kwargs,
+            )
+            for message in messages
+        ]
+    }
+
+
+def iter_messages(
+    sqs_client: Optional["SQSClient"] = None,
+    session: Optional[boto3.session.Session] = None,
+    pollers: int = 1,
+    limiter: Optional[AdaptiveLimiter] = None,
+    codec: Optional[Codec] = None,
+    dedup: Optional[DuplicateFilter] = None,
+    **kwargs,
+) -> Iterator[List["MessageTypeDef"]]:
+    """Receive an arbitrary number of messages from an Amazon SQS queue and
+    yield the messages of each SQS request as it returns.
+
+    Generator version of receive_message(). Accepts the same arguments and
+    has the same limits: yields at most `MaxNumberOfMessages` messages in
+    total and stops after `WaitTimeSeconds` has elapsed. Instead of waiting
+    for the whole batch, yields the messages of each boto3 SQS
+    receive_message() call as soon as the call returns so that the caller can
+    start processing them while the queue is polled for more.
+
+    Each yielded list holds up-to 10 messages. Calls that return no messages
+    yield nothing. Closing the generator stops polling. Messages received by
+    requests still in flight at that point are not yielded; they become
+    visible again once their visibility timeout expires.
+
+    Yields:
+        Lists of SQS messages similar to the Messages of boto3 SQS
+        receive_message() method.
+    """
+    if pollers < 1:
+        raise ValueError(f"pollers must be 1 or greater (got {pollers})")
+
+    sqs_client = sqs_client or create_sqs_client(
+        session, max(pollers, DEFAULT_MAX_POOL_CONNECTIONS)
+    )
+
+    if codec is not None:
+        kwargs = _request_attributes(codec.attribute_names, kwargs)
+    if dedup is not None:
+        kwargs = _request_attributes(dedup.attribute_names, kwargs)
 
     batch_size = kwargs.get("MaxNumberOfMessages", 1)
     batching_window = kwargs.get("WaitTimeSeconds", 1)
 
-    batch: List["MessageTypeDef"] = []
-    start = time.time()
-    while time.time() - start < batching_window and len(batch) < batch_size:
-        kwargs["WaitTimeSeconds"] = 1
-        kwargs["MaxNumberOfMessages"] = min(batch_size - len(batch), 10)
-        if "ReceiveRequestAttemptId" in kwargs:
-            kwargs["ReceiveRequestAttemptId"] = str(uuid.uuid4())
-        batch.extend(sqs_client.receive_message(**kwargs).get("Messages", []))
+    receiver = _BatchReceiver(sqs_client, kwargs, batch_size, batching_window, limiter)
+    if pollers == 1:
+        received: Iterable[List["MessageTypeDef"]] = receiver.iter_poll()
+    else:
+        received = (messages for _, messages in _iter_pollers([receiver] * pollers))
+
+    for messages in received:
+        messages = _process_received(messages, kwargs, sqs_client, codec, dedup)
+        if messages:
+            yield messages
+
+
+def _process_received(
+    messages: List["MessageTypeDef"],
+    request: dict,
+    sqs_client: "SQSClient",
+    codec: Optional[Codec],
+    dedup: Optional[DuplicateFilter],
+) -> List["MessageTypeDef"]:
+    """Helper to decode messages received with the given receive_message()
+    request and filter out duplicates. Duplicates of processed messages are
+    deleted from the queue."""
+    if codec is not None:
+        messages = codec.decode_all(messages)
+    if dedup is not None:
+        messages, duplicates = dedup.filter(messages, request.get("VisibilityTimeout"))
+        if duplicates:
+            delete_message_batch(
+                QueueUrl=request["QueueUrl"],
+                Entries=[
+                    {"Id": str(i), "ReceiptHandle": msg["ReceiptHandle"]}
+                    for i, msg in enumerate(duplicates)
+                ],
+                sqs_client=sqs_client,
+                codec=codec,
+            )
+    return messages
+
+
+def _iter_pollers(
+    receivers: Sequence["_BatchReceiver"],
+) -> Iterator[Tuple["_BatchReceiver", List["MessageTypeDef"]]]:
+    """Helper to poll with multiple concurrent pollers, one per given
+    receiver, yielding the messages of each response with the receiver that
+    received them in the order they are received."""
+    results: "SimpleQueue[Optional[Tuple[_BatchReceiver, List[MessageTypeDef]]]]" = (
+        SimpleQueue()
+    )
+
+    def poll(receiver: _BatchReceiver) -> None:
+        try:
+            for messages in receiver.iter_poll():
+                results.put((receiver, messages))
+        finally:
+            results.put(None)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(receivers)) as executor:
+        futures = [executor.submit(poll, receiver) for receiver in receivers]
+        try:
+            running = len(receivers)
+            while running:
+                result = results.get()
+                if result is None:
+                    running -= 1
+                else:
+                    yield result
+        finally:
+            for receiver in set(receivers):
+                receiver.stop()
+
+    for future in futures:
+        future.result()
+
+
+class _BatchReceiver:
+    """Helper for filling a batch of messages with one or more pollers.
+
+    Pollers share the batching window and the number of messages left to
+    receive. Each poller reserves the number of messages it requests before
+    making a request so that the batch never grows over the batch size.
+
+    The long poll duration of each request adapts to the queue. Requests
+    start with 1 second long polls. Consecutive empty responses double the
+    duration (up-to 20 seconds) so that a quiet queue is polled with few
+    requests. A response with messages resets the duration back to 1 second.
+    Requests never wait past the end of the batching window (rounded to whole
+    seconds): the last requests of the window are short polls, which are only
+    made while the queue keeps returning messages.
+    """
+
+    def __init__(
+        self,
+        sqs_client: "SQSClient",
+        request: dict,
+        batch_size: int,
+        batching_window: float,
+        limiter: Optional[AdaptiveLimiter] = None,
+    ):
+        self.sqs_client = sqs_client
+        self.limiter = limiter
+        self.request = request
+        self.batch_size = batch_size
+        self.deadline = time.time() + batching_window
+        self.batch: List["MessageTypeDef"] = []
+        self.reserved = 0
+        self.empty_receives = 0
+        self.cond = threading.Condition()
+
+    def try_reserve(self) -> Optional[int]:
+        """Reserve up-to 10 messages from the remaining batch size.
+
+        Must be called with the lock of self.cond held.
 
-    return {"Messages": batch}
+        Returns: number of messages reserved, 0 if the batch is full or
+            the batching window has elapsed, None if all of the remaining
+            messages have been reserved by other pollers.
+        """
+        remaining = self.deadline - time.time()
+        if remaining <= 0 or len(self.batch) >= self.batch_size:
+            return 0
+        if remaining < 1 and self.empty_receives:
+            # Only short polls fit into the window and the queue is quiet
+            return 0
+
+        count = min(self.batch_size - len(self.batch) - self.reserved, 10)
+        if count <= 0:
+            return None
+
+        self.reserved += count
+        return count
+
+    def build_request(self, count: int) -> dict:
+        """Build receive_message() request arguments for count messages."""
+        request = {**self.request, "WaitTimeSeconds": self.wait_time()}
+        request["MaxNumberOfMessages"] = count
+        if "ReceiveRequestAttemptId" in request:
+            request["ReceiveRequestAttemptId"] = str(uuid.uuid4())
+        return request
+
+    def wait_time(self) -> int:
+        """Long poll duration (in whole seconds) for the next request."""
+        wait_time = min(2 ** min(self.empty_receives, 5), MAX_WAIT_TIME_SECONDS)
+        # Round instead of truncating so that a window of N seconds starts
+        # with an N second long poll instead of a short poll
+        return max(min(wait_time, round(self.deadline - time.time())), 0)
+
+    def complete(self, count: int, messages: List["MessageTypeDef"]) -> None:
+        """Release reservation of count messages and add received messages to
+        the batch.
+
+        Must be called with the lock of self.cond held.
+        """
+        self.reserved -= count
+        self.batch.extend(messages)
+        self.empty_receives = 0 if messages else self.empty_receives + 1
+
+    def report(
+        self,
+        count: int,
+        messages: List["MessageTypeDef"],
+        latency: float,
+        error: Optional[BaseException],
+    ) -> None:
+        """Report a receive_message() request to the installed
+        instrumentation."""
+        instrumentation = get_instrumentation()
+        instrumentation.request("receive_message", latency, count, error)
+        if error is None:
+            instrumentation.received(count, len(messages))
+
+    def cancel(self, count: int) -> None:
+        """Release reservation of count messages without receiving them.
+
+        Must be called with the lock of self.cond held.
+        """
+        self.reserved -= count
+
+    def stop(self) -> None:
+        """Stop polling by ending the batching window early. Requests in
+        flight are not interrupted."""
+        with self.cond:
+            self.deadline = time.time()
+            self.cond.notify_all()
+
+    def poll(self) -> None:
+        """Poll the queue for messages until the batch is full or the batching
+        window has elapsed."""
+        for _ in self.iter_poll():
+            pass
+
+    def iter_poll(self) -> Iterator[List["MessageTypeDef"]]:
+        """Poll the queue for messages until the batch is full or the batching
+        window has elapsed, yielding the messages of each response that has
+        messages."""
+        while True:
+            with self.cond:
+                while (count := self.try_reserve()) is None:
+                    self.cond.wait(timeout=self.deadline - time.time())
+
+            if not count:
+                return
+
+            if self.limiter is not None and not self.limiter.acquire(
+                timeout=max(self.deadline - time.time(), 0)
+            ):
+                with self.cond:
+                    self.cancel(count)
+                    self.cond.notify_all()
+                continue
+
+            messages: List["MessageTypeDef"] = []
+            started = time.monotonic()
+            throttled = False
+            error: Optional[Exception] = None
+            try:
+                messages = self.sqs_client.receive_message(
+                    **self.build_request(count)
+                ).get("Messages", [])
+            except botocore.exceptions.ClientError as exc:
+                # Throttled requests reduce the limit and count as empty
+                # receives if the receiver has a limiter
+                error = exc
+                throttled = _is_throttling_error(exc)
+                if self.limiter is None or not throttled:
+                    raise
+            except Exception as exc:
+                error = exc
+                raise
+            finally:
+                self.report(count, messages, time.monotonic() - started, error)
+                if self.limiter is not None:
+                    self.limiter.release(
+                        started, throttled=throttled, succeeded=error is None
+                    )
+                with self.cond:
+                    self.complete(count, messages)
+                    self.cond.notify_all()
+
+            if messages:
+                yield messages
+
+
+def change_message_visibility_batch(
+    QueueUrl: str,  # pylint: disable=invalid-name
+    Entries: Iterable[  # pylint: disable=invalid-name
+        "ChangeMessageVisibilityBatchRequestEntryTypeDef"
+    ],
+    sqs_client: Optional["SQSClient"] = None,
+    session: Optional[boto3.session.Session] = None,
+    max_workers: int = 1,
+    retry_policy: Optional[RetryPolicy] = None,
+    limiter: Optional[AdaptiveLimiter] = None,
+    codec: Optional[Codec] = None,
+) -> "ChangeMessageVisibilityBatchResultTypeDef":
+    """Change the visibility timeout of an arbitrary number of messages.
+
+    This method performs multiple boto3 SQS change_message_visibility_batch()
+    calls to change the visibility timeout of an arbitrary number of messages
+    in an Amazon SQS queue.
+
+    change_message_visibility_batch() accepts the same arguments and has the
+    same response structure as boto3 SQS change_message_visibility_batch()
+    method.
+
+    Args:
+        QueueUrl: The URL of the Amazon SQS queue whose messages' visibility
+                  is changed.
+        Entries: A list or other iterable of receipt handles and visibility
+                 timeouts for the messages whose visibility timeout is
+                 changed. Entries are consumed lazily as the requests are made.
+        sqs_client: boto3 SQS client to use. Optional. Default: client created
+                    with default session and configuration.
+        session: boto3 Session to use for creating SQS client if sqs_client is
+                 not provided. Optional. Default: boto3 default session.
+        max_workers: Maximum number of change_message_visibility_batch()
+                     requests to have in flight concurrently. Optional.
+                     Default: 1 (requests are made sequentially).
+        retry_policy: Retry policy for entries that fail with a retryable
+                      error. Optional. Default: RetryPolicy().
+        limiter: Adaptive limiter for the number of concurrent requests. The
+                 number of concurrent requests is bounded by both max_workers
+                 and the limit of the limiter. Optional. Default: no limiter.
+        codec: Codec that decoded the messages, for mapping their receipt
+               handles back to SQS receipt handles. Optional.
+    Returns:
+        Results similar to boto3 SQS change_message_visibility_batch() method.
+    """
+    return _collect_results(
+        iter_change_message_visibility_batch(
+            QueueUrl,
+            Entries,
+            sqs_client=sqs_client,
+            session=session,
+            max_workers=max_workers,
+            retry_policy=retry_policy,
+            limiter=limiter,
+            codec=codec,
+        )
+    )
+
+
+def iter_change_message_visibility_batch(
+    QueueUrl: str,  # pylint: disable=invalid-name
+    Entries: Iterable[  # pylint: disable=invalid-name
+        "ChangeMessageVisibilityBatchRequestEntryTypeDef"
+    ],
+    sqs_client: Optional["SQSClient"] = None,
+    session: Optional[boto3.session.Session] = None,
+    max_workers: int = 1,
+    retry_policy: Optional[RetryPolicy] = None,
+    limiter: Optional[AdaptiveLimiter] = None,
+    codec: Optional[Codec] = None,
+) -> Iterator["ChangeMessageVisibilityBatchResultTypeDef"]:
+    """Change the visibility timeout of an arbitrary number of messages and
+    yield the results of each batch request as it completes.
+
+    Generator version of change_message_visibility_batch(). Accepts the same
+    arguments. See iter_send_message_batch() for details.
+
+    Yields:
+        Results of a batch request similar to boto3 SQS
+        change_message_visibility_batch() method.
+    """
+    sqs_client = sqs_client or create_sqs_client(
+        session, max(max_workers, DEFAULT_MAX_POOL_CONNECTIONS)
+    )
+    if codec is not None:
+        Entries = _map_receipt_handles(codec, Entries)
+
+    yield from _iter_batch_request(
+        sqs_client.change_message_visibility_batch,
+        QueueUrl,
+        Entries,
+        max_workers,
+        retry_policy,
+        limiter,
+    )
 
 
 def delete_message_batch(
     QueueUrl: str,  # pylint: disable=invalid-name
-    Entries: List[  # pylint: disable=invalid-name
+    Entries: Iterable[  # pylint: disable=invalid-name
         "DeleteMessageBatchRequestEntryTypeDef"
     ],
     sqs_client: Optional["SQSClient"] = None,
     session: Optional[boto3.session.Session] = None,
+    max_workers: int = 1,
+    retry_policy: Optional[RetryPolicy] = None,
+    limiter: Optional[AdaptiveLimiter] = None,
+    codec: Optional[Codec] = None,
 ) -> "DeleteMessageBatchResultTypeDef":
     """Delete an arbitrary number of messages from an Amazon SQS queue.
 
@@ -119,36 +651,96 @@ def delete_message_batch(
 
     Args:
         QueueUrl: The URL of the Amazon SQS queue from which messages are deleted.
-        Entries: A list of receipt handles for the messages to be deleted.
+        Entries: A list or other iterable of receipt handles for the messages
+                 to be deleted. Entries are consumed lazily as the messages are
+                 deleted.
         sqs_client: boto3 SQS client to use. Optional. Default: client created
                     with default session and configuration.
         session: boto3 Session to use for creating SQS client if sqs_client is
                  not provided. Optional. Default: boto3 default session.
+        max_workers: Maximum number of delete_message_batch() requests to have
+                     in flight concurrently. Optional. Default: 1 (requests are
+                     made sequentially).
+        retry_policy: Retry policy for entries that fail with a retryable
+                      error. Optional. Default: RetryPolicy().
+        limiter: Adaptive limiter for the number of concurrent requests. The
+                 number of concurrent requests is bounded by both max_workers
+                 and the limit of the limiter. Optional. Default: no limiter.
+        codec: Codec that decoded the messages, for mapping their receipt
+               handles back to SQS receipt handles and cleaning up after
+               deleted messages (e.g. S3 objects of offloaded bodies).
+               Optional.
     Returns:
         Results similar to boto3 SQS delete_message_batch() method.
     """
-    sqs_client = sqs_client or create_sqs_client(session)
-    result: "DeleteMessageBatchResultTypeDef" = {"Successful": [], "Failed": []}
+    return _collect_results(
+        iter_delete_message_batch(
+            QueueUrl,
+            Entries,
+            sqs_client=sqs_client,
+            session=session,
+            max_workers=max_workers,
+            retry_policy=retry_policy,
+            limiter=limiter,
+            codec=codec,
+        )
+    )
 
-    while Entries:
-        chunk, Entries = Entries[:10], Entries[10:]
-        res = sqs_client.delete_message_batch(QueueUrl=QueueUrl, Entries=chunk)
 
-        failed, retryable = _divide_failures(res.get("Failed", []), chunk)
-        result["Failed"].extend(failed)
-        result["Successful"].extend(res.get("Successful", []))
-        Entries = retryable + Entries
+def iter_delete_message_batch(
+    QueueUrl: str,  # pylint: disable=invalid-name
+    Entries: Iterable[  # pylint: disable=invalid-name
+        "DeleteMessageBatchRequestEntryTypeDef"
+    ],
+    sqs_client: Optional["SQSClient"] = None,
+    session: Optional[boto3.session.Session] = None,
+    max_workers: int = 1,
+    retry_policy: Optional[RetryPolicy] = None,
+    limiter: Optional[AdaptiveLimiter] = None,
+    codec: Optional[Codec] = None,
+) -> Iterator["DeleteMessageBatchResultTypeDef"]:
+    """Delete an arbitrary number of messages from an Amazon SQS queue and
+    yield the results of each batch request as it completes.
 
-    return result
+    Generator version of delete_message_batch(). Accepts the same arguments.
+    See iter_send_message_batch() for details.
+
+    Yields:
+        Results of a batch request similar to boto3 SQS delete_message_batch()
+        method.
+    """
+    sqs_client = sqs_client or create_sqs_client(
+        session, max(max_workers, DEFAULT_MAX_POOL_CONNECTIONS)
+    )
+    receipt_handles: Dict[str, str] = {}
+    if codec is not None:
+        Entries = _map_receipt_handles(codec, Entries, receipt_handles)
+
+    for result in _iter_batch_request(
+        sqs_client.delete_message_batch,
+        QueueUrl,
+        Entries,
+        max_workers,
+        retry_policy,
+        limiter,
+    ):
+        if codec is not None and result["Successful"]:
+            codec.deleted([receipt_handles[res["Id"]] for res in result["Successful"]])
+        yield result
 
 
 def send_message_batch(
     QueueUrl: str,  # pylint: disable=invalid-name
-    Entries: List[  # pylint: disable=invalid-name
+    Entries: Iterable[  # pylint: disable=invalid-name
         "SendMessageBatchRequestEntryTypeDef"
     ],
     sqs_client: Optional["SQSClient"] = None,
     session: Optional[boto3.session.Session] = None,
+    max_workers: int = 1,
+    retry_policy: Optional[RetryPolicy] = None,
+    limiter: Optional[AdaptiveLimiter] = None,
+    codec: Optional[Codec] = None,
+    fifo: bool = False,
 ) -> "SendMessageBatchResultTypeDef":
     """Send an arbitrary number of messages to an Amazon SQS queue.
 
@@ -161,31 +753,645 @@ def send_message_batch(
     Args:
         QueueUrl: The URL of the Amazon SQS queue to which batched messages
                   are sent.
-        Entries: A list of send message entries for the messages to send to
-                 SQS.
+        Entries: A list or other iterable of send message entries for the
+                 messages to send to SQS. Entries are consumed lazily as the
+                 messages are sent.
         sqs_client: boto3 SQS client to use. Optional. Default: client created
                     with default session and configuration.
         session: boto3 Session to use for creating SQS client if sqs_client is
                  not provided. Optional. Default: boto3 default session.
+        max_workers: Maximum number of send_message_batch() requests to have
+                     in flight concurrently. Optional. Default: 1 (requests are
+                     made sequentially). With FIFO queues, use the default
+                     or set fifo=True as concurrent requests do not retain
+                     message order otherwise.
+        retry_policy: Retry policy for entries that fail with a retryable
+                      error. Optional. Default: RetryPolicy().
+        limiter: Adaptive limiter for the number of concurrent requests. The
+                 number of concurrent requests is bounded by both max_workers
+                 and the limit of the limiter. Optional. Default: no limiter.
+        codec: Codec for encoding the messages before they are sent, e.g.
+               CompressionCodec. Optional. Default: messages are sent as they
+               are.
+        fifo: Keep the messages of each message group in order while sending
+              different message groups concurrently. Entries are partitioned
+              by MessageGroupId and each message group has at most one
+              request in flight. Retried entries are sent before the later
+              entries of their message group. Entries that fail with a
+              retryable error after later entries of their message group
+              were sent in the same request are failed with code OutOfOrder
+              instead of retried. Optional. Default: False.
 
     Returns:
         Results similar to boto3 SQS send_message_batch() method.
     """
-    sqs_client = sqs_client or create_sqs_client(session)
-    result: "SendMessageBatchResultTypeDef" = {"Successful": [], "Failed": []}
+    return _collect_results(
+        iter_send_message_batch(
+            QueueUrl,
+            Entries,
+            sqs_client=sqs_client,
+            session=session,
+            max_workers=max_workers,
+            retry_policy=retry_policy,
+            limiter=limiter,
+            codec=codec,
+            fifo=fifo,
+        )
+    )
+
+
+def iter_send_message_batch(
+    QueueUrl: str,  # pylint: disable=invalid-name
+    Entries: Iterable[  # pylint: disable=invalid-name
+        "SendMessageBatchRequestEntryTypeDef"
+    ],
+    sqs_client: Optional["SQSClient"] = None,
+    session: Optional[boto3.session.Session] = None,
+    max_workers: int = 1,
+    retry_policy: Optional[RetryPolicy] = None,
+    limiter: Optional[AdaptiveLimiter] = None,
+    codec: Optional[Codec] = None,
+    fifo: bool = False,
+) -> Iterator["SendMessageBatchResultTypeDef"]:
+    """Send an arbitrary number of messages to an Amazon SQS queue and yield
+    the results of each batch request as it completes.
+
+    Generator version of send_message_batch(). Accepts the same arguments.
+    Instead of collecting the results of all entries into one result, yields
+    the Successful and Failed entries of each batch request in the order the
+    requests were made. Memory use stays constant regardless of the number of
+    entries, and the caller can act on the results (e.g. checkpoint progress)
+    while the rest of the entries are sent.
+
+    Retried entries are reported in the result of the request in which they
+    finally succeed or fail. Requests whose entries are all retried yield
+    nothing. Entries are consumed lazily as the generator is iterated;
+    closing the generator stops sending new requests and waits for the
+    requests in flight to complete.
+
+    Yields:
+        Results of a batch request similar to boto3 SQS send_message_batch()
+        method.
+    """
+    sqs_client = sqs_client or create_sqs_client(
+        session, max(max_workers, DEFAULT_MAX_POOL_CONNECTIONS)
+    )
+    if codec is not None:
+        Entries = codec.encode_all(Entries)
 
-    while Entries:
-        chunk, Entries = Entries[:10], Entries[10:]
-        res = sqs_client.send_message_batch(QueueUrl=QueueUrl, Entries=chunk)
+    yield from _iter_batch_request(
+        sqs_client.send_message_batch,
+        QueueUrl,
+        Entries,
+        max_workers,
+        retry_policy,
+        limiter,
+        entry_size=_message_size,
+        fifo=fifo,
+    )
 
-        failed, retryable = _divide_failures(res.get("Failed", []), chunk)
-        result["Failed"].extend(failed)
-        result["Successful"].extend(res.get("Successful", []))
-        Entries = retryable + Entries
 
+def _collect_results(results: Iterable[Any]) -> Any:
+    """Helper to collect the results of batch requests into one result."""
+    result: Any = {"Successful": [], "Failed": []}
+    for res in results:
+        result["Successful"].extend(res["Successful"])
+        result["Failed"].extend(res["Failed"])
     return result
 
 
+def _iter_batch_request(
+    operation: Callable[..., Any],
+    queue_url: str,
+    entries: Iterable[Any],
+    max_workers: int,
+    retry_policy: Optional[RetryPolicy] = None,
+    limiter: Optional[AdaptiveLimiter] = None,
+    entry_size: Optional[Callable[[Any], int]] = None,
+    fifo: bool = False,
+) -> Iterator[Any]:
+    """Helper to perform a batch operation on an arbitrary number of entries.
+
+    Splits entries into chunks of up-to 10 entries and performs the given batch
+    operation for each of them, keeping up to max_workers requests in flight.
+    Responses are processed in the order the requests were made.
+
+    Retryable failures are put back to the queue to be retried after a delay
+    given by the retry policy. With sequential requests (max_workers=1), the
+    retried entries are sent before any other entries. With concurrent
+    requests, other entries are sent while the retried entries wait. Requests
+    rejected due to throttling are retried the same way.
+
+    If a limiter is given, each request also reserves a slot from it. Requests
+    are made only when the limiter has free slots.
+
+    Entries are consumed lazily, i.e. at most max_workers chunks of entries
+    are read from the given iterable ahead of the processed responses.
+
+    If entry_size is given, chunks are also limited to MAX_PAYLOAD_SIZE bytes
+    and entries larger than MAX_PAYLOAD_SIZE bytes are failed without sending
+    them to SQS.
+
+    If fifo is set, entries are partitioned by MessageGroupId and each
+    message group has at most one request in flight (see _GroupedEntryQueue).
+
+    Args:
+        operation: boto3 SQS client batch method to call (e.g. send_message_batch)
+        queue_url: URL of the queue to operate on
+        entries: iterable of entries to pass to the batch operation
+        max_workers: maximum number of requests to have in flight concurrently
+        retry_policy: retry policy for retryable failures
+        limiter: adaptive limiter for the number of in-flight requests
+        entry_size: function returning the payload size of an entry in bytes
+        fifo: keep the entries of each message group in order
+
+    Yields:
+        Successful and Failed entries of each processed response (and of
+        entries failed without sending them).
+    """
+    if max_workers < 1:
+        raise ValueError(f"max_workers must be 1 or greater (got {max_workers})")
+
+    executor: concurrent.futures.Executor = (
+        concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        if max_workers > 1
+        else _SerialExecutor()
+    )
+
+    queue = (
+        _GroupedEntryQueue(entries, max_workers)
+        if fifo
+        else _EntryQueue(entries, ordered=max_workers == 1)
+    )
+    retry = _RetryState(retry_policy or DEFAULT_RETRY_POLICY)
+    inflight: Deque[Tuple[list, concurrent.futures.Future]] = collections.deque()
+    with executor:
+        while queue or inflight:
+            while len(inflight) < max_workers and queue.ready():
+                chunk, rejected = queue.next_chunk(entry_size)
+                if rejected:
+                    yield {
+                        "Successful": [],
+                        "Failed": list(map(_rejected_failure, rejected)),
+                    }
+                if not chunk:
+                    continue
+
+                if limiter is not None and not limiter.acquire(blocking=not inflight):
+                    queue.requeue(chunk)
+                    queue.completed(chunk)
+                    break
+
+                future = executor.submit(
+                    _call, operation, limiter, QueueUrl=queue_url, Entries=chunk
+                )
+                inflight.append((chunk, future))
+
+            if not inflight:
+                time.sleep(queue.ready_in())
+                continue
+
+            chunk, future = inflight[0]
+            if len(inflight) < max_workers and queue.delayed:
+                # Wake up to send retried entries once their delay elapses
+                concurrent.futures.wait([future], timeout=queue.ready_in())
+                if not future.done():
+                    continue
+
+            inflight.popleft()
+            try:
+                res = future.result()
+            except botocore.exceptions.ClientError as exc:
+                if not _is_throttling_error(exc):
+                    raise
+                res = _throttled_response(chunk, exc)
+
+            result: Any = {"Successful": [], "Failed": []}
+            _collect_response(
+                _operation_name(operation), res, chunk, result, queue, retry
+            )
+            queue.completed(chunk)
+            if result["Successful"] or result["Failed"]:
+                yield result
+
+
+def _call(
+    operation: Callable[..., Any], limiter: Optional[AdaptiveLimiter], **kwargs
+) -> Any:
+    """Helper to make a batch request.
+
+    Reports the request to the installed instrumentation. If a limiter is
+    given, the request must have a slot reserved from it. The slot is released
+    once the request completes. Requests that are throttled or have retryable
+    failures decrease the limit of the limiter.
+    """
+    started = time.monotonic()
+    throttled = False
+    error: Optional[Exception] = None
+    try:
+        res = operation(**kwargs)
+        throttled = any(not failure["SenderFault"] for failure in res.get("Failed", []))
+        return res
+    except Exception as exc:
+        error = exc
+        throttled = _is_throttling_error(exc)
+        raise
+    finally:
+        latency = time.monotonic() - started
+        get_instrumentation().request(
+            _operation_name(operation), latency, len(kwargs["Entries"]), error
+        )
+        if limiter is not None:
+            limiter.release(
+                started,
+                throttled=throttled,
+                latency=latency,
+                succeeded=error is None,
+            )
+
+
+def _operation_name(operation: Callable[..., Any]) -> str:
+    """Helper to get the name of an SQS client method (e.g. send_message_batch)."""
+    return getattr(operation, "__name__", "unknown")
+
+
+def _throttled_response(chunk: list, exc: botocore.exceptions.ClientError) -> Any:
+    """Helper to build a response where every entry of a throttled request
+    failed with a retryable error."""
+    error = exc.response.get("Error", {})
+    return {
+        "Successful": [],
+        "Failed": [
+            {
+                "Id": entry["Id"],
+                "SenderFault": False,
+                "Code": error.get("Code", "Throttling"),
+                "Message": error.get("Message", str(exc)),
+            }
+            for entry in chunk
+        ],
+    }
+
+
+def _rejected_failure(entry: Any) -> "BatchResultErrorEntryTypeDef":
+    """Helper to build a failure result for an entry that is failed without
+    sending it, i.e. an entry that is too large or that a codec failed to
+    encode."""
+    if isinstance(entry, _FailedEntry):
+        return entry.failure
+    return {
+        "Id": entry["Id"],
+        "SenderFault": True,
+        "Code": "InvalidParameterValue",
+        "Message": "One or more parameters are invalid. Reason: "
+        f"Message must be shorter than {MAX_PAYLOAD_SIZE} bytes.",
+    }
+
+
+def _collect_response(
+    operation: str,
+    res: Any,
+    chunk: list,
+    result: Any,
+    queue: "_EntryQueue",
+    retry: _RetryState,
+) -> None:
+    """Helper to collect results of a batch request.
+
+    Adds successful and non-retryable failed entries to the result and puts
+    retryable entries back to the queue. Retryable entries that ran out of
+    retries are added to the failed entries. Failures and retries are reported
+    to the installed instrumentation.
+    """
+    instrumentation = get_instrumentation()
+    for failure in res.get("Failed", []):
+        instrumentation.failed(operation, failure["Code"], not failure["SenderFault"])
+
+    failed, retryable = _divide_failures(res.get("Failed", []), chunk)
+    result["Failed"].extend(failed)
+    result["Successful"].extend(res.get("Successful", []))
+    if retryable:
+        retryable, unordered = queue.split_retryable(
+            chunk, retryable, res.get("Successful", [])
+        )
+        failures = {failure["Id"]: failure for failure in res["Failed"]}
+        for entry in unordered:
+            result["Failed"].append(_out_of_order_failure(failures[entry["Id"]]))
+            instrumentation.failed(operation, OUT_OF_ORDER, False)
+    if retryable:
+        retryable, exhausted, delay = retry.schedule(retryable, res["Failed"])
+        result["Failed"].extend(exhausted)
+        for failure in exhausted:
+            instrumentation.failed(operation, failure["Code"], False)
+        if retryable:
+            instrumentation.retried(operation, len(retryable), delay)
+        queue.requeue(retryable, delay)
+
+
+def _out_of_order_failure(
+    failure: "BatchResultErrorEntryTypeDef",
+) -> "BatchResultErrorEntryTypeDef":
+    """Helper to build a failure result for a FIFO entry that cannot be
+    retried in order."""
+    return {
+        "Id": failure["Id"],
+        "SenderFault": False,
+        "Code": OUT_OF_ORDER,
+        "Message": "Not retried as later messages of the message group were "
+        f"sent. Last error: {failure.get('Message', failure['Code'])}",
+    }
+
+
+class _EntryQueue:
+    """Helper for consuming batch request entries from an iterable in chunks.
+
+    Entries put back to the queue (retryable entries and entries that did not
+    fit in the previous chunk) are consumed before the rest of the iterable.
+    Entries put back with a delay are consumed once the delay has elapsed. If
+    the queue is ordered, no other entries are consumed while delayed entries
+    wait.
+    """
+
+    def __init__(self, entries: Iterable[Any], ordered: bool = False):
+        self.source = iter(entries)
+        self.pending: Deque[Any] = collections.deque()
+        self.delayed: List[Tuple[float, int, Sequence[Any]]] = []
+        self.ordered = ordered
+        self.sequence = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self.delayed) or self._has_pending()
+
+    def _has_pending(self) -> bool:
+        """Check if there are entries to consume without waiting."""
+        if self.pending:
+            return True
+
+        for entry in self.source:
+            self.pending.append(entry)
+            return True
+
+        return False
+
+    def ready(self) -> bool:
+        """Check if the next chunk can be taken without waiting.
+
+        Moves delayed entries whose delay has elapsed to the head of the queue.
+        """
+        now = time.monotonic()
+        while self.delayed and self.delayed[0][0] <= now:
+            self.requeue(heapq.heappop(self.delayed)[2])
+
+        if self.ordered and self.delayed:
+            return False
+
+        return self._has_pending()
+
+    def ready_in(self) -> float:
+        """Number of seconds until the next delayed entries are ready."""
+        if not self.delayed:
+            return 0.0
+        return max(self.delayed[0][0] - time.monotonic(), 0.0)
+
+    def requeue(self, entries: Sequence[Any], delay: float = 0.0) -> None:
+        """Put entries back to the head of the queue, optionally after the
+        given delay (in seconds)."""
+        if delay > 0 and entries:
+            heapq.heappush(
+                self.delayed,
+                (time.monotonic() + delay, next(self.sequence), entries),
+            )
+        else:
+            self.pending.extendleft(reversed(entries))
+
+    def next_chunk(
+        self, entry_size: Optional[Callable[[Any], int]] = None
+    ) -> Tuple[list, list]:
+        """Take the next chunk of entries for a batch request.
+
+        Args:
+            entry_size: function returning the payload size of an entry in
+                bytes or None if the payload size does not need to be limited
+
+        Returns: tuple with (chunk, rejected) where chunk contains entries
+            for the next batch request and rejected contains entries that
+            cannot be sent (too large or failed to encode).
+        """
+        chunk: list = []
+        rejected: list = []
+        chunk_size = 0
+        while len(chunk) < MAX_BATCH_ENTRIES and self._has_pending():
+            entry = self.pending.popleft()
+            size = entry_size(entry) if entry_size else 0
+            if size > MAX_PAYLOAD_SIZE or isinstance(entry, _FailedEntry):
+                rejected.append(entry)
+            elif chunk_size + size > MAX_PAYLOAD_SIZE:
+                self.pending.appendleft(entry)
+                break
+            else:
+                chunk.append(entry)
+                chunk_size += size
+
+        return chunk, rejected
+
+    def split_retryable(
+        self, chunk: Sequence[Any], retryable: List[Any], successful: List[Any]
+    ) -> Tuple[List[Any], List[Any]]:
+        """Divide the retryable entries of a chunk into entries to retry and
+        entries that cannot be retried in order.
+
+        Args:
+            chunk: entries of the request
+            retryable: entries of the request that failed with a retryable
+                       error
+            successful: successful result entries of the request
+
+        Returns: tuple with (retryable, unordered) where unordered contains
+            entries that are failed instead of retried.
+        """
+        return retryable, []
+
+    def completed(self, chunk: Sequence[Any]) -> None:
+        """Called once the response to the request of a chunk has been
+        processed (and its retryable entries put back to the queue)."""
+
+
+class _GroupedEntryQueue(_EntryQueue):
+    """Helper for consuming FIFO send message entries from an iterable in
+    chunks, keeping the entries of each message group in order.
+
+    Entries are partitioned by MessageGroupId. Chunks take entries only from
+    message groups that have no request in flight and no entries waiting for
+    a retry delay, so the entries of a message group are sent one request at
+    a time while different message groups are sent concurrently. A chunk can
+    hold entries of multiple message groups. Entries put back to the queue
+    go back to the head of their message group.
+
+    A retryable entry is retried only if no later entry of its message group
+    in the same request succeeded. Otherwise it is failed with code
+    OutOfOrder, as retrying it would send it after the later entries.
+
+    The iterable is read ahead to find message groups that can be sent, up to
+    10 chunks of entries per worker.
+    """
+
+    def __init__(self, entries: Iterable[Any], max_workers: int):
+        super().__init__(entries)
+        self.max_buffered = 10 * max_workers * MAX_BATCH_ENTRIES
+        self.buffered = 0
+        self.groups: Dict[Any, Deque[Any]] = {}
+        # Message groups that can be sent, in the order they became sendable
+        self.runnable: Dict[Any, None] = {}
+        self.inflight: Set[Any] = set()
+        self.waiting: Counter[Any] = collections.Counter()
+
+    def _has_pending(self) -> bool:
+        # Read at least a full chunk ahead so that chunks are not cut short
+        # by entries that have not been read yet
+        while self.buffered < self.max_buffered and (
+            not self.runnable or self.buffered < MAX_BATCH_ENTRIES
+        ):
+            entry = next(self.source, None)
+            if entry is None:
+                break
+            self._append(entry)
+
+        return bool(self.runnable)
+
+    def _append(self, entry: Any, left: bool = False) -> None:
+        group = entry.get("MessageGroupId")
+        entries = self.groups.setdefault(group, collections.deque())
+        if left:
+            entries.appendleft(entry)
+        else:
+            entries.append(entry)
+        self.buffered += 1
+        self._update(group)
+
+    def _update(self, group: Any) -> None:
+        """Update the state of a message group after its entries or requests
+        have changed."""
+        if not self.groups.get(group):
+            self.groups.pop(group, None)
+            self.runnable.pop(group, None)
+        elif group not in self.inflight and not self.waiting[group]:
+            self.runnable[group] = None
+
+    def requeue(self, entries: Sequence[Any], delay: float = 0.0) -> None:
+        if delay > 0 and entries:
+            super().requeue(entries, delay)
+            self.waiting.update({entry.get("MessageGroupId") for entry in entries})
+            return
+
+        for entry in reversed(entries):
+            self._append(entry, left=True)
+
+    def ready(self) -> bool:
+        now = time.monotonic()
+        while self.delayed and self.delayed[0][0] <= now:
+            entries = heapq.heappop(self.delayed)[2]
+            self.waiting.subtract({entry.get("MessageGroupId") for entry in entries})
+            self.requeue(entries)
+
+        return self._has_pending()
+
+    def next_chunk(
+        self, entry_size: Optional[Callable[[Any], int]] = None
+    ) -> Tuple[list, list]:
+        chunk: list = []
+        rejected: list = []
+        chunk_size = 0
+        while len(chunk) < MAX_BATCH_ENTRIES and self._has_pending():
+            group = next(iter(self.runnable))
+            entries = self.groups[group]
+            taken = 0
+            while entries and len(chunk) < MAX_BATCH_ENTRIES:
+                size = entry_size(entries[0]) if entry_size else 0
+                if size > MAX_PAYLOAD_SIZE or isinstance(entries[0], _FailedEntry):
+                    rejected.append(entries.popleft())
+                elif chunk_size + size > MAX_PAYLOAD_SIZE:
+                    break
+                else:
+                    chunk.append(entries.popleft())
+                    chunk_size += size
+                    taken += 1
+                self.buffered -= 1
+
+            if taken:
+                self.inflight.add(group)
+                self.runnable.pop(group)
+            self._update(group)
+            if entries and not taken:
+                # The next entry of the message group does not fit
+                break
+
+        return chunk, rejected
+
+    def split_retryable(
+        self, chunk: Sequence[Any], retryable: List[Any], successful: List[Any]
+    ) -> Tuple[List[Any], List[Any]]:
+        retryable_ids = {entry["Id"] for entry in retryable}
+        successful_ids = {entry["Id"] for entry in successful}
+        retry: List[Any] = []
+        unordered: List[Any] = []
+        # Message groups with a successful entry later in the chunk
+        sent_later: Set[Any] = set()
+        for entry in reversed(chunk):
+            group = entry.get("MessageGroupId")
+            if entry["Id"] in successful_ids:
+                sent_later.add(group)
+            elif entry["Id"] in retryable_ids:
+                (unordered if group in sent_later else retry).append(entry)
+
+        # Retried entries in the order they were sent
+        return retry[::-1], unordered[::-1]
+
+    def completed(self, chunk: Sequence[Any]) -> None:
+        for group in {entry.get("MessageGroupId") for entry in chunk}:
+            self.inflight.discard(group)
+            self._update(group)
+
+
+def _message_size(entry: "SendMessageBatchRequestEntryTypeDef") -> int:
+    """Helper to compute the payload size of a send message entry in bytes.
+
+    The size consists of the message body and the name, data type and value of
+    each message attribute and message system attribute.
+    """
+    size = len(entry.get("MessageBody", "").encode("utf-8"))
+    for attributes in (
+        entry.get("MessageAttributes", {}),
+        entry.get("MessageSystemAttributes", {}),
+    ):
+        for name, attribute in attributes.items():
+            size += len(name.encode("utf-8"))
+            size += len(attribute.get("DataType", "").encode("utf-8"))
+            for value in [
+                attribute.get("StringValue"),
+                attribute.get("BinaryValue"),
+                *attribute.get("StringListValues", []),
+                *attribute.get("BinaryListValues", []),
+            ]:
+                if isinstance(value, str):
+                    size += len(value.encode("utf-8"))
+                elif isinstance(value, (bytes, bytearray)):
+                    size += len(value)
+
+    return size
+
+
+class _SerialExecutor(concurrent.futures.Executor):
+    """Executor that runs submitted calls immediately in the calling thread."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exc:  # pylint: disable=broad-exception-caught
+            future.set_exception(exc)
+        return future
+
+
 @overload
 def _divide_failures(
     failed: List["BatchResultErrorEntryTypeDef"],
@@ -0,0 +1,206 @@
+"""Background batching of individual Amazon SQS batch request entries"""
+
+import collections
+import concurrent.futures
+import logging
+import threading
+import time
+from typing import Any, Callable, Deque, List, Optional, Tuple
+
+from .aws_sqs_batchlib import MAX_BATCH_ENTRIES, MAX_PAYLOAD_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class BatchEntryError(Exception):
+    """Error for an entry that failed in a batch request.
+
+    Attributes:
+        failure: The failed result entry (with Id, SenderFault, Code and
+                 Message) returned for the entry.
+    """
+
+    def __init__(self, failure: Any):
+        super().__init__(f"{failure['Code']}: {failure.get('Message', '')}")
+        self.failure = failure
+
+
+class _Batcher:
+    """Helper for collecting individual entries into batch requests.
+
+    Entries are submitted one at a time and sent in the background with a
+    batch operation such as send_message_batch(). Full batches (10 entries or
+    MAX_PAYLOAD_SIZE bytes of payload) are sent right away. Partial batches
+    are sent once their oldest entry has waited for `linger` seconds, or when
+    flush() or close() is called.
+
+    The result of each entry is reported through the Future returned when
+    the entry is submitted. The Future resolves to the Successful result entry
+    or fails with BatchEntryError if the entry failed.
+    """
+
+    def __init__(
+        self,
+        operation: Callable[..., Any],
+        linger: float,
+        max_pending: Optional[int] = None,
+        entry_size: Optional[Callable[[Any], int]] = None,
+    ):
+        """Create a _Batcher.
+
+        Args:
+            operation: Function that is called with a list of entries (as the
+                       Entries keyword argument) and returns a result with
+                       Successful and Failed entries.
+            linger: Maximum time (in seconds) to wait for a batch to fill up.
+            max_pending: Maximum number of entries waiting to be sent. Further
+                         submissions block until there is room. Optional.
+                         Default: no limit.
+            entry_size: Function returning the payload size of an entry in
+                        bytes. Optional. Default: payload size is not limited.
+        """
+        if linger < 0:
+            raise ValueError(f"linger must not be negative (got {linger})")
+        if max_pending is not None and max_pending < 1:
+            raise ValueError(f"max_pending must be 1 or greater (got {max_pending})")
+
+        self.operation = operation
+        self.linger = linger
+        self.max_pending = max_pending
+        self.entry_size = entry_size
+
+        self._pending: Deque[Tuple[Any, concurrent.futures.Future, int, float]] = (
+            collections.deque()
+        )
+        self._pending_size = 0
+        self._sending = 0
+        self._flushing = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._pending) + self._sending
+
+    def _submit(self, entry: Any) -> concurrent.futures.Future:
+        """Submit an entry to be sent in a batch.
+
+        Blocks if max_pending entries are already waiting to be sent.
+
+        Returns: Future for the result of the entry.
+        """
+        size = self.entry_size(entry) if self.entry_size else 0
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._cond:
+            self._cond.wait_for(
+                lambda: (
+                    self._closed
+                    or self.max_pending is None
+                    or len(self._pending) < self.max_pending
+                )
+            )
+            if self._closed:
+                raise RuntimeError("cannot submit entries after close()")
+
+            self._pending.append((entry, future, size, time.monotonic()))
+            self._pending_size += size
+            self._cond.notify_all()
+
+        return future
+
+    def flush(self) -> None:
+        """Send all pending entries and wait for their results."""
+        with self._cond:
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                self._cond.wait_for(lambda: not self._pending and not self._sending)
+            finally:
+                self._flushing -= 1
+
+    def close(self) -> None:
+        """Send all pending entries and stop the background thread.
+
+        Entries cannot be submitted after close() has been called.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self) -> None:
+        """Send batches of entries until closed."""
+        while batch := self._next_batch():
+            try:
+                self._send(batch)
+            finally:
+                with self._cond:
+                    self._sending -= len(batch)
+                    self._cond.notify_all()
+
+    def _next_batch(self) -> List[Tuple[Any, concurrent.futures.Future]]:
+        """Wait for the next batch of entries to send.
+
+        Returns: entries to send with their futures, or an empty list if the
+            batcher has been closed and all entries have been sent.
+        """
+        with self._cond:
+            while True:
+                count = len(self._pending)
+                if not count and self._closed:
+                    return []
+
+                full = (
+                    count >= MAX_BATCH_ENTRIES or self._pending_size >= MAX_PAYLOAD_SIZE
+                )
+                timeout = None
+                if count:
+                    timeout = self._pending[0][3] + self.linger - time.monotonic()
+                    if self._closed or self._flushing or timeout <= 0:
+                        # Send everything including the partial last batch
+                        break
+                    if full:
+                        # Send full batches and let the last one fill up
+                        if self._pending_size < MAX_PAYLOAD_SIZE:
+                            count -= count % MAX_BATCH_ENTRIES
+                        break
+
+                self._cond.wait(timeout=timeout)
+
+            batch = []
+            for _ in range(count):
+                entry, future, size, _ = self._pending.popleft()
+                self._pending_size -= size
+                batch.append((entry, future))
+
+            self._sending += len(batch)
+            self._cond.notify_all()
+            return batch
+
+    def _send(self, batch: List[Tuple[Any, concurrent.futures.Future]]) -> None:
+        """Send a batch of entries and resolve their futures."""
+        futures = {str(i): future for i, (_, future) in enumerate(batch)}
+        try:
+            res = self.operation(
+                Entries=[{**entry, "Id": str(i)} for i, (entry, _) in enumerate(batch)]
+            )
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            logger.exception("Batch request of %i entries failed", len(batch))
+            for future in futures.values():
+                future.set_exception(exc)
+            return
+
+        for success in res["Successful"]:
+            futures.pop(success["Id"]).set_result(success)
+        for failure in res["Failed"]:
+            futures.pop(failure["Id"]).set_exception(BatchEntryError(failure))
+        for future in futures.values():
+            future.set_exception(RuntimeError("no result for entry in response"))
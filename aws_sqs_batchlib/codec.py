@@ -0,0 +1,290 @@
+"""Codecs for transforming message bodies on send and receive"""
+
+import base64
+import functools
+import logging
+import zlib
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    from mypy_boto3_sqs.type_defs import (
+        BatchResultErrorEntryTypeDef,
+        MessageTypeDef,
+        SendMessageBatchRequestEntryTypeDef,
+    )
+
+logger = logging.getLogger(__name__)
+
+ENCODING_ATTRIBUTE = "ContentEncoding"
+"""Name of the message attribute that tags messages encoded by a codec."""
+
+MAX_MESSAGE_ATTRIBUTES = 10
+"""Maximum number of message attributes SQS accepts for a message."""
+
+
+_Algorithm = Tuple[
+    Callable[[bytes, Optional[int]], bytes],
+    Callable[[bytes], bytes],
+]
+"""Compress and decompress functions of a compression algorithm."""
+
+
+class Codec:
+    """Base class for codecs that transform messages on send and receive.
+
+    send_message_batch() calls encode_all() with the entries to send and
+    receive_message() calls decode_all() with the received messages. The
+    default implementations call encode() and decode() for each entry and
+    message, which pass them through unchanged.
+
+    Codecs that change the receipt handles of received messages map them
+    back with receipt_handle(). delete_message_batch() and
+    change_message_visibility_batch() call it for each entry, and
+    delete_message_batch() calls deleted() after messages have been deleted.
+    """
+
+    attribute_names: List[str] = []
+    """Message attributes decode() needs. receive_message() requests them in
+    addition to MessageAttributeNames."""
+
+    def encode(
+        self, entry: "SendMessageBatchRequestEntryTypeDef"
+    ) -> "SendMessageBatchRequestEntryTypeDef":
+        """Encode a send message entry."""
+        return entry
+
+    def decode(self, message: "MessageTypeDef") -> "MessageTypeDef":
+        """Decode a received message."""
+        return message
+
+    def encode_all(
+        self, entries: Iterable["SendMessageBatchRequestEntryTypeDef"]
+    ) -> Iterable["SendMessageBatchRequestEntryTypeDef"]:
+        """Encode send message entries. Entries are consumed lazily."""
+        return map(self.encode, entries)
+
+    def decode_all(self, messages: List["MessageTypeDef"]) -> List["MessageTypeDef"]:
+        """Decode received messages."""
+        return [self.decode(message) for message in messages]
+
+    def receipt_handle(self, receipt_handle: str) -> str:
+        """Get the SQS receipt handle of a decoded message."""
+        return receipt_handle
+
+    def deleted(self, receipt_handles: List[str]) -> None:
+        """Called with the receipt handles (of decoded messages) of messages
+        that have been deleted."""
+
+
+class CompressionCodec(Codec):
+    """Codec that compresses message bodies.
+
+    Bodies are compressed with zlib or zstd, encoded with base64 and tagged
+    with a ContentEncoding message attribute naming the compression
+    algorithm. Bodies that are smaller than min_size, or that do not get
+    smaller when compressed, are sent as they are without the tag.
+
+    Received messages with the tag are decompressed and the tag is removed
+    from their message attributes. Messages without the tag are passed
+    through untouched so that compressed and uncompressed messages can be
+    mixed in the same queue. Messages that fail to decompress (e.g. zstd
+    compressed messages when zstd is not available) are logged and passed
+    through with the tag.
+
+    Example:
+        >>> codec = CompressionCodec()
+        >>> send_message_batch(QueueUrl=queue_url, Entries=entries, codec=codec)
+        >>> receive_message(QueueUrl=queue_url, MaxNumberOfMessages=100, codec=codec)
+    """
+
+    attribute_names = [ENCODING_ATTRIBUTE]
+
+    def __init__(
+        self,
+        algorithm: Optional[str] = None,
+        level: Optional[int] = None,
+        min_size: int = 256,
+    ):
+        """Create a CompressionCodec.
+
+        Args:
+            algorithm: Compression algorithm for sent messages, zlib or zstd.
+                       Optional. Default: zstd if available (Python 3.14+ or
+                       the zstandard package), zlib otherwise.
+            level: Compression level. Optional. Default: default level of the
+                   algorithm.
+            min_size: Minimum body size (in bytes) to compress. Optional.
+                      Default: 256.
+        """
+        algorithms = _algorithms()
+        if algorithm is None:
+            algorithm = "zstd" if "zstd" in algorithms else "zlib"
+        if algorithm not in ("zlib", "zstd"):
+            raise ValueError(f"unsupported compression algorithm {algorithm!r}")
+        if algorithm not in algorithms:
+            raise ValueError(f"{algorithm} compression is not available")
+
+        self.algorithm = algorithm
+        self.level = level
+        self.min_size = min_size
+
+    def encode(
+        self, entry: "SendMessageBatchRequestEntryTypeDef"
+    ) -> "SendMessageBatchRequestEntryTypeDef":
+        attributes = entry.get("MessageAttributes", {})
+        if (
+            ENCODING_ATTRIBUTE in attributes
+            or len(attributes) >= MAX_MESSAGE_ATTRIBUTES
+        ):
+            return entry
+
+        body = entry["MessageBody"].encode("utf-8")
+        if len(body) < self.min_size:
+            return entry
+
+        compress = _algorithms()[self.algorithm][0]
+        encoded = base64.b64encode(compress(body, self.level))
+        tag_size = len(ENCODING_ATTRIBUTE) + len("String") + len(self.algorithm)
+        if len(encoded) + tag_size >= len(body):
+            return entry
+
+        return {
+            **entry,
+            "MessageBody": encoded.decode("ascii"),
+            "MessageAttributes": {
+                **attributes,
+                ENCODING_ATTRIBUTE: {
+                    "DataType": "String",
+                    "StringValue": self.algorithm,
+                },
+            },
+        }
+
+    def decode(self, message: "MessageTypeDef") -> "MessageTypeDef":
+        attributes = message.get("MessageAttributes", {})
+        if ENCODING_ATTRIBUTE not in attributes:
+            return message
+
+        algorithm = attributes[ENCODING_ATTRIBUTE].get("StringValue", "")
+        try:
+            decompress = _algorithms()[algorithm][1]
+            body = decompress(base64.b64decode(message["Body"], validate=True))
+            decoded = body.decode("utf-8")
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            # Unknown algorithm, corrupt body or an error of the zstd library
+            logger.warning(
+                "Failed to decode message %s (%s): %r",
+                message.get("MessageId"),
+                algorithm,
+                exc,
+            )
+            return message
+
+        res: "MessageTypeDef" = {**message, "Body": decoded}
+        remaining = {k: v for k, v in attributes.items() if k != ENCODING_ATTRIBUTE}
+        if remaining:
+            res["MessageAttributes"] = remaining
+        else:
+            del res["MessageAttributes"]
+        return res
+
+
+class _FailedEntry(dict):
+    """Send message entry that a codec failed to encode.
+
+    encode_all() of built-in codecs yields these in place of entries they
+    cannot encode. Batch operations fail them with the given code without
+    sending them to SQS, like entries that are too large.
+    """
+
+    def __init__(
+        self, entry: "SendMessageBatchRequestEntryTypeDef", code: str, message: str
+    ):
+        super().__init__(entry)
+        self.failure: "BatchResultErrorEntryTypeDef" = {
+            "Id": entry["Id"],
+            "SenderFault": True,
+            "Code": code,
+            "Message": message,
+        }
+
+
+def _map_receipt_handles(
+    codec: Codec,
+    entries: Iterable[Any],
+    receipt_handles: Optional[Dict[str, str]] = None,
+) -> Iterator[Any]:
+    """Helper to map the receipt handles of delete or change visibility
+    entries back to SQS receipt handles.
+
+    Args:
+        codec: Codec that decoded the messages.
+        entries: Entries with receipt handles of decoded messages.
+        receipt_handles: Dictionary to collect the original receipt handle of
+                         each entry in (by entry Id). Optional.
+    """
+    for entry in entries:
+        if receipt_handles is not None:
+            receipt_handles[entry["Id"]] = entry["ReceiptHandle"]
+        receipt_handle = codec.receipt_handle(entry["ReceiptHandle"])
+        if receipt_handle != entry["ReceiptHandle"]:
+            entry = {**entry, "ReceiptHandle": receipt_handle}
+        yield entry
+
+
+def _request_attributes(attribute_names: List[str], kwargs: dict) -> dict:
+    """Helper to add the message attributes needed by a codec (or a duplicate
+    filter) to the MessageAttributeNames of receive_message() arguments."""
+    names = kwargs.get("MessageAttributeNames", [])
+    if "All" in names or ".*" in names:
+        return kwargs
+
+    missing = [name for name in attribute_names if name not in names]
+    if not missing:
+        return kwargs
+    return {**kwargs, "MessageAttributeNames": [*names, *missing]}
+
+
+@functools.lru_cache(maxsize=None)
+def _algorithms() -> Dict[str, _Algorithm]:
+    """Available compression algorithms with their compress and decompress
+    functions."""
+    algorithms: Dict[str, _Algorithm] = {
+        "zlib": (
+            lambda data, level: zlib.compress(data, -1 if level is None else level),
+            zlib.decompress,
+        )
+    }
+
+    try:
+        # pylint: disable-next=import-outside-toplevel
+        from compression import zstd  # type: ignore
+
+        algorithms["zstd"] = (
+            lambda data, level: zstd.compress(data, level),
+            zstd.decompress,
+        )
+    except ImportError:
+        try:
+            import zstandard  # type: ignore  # pylint: disable=import-outside-toplevel
+
+            algorithms["zstd"] = (
+                lambda data, level: zstandard.ZstdCompressor(
+                    level=3 if level is None else level
+                ).compress(data),
+                lambda data: zstandard.ZstdDecompressor().decompress(data),
+            )
+        except ImportError:
+            pass
+
+    return algorithms
@@ -0,0 +1,385 @@
+"""Long-running consumer for Amazon SQS queues"""
+
+import concurrent.futures
+import logging
+import queue
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+import boto3.session
+
+from .aws_sqs_batchlib import (
+    DEFAULT_MAX_POOL_CONNECTIONS,
+    change_message_visibility_batch,
+    create_sqs_client,
+    delete_message_batch,
+    receive_message,
+)
+from .codec import Codec
+from .dedup import DuplicateFilter
+from .heartbeat import VisibilityHeartbeat
+
+if TYPE_CHECKING:  # pragma: no cover
+    from mypy_boto3_sqs import SQSClient
+    from mypy_boto3_sqs.type_defs import (
+        DeleteMessageBatchRequestEntryTypeDef,
+        MessageTypeDef,
+    )
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class Consumer:
+    """Consume an Amazon SQS queue with a message handler.
+
+    Consumer receives batches of messages with receive_message() and calls
+    the handler for each message. Messages the handler processes without
+    raising an exception are deleted from the queue. Messages the handler
+    fails to process are left in the queue to be received again after their
+    visibility timeout expires.
+
+    Receiving, processing and deleting messages overlap. Consumer receives the
+    next batch of messages in a background thread while the current batch is
+    processed, and deletes processed messages in another background thread.
+    Up-to `prefetch` batches are received ahead of the batch being processed.
+
+    If heartbeat is enabled, Consumer extends the visibility timeout of
+    received messages until they have been processed. This requires the
+    VisibilityTimeout argument to be set.
+
+    With max_workers > 1, messages of a batch are processed concurrently. Use
+    fifo with FIFO queues to keep the order of messages: the batch is split by
+    MessageGroupId and different message groups are processed concurrently
+    while the messages of each message group are processed in order. If the
+    handler fails to process a message, the rest of its message group is
+    skipped and released back to the queue so that the message group is
+    received again in order. The processed messages before the failed one are
+    deleted.
+
+    Example:
+        >>> consumer = Consumer(
+        ...     "https://sqs.eu-north-1.amazonaws.com/123456789012/MyQueue",
+        ...     handler=lambda message: print(message["Body"]),
+        ...     MaxNumberOfMessages=100,
+        ...     WaitTimeSeconds=5,
+        ... )
+        >>> consumer.run()  # runs until consumer.stop() is called
+    """
+
+    def __init__(
+        self,
+        queue_url: str,
+        handler: Callable[["MessageTypeDef"], Any],
+        sqs_client: Optional["SQSClient"] = None,
+        session: Optional[boto3.session.Session] = None,
+        prefetch: int = 1,
+        pollers: int = 1,
+        heartbeat: bool = False,
+        max_workers: int = 1,
+        fifo: bool = False,
+        **kwargs,
+    ):
+        """Create a Consumer.
+
+        Args:
+            queue_url: URL of the queue to consume.
+            handler: Function to call for each received message.
+            sqs_client: boto3 SQS client to use. Optional. Default: client
+                        created with default session and configuration.
+            session: boto3 Session to use for creating SQS client if
+                     sqs_client is not provided. Optional. Default: boto3
+                     default session.
+            prefetch: Maximum number of batches to receive ahead of the batch
+                      being processed. Optional. Default: 1.
+            pollers: Number of concurrent pollers to use for receiving a
+                     batch. Optional. Default: 1.
+            heartbeat: Extend the visibility timeout of received messages until
+                       they have been processed. Optional. Default: False.
+            max_workers: Number of threads processing the messages of a batch
+                         concurrently. Optional. Default: 1 (messages are
+                         processed one at a time in the calling thread).
+            fifo: Process the messages of each message group in order and
+                  stop processing a message group at the first failed message.
+                  Requests the MessageGroupId attribute of the messages.
+                  Optional. Default: False.
+            **kwargs: keyword arguments to pass to receive_message() (e.g.
+                      MaxNumberOfMessages, WaitTimeSeconds, codec and dedup).
+                      WaitTimeSeconds must be 1 or greater.
+                      Messages are marked processed in or discarded from the
+                      dedup filter as they are processed.
+        """
+        if prefetch < 1:
+            raise ValueError(f"prefetch must be 1 or greater (got {prefetch})")
+        if max_workers < 1:
+            raise ValueError(f"max_workers must be 1 or greater (got {max_workers})")
+        if kwargs.get("WaitTimeSeconds", 1) < 1:
+            raise ValueError(
+                "WaitTimeSeconds must be 1 or greater "
+                f"(got {kwargs['WaitTimeSeconds']})"
+            )
+        if heartbeat and "VisibilityTimeout" not in kwargs:
+            raise ValueError("heartbeat requires VisibilityTimeout to be set")
+
+        self.queue_url = queue_url
+        self.handler = handler
+        self.sqs_client = sqs_client or create_sqs_client(
+            session, max(pollers + 1, DEFAULT_MAX_POOL_CONNECTIONS)
+        )
+        self.pollers = pollers
+        self.max_workers = max_workers
+        self.fifo = fifo
+        self.receive_args = _request_group_id(kwargs) if fifo else kwargs
+        self.codec: Optional[Codec] = kwargs.get("codec")
+        self.dedup: Optional[DuplicateFilter] = kwargs.get("dedup")
+        self.heartbeat: Optional[VisibilityHeartbeat] = None
+        if heartbeat:
+            self.heartbeat = VisibilityHeartbeat(
+                queue_url,
+                kwargs["VisibilityTimeout"],
+                sqs_client=self.sqs_client,
+                codec=self.codec,
+            )
+
+        self._stopped = threading.Event()
+        self._batches: queue.Queue = queue.Queue(maxsize=prefetch)
+        self._deletes: queue.Queue = queue.Queue()
+        self._executor: Optional[concurrent.futures.Executor] = None
+
+    def run(self, max_batches: Optional[int] = None) -> None:
+        """Consume the queue until stop() is called.
+
+        Returns after the processed messages have been deleted. Messages
+        received ahead of time but not processed before stopping are released
+        back to the queue by changing their visibility timeout to 0.
+
+        Args:
+            max_batches: Maximum number of batches to process before stopping.
+                         Optional. Default: no limit.
+        """
+        self._stopped.clear()
+        receiver = threading.Thread(target=self._receive, daemon=True)
+        deleter = threading.Thread(target=self._delete, daemon=True)
+        receiver.start()
+        deleter.start()
+        if self.heartbeat is not None:
+            self.heartbeat.start()
+        if self.max_workers > 1:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers
+            )
+
+        unprocessed: List["MessageTypeDef"] = []
+        try:
+            processed = 0
+            while max_batches is None or processed < max_batches:
+                batch = self._batches.get()
+                if batch is _STOP:
+                    break
+                if isinstance(batch, BaseException):
+                    raise batch
+                if self._stopped.is_set():
+                    unprocessed.extend(batch)
+                    break
+
+                deletes, skipped = self._process(batch)
+                self._deletes.put(deletes)
+                self._release(skipped)
+                processed += 1
+        finally:
+            self.stop()
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+            while receiver.is_alive() or not self._batches.empty():
+                try:
+                    batch = self._batches.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if isinstance(batch, list):
+                    unprocessed.extend(batch)
+
+            receiver.join()
+            self._release(unprocessed)
+            self._deletes.put(_STOP)
+            deleter.join()
+            if self.heartbeat is not None:
+                self.heartbeat.stop()
+
+    def stop(self) -> None:
+        """Stop consuming the queue.
+
+        The batch currently being processed is processed to completion before
+        run() returns.
+        """
+        self._stopped.set()
+
+    def _receive(self) -> None:
+        """Receive batches of messages until stopped."""
+        try:
+            while not self._stopped.is_set():
+                received_at = time.monotonic()
+                res = receive_message(
+                    sqs_client=self.sqs_client,
+                    pollers=self.pollers,
+                    **{**self.receive_args, "QueueUrl": self.queue_url},
+                )
+                if self.heartbeat is not None:
+                    self.heartbeat.track(res["Messages"], received_at=received_at)
+                if res["Messages"]:
+                    self._batches.put(res["Messages"])
+            self._batches.put(_STOP)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            self._batches.put(exc)
+
+    def _process(
+        self, batch: List["MessageTypeDef"]
+    ) -> Tuple[List["DeleteMessageBatchRequestEntryTypeDef"], List["MessageTypeDef"]]:
+        """Process a batch of messages.
+
+        Returns: tuple with (deletes, skipped) where deletes contains delete
+            entries for successfully processed messages and skipped contains
+            messages that were not processed because an earlier message of
+            their message group failed.
+        """
+        groups: Dict[Any, List[Tuple[int, "MessageTypeDef"]]] = {}
+        for i, message in enumerate(batch):
+            key = _message_group_id(message) if self.fifo else i
+            groups.setdefault(key, []).append((i, message))
+
+        results: Iterable[
+            Tuple[List[Tuple[int, "MessageTypeDef"]], List["MessageTypeDef"]]
+        ]
+        if self._executor is None:
+            results = map(self._process_group, groups.values())
+        else:
+            results = self._executor.map(self._process_group, groups.values())
+
+        processed: List[Tuple[int, "MessageTypeDef"]] = []
+        skipped: List["MessageTypeDef"] = []
+        for group_processed, group_skipped in results:
+            processed.extend(group_processed)
+            skipped.extend(group_skipped)
+
+        deletes: List["DeleteMessageBatchRequestEntryTypeDef"] = [
+            {"Id": str(i), "ReceiptHandle": message["ReceiptHandle"]}
+            for i, message in sorted(processed, key=lambda item: item[0])
+        ]
+        return deletes, skipped
+
+    def _process_group(
+        self, messages: List[Tuple[int, "MessageTypeDef"]]
+    ) -> Tuple[List[Tuple[int, "MessageTypeDef"]], List["MessageTypeDef"]]:
+        """Process the messages of a message group in order until one fails.
+
+        Returns: tuple with (processed, skipped) where processed contains the
+            processed messages with their index in the batch and skipped
+            contains the messages after the failed one.
+        """
+        processed: List[Tuple[int, "MessageTypeDef"]] = []
+        for n, (i, message) in enumerate(messages):
+            try:
+                self.handler(message)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to process message %s", message["MessageId"])
+                if self.heartbeat is not None:
+                    self.heartbeat.untrack([message["ReceiptHandle"]])
+                if self.dedup is not None:
+                    self.dedup.discard([message])
+                return processed, [msg for _, msg in messages[n + 1 :]]
+
+            if self.dedup is not None:
+                self.dedup.processed([message])
+            processed.append((i, message))
+
+        return processed, []
+
+    def _release(self, messages: List["MessageTypeDef"]) -> None:
+        """Release unprocessed messages back to the queue."""
+        if self.heartbeat is not None:
+            self.heartbeat.untrack(msg["ReceiptHandle"] for msg in messages)
+        if self.dedup is not None:
+            self.dedup.discard(messages)
+        if not messages:
+            return
+
+        try:
+            res = change_message_visibility_batch(
+                QueueUrl=self.queue_url,
+                Entries=[
+                    {
+                        "Id": str(i),
+                        "ReceiptHandle": msg["ReceiptHandle"],
+                        "VisibilityTimeout": 0,
+                    }
+                    for i, msg in enumerate(messages)
+                ],
+                sqs_client=self.sqs_client,
+                codec=self.codec,
+            )
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception("Failed to release %i messages", len(messages))
+            return
+
+        for failure in res["Failed"]:
+            logger.warning(
+                "Failed to release message: %s (%s)",
+                failure.get("Message"),
+                failure["Code"],
+            )
+
+    def _delete(self) -> None:
+        """Delete processed messages until stopped.
+
+        The visibility timeout of processed messages is extended until their
+        delete request has returned.
+        """
+        while (entries := self._deletes.get()) is not _STOP:
+            try:
+                res = delete_message_batch(
+                    QueueUrl=self.queue_url,
+                    Entries=entries,
+                    sqs_client=self.sqs_client,
+                    codec=self.codec,
+                )
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to delete %i messages", len(entries))
+                continue
+            finally:
+                if self.heartbeat is not None:
+                    self.heartbeat.untrack(entry["ReceiptHandle"] for entry in entries)
+
+            for failure in res["Failed"]:
+                logger.warning(
+                    "Failed to delete message: %s (%s)",
+                    failure.get("Message"),
+                    failure["Code"],
+                )
+
+
+def _message_group_id(message: "MessageTypeDef") -> Optional[str]:
+    """Helper to get the MessageGroupId of a received message."""
+    return message.get("Attributes", {}).get("MessageGroupId")
+
+
+def _request_group_id(kwargs: dict) -> dict:
+    """Helper to add MessageGroupId to the MessageSystemAttributeNames of
+    receive_message() arguments."""
+    for arg in ("MessageSystemAttributeNames", "AttributeNames"):
+        names = kwargs.get(arg, [])
+        if "All" in names or "MessageGroupId" in names:
+            return kwargs
+
+    names = kwargs.get("MessageSystemAttributeNames", [])
+    return {**kwargs, "MessageSystemAttributeNames": [*names, "MessageGroupId"]}
@@ -0,0 +1,221 @@
+"""Client-side duplicate suppression for received messages"""
+
+import collections
+import hashlib
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    List,
+    Optional,
+    OrderedDict,
+    Tuple,
+    Union,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    from mypy_boto3_sqs.type_defs import MessageTypeDef
+
+_MESSAGE_FIELDS = ("MessageId", "MD5OfBody", "Body")
+"""Key names that refer to fields of a message instead of message attributes."""
+
+
+class DuplicateFilter:
+    """Filter duplicate deliveries of messages from standard queues.
+
+    Standard queues deliver messages at least once. DuplicateFilter remembers
+    the keys of received messages (MessageId by default) in a bounded LRU
+    cache and filters out deliveries of messages it has already seen:
+
+    * Duplicates of messages that have been processed (see processed()) are
+      removed from the received messages and deleted from the queue. Processed
+      keys are remembered for `ttl` seconds.
+    * Duplicates of messages that are still being processed are removed from
+      the received messages but left in the queue. They are received again
+      once their visibility timeout expires, by when the original has either
+      been processed (and the duplicate is deleted) or failed (see discard()).
+      Keys of messages being processed are remembered for the visibility
+      timeout of the receive request (`visibility_timeout` if the request
+      does not set VisibilityTimeout), so that redeliveries of messages that
+      were neither processed nor discarded are not filtered for longer.
+
+    Call processed() with messages that have been processed and discard()
+    with messages that failed to process or were released back to the queue,
+    so that their redeliveries are not filtered. Consumer does this
+    automatically. Keys are stored as 16-byte digests.
+
+    Example:
+        >>> dedup = DuplicateFilter(max_size=100000, ttl=600)
+        >>> res = receive_message(QueueUrl=queue_url, dedup=dedup, ...)
+        >>> process(res["Messages"])
+        >>> dedup.processed(res["Messages"])
+    """
+
+    def __init__(
+        self,
+        max_size: int = 100000,
+        ttl: float = 3600.0,
+        visibility_timeout: float = 30.0,
+        key: Union[str, Callable[["MessageTypeDef"], Optional[str]]] = "MessageId",
+    ):
+        """Create a DuplicateFilter.
+
+        Args:
+            max_size: Maximum number of keys to remember. The least recently
+                      seen keys are forgotten first. Optional. Default: 100000.
+            ttl: Number of seconds to remember the key of a processed message
+                 for. Optional. Default: 3600.
+            visibility_timeout: Number of seconds to remember the key of a
+                                message being processed for, if the receive
+                                request does not set VisibilityTimeout. Should
+                                match the visibility timeout of the queue.
+                                Optional. Default: 30.
+            key: Key identifying duplicates: MessageId, MD5OfBody or Body for
+                 message fields (MD5OfBody and Body compare message contents),
+                 the name of a message attribute, or a function returning the
+                 key of a message. Messages without a key are never
+                 filtered. Optional. Default: MessageId.
+        """
+        if max_size < 1:
+            raise ValueError(f"max_size must be 1 or greater (got {max_size})")
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.visibility_timeout = visibility_timeout
+        self.key = key
+        # Maps from key digest to its update and expiry times for messages
+        # being processed and processed messages, ordered from the least
+        # recently updated
+        self._in_flight: OrderedDict[bytes, Tuple[float, float]] = (
+            collections.OrderedDict()
+        )
+        self._processed: OrderedDict[bytes, Tuple[float, float]] = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    @property
+    def attribute_names(self) -> List[str]:
+        """Message attributes the key needs. receive_message() requests them
+        in addition to MessageAttributeNames."""
+        if isinstance(self.key, str) and self.key not in _MESSAGE_FIELDS:
+            return [self.key]
+        return []
+
+    def __len__(self) -> int:
+        return len(self._in_flight) + len(self._processed)
+
+    def filter(
+        self,
+        messages: Iterable["MessageTypeDef"],
+        visibility_timeout: Optional[float] = None,
+    ) -> Tuple[List["MessageTypeDef"], List["MessageTypeDef"]]:
+        """Filter duplicates from received messages.
+
+        Args:
+            messages: Received messages.
+            visibility_timeout: Visibility timeout of the received messages in
+                                seconds. Optional. Default:
+                                self.visibility_timeout.
+
+        Returns: tuple with (unique, processed) where unique contains messages
+            seen for the first time and processed contains duplicates of
+            processed messages, which should be deleted from the queue.
+        """
+        if visibility_timeout is None:
+            visibility_timeout = self.visibility_timeout
+
+        unique: List["MessageTypeDef"] = []
+        processed: List["MessageTypeDef"] = []
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            for message in messages:
+                digest = self._digest(message)
+                if digest is None:
+                    unique.append(message)
+                    continue
+
+                if digest in self._processed:
+                    processed.append(message)
+                elif self._in_flight.get(digest, (now, now))[1] <= now:
+                    # Not seen, or the visibility timeout of the message has
+                    # expired without the message being processed
+                    self._set(self._in_flight, digest, now, visibility_timeout)
+                    unique.append(message)
+
+        return unique, processed
+
+    def processed(self, messages: Iterable["MessageTypeDef"]) -> None:
+        """Remember messages as processed. Later deliveries of them are
+        deleted."""
+        with self._lock:
+            now = time.monotonic()
+            for message in messages:
+                digest = self._digest(message)
+                if digest is not None:
+                    self._in_flight.pop(digest, None)
+                    self._set(self._processed, digest, now, self.ttl)
+
+    def discard(self, messages: Iterable["MessageTypeDef"]) -> None:
+        """Forget messages that were not processed so that their next
+        delivery is not filtered."""
+        with self._lock:
+            for message in messages:
+                digest = self._digest(message)
+                if digest is not None:
+                    self._in_flight.pop(digest, None)
+                    self._processed.pop(digest, None)
+
+    def _digest(self, message: "MessageTypeDef") -> Optional[bytes]:
+        """Compute the key digest of a message."""
+        key: Union[str, bytes, None]
+        if callable(self.key):
+            key = self.key(message)
+        elif self.key in _MESSAGE_FIELDS:
+            key = message.get(self.key)  # type: ignore[assignment]
+        else:
+            attribute: Any = message.get("MessageAttributes", {}).get(self.key, {})
+            key = attribute.get("StringValue", attribute.get("BinaryValue"))
+
+        if key is None:
+            return None
+        data = key if isinstance(key, bytes) else key.encode("utf-8")
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def _set(
+        self,
+        keys: "OrderedDict[bytes, Tuple[float, float]]",
+        digest: bytes,
+        now: float,
+        ttl: float,
+    ) -> None:
+        """Store a key as the most recently updated one, forgetting the least
+        recently updated keys over max_size.
+
+        Must be called with the lock held.
+        """
+        keys[digest] = (now, now + ttl)
+        keys.move_to_end(digest)
+        while len(self) > self.max_size:
+            oldest = min(
+                (stored for stored in (self._in_flight, self._processed) if stored),
+                key=lambda stored: next(iter(stored.values()))[0],
+            )
+            oldest.popitem(last=False)
+
+    def _expire(self, now: float) -> None:
+        """Forget expired keys. Keys expire in about the order they were
+        updated; filter() checks the expiry of in-flight keys it finds.
+
+        Must be called with the lock held.
+        """
+        for keys in (self._in_flight, self._processed):
+            while keys:
+                digest, (_, expires) = next(iter(keys.items()))
+                if expires > now:
+                    break
+                del keys[digest]
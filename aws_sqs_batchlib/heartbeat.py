@@ -0,0 +1,218 @@
+"""Visibility timeout heartbeat for in-flight Amazon SQS messages"""
+
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+import boto3.session
+
+from .aws_sqs_batchlib import change_message_visibility_batch, create_sqs_client
+from .codec import Codec
+
+if TYPE_CHECKING:  # pragma: no cover
+    from mypy_boto3_sqs import SQSClient
+    from mypy_boto3_sqs.type_defs import (
+        ChangeMessageVisibilityBatchRequestEntryTypeDef,
+        MessageTypeDef,
+    )
+
+logger = logging.getLogger(__name__)
+
+
+class VisibilityHeartbeat:
+    """Extend the visibility timeout of in-flight messages before it expires.
+
+    VisibilityHeartbeat tracks the receipt handles of received messages and
+    the time their visibility timeout expires. A background thread extends the
+    visibility timeout of messages shortly before it expires. Extensions of
+    messages that expire around the same time are sent in batches of 10 with
+    change_message_visibility_batch().
+
+    Stop tracking messages with untrack() once they have been processed and
+    deleted.
+
+    Example:
+        >>> with VisibilityHeartbeat(queue_url, visibility_timeout=30) as heartbeat:
+        ...     res = receive_message(QueueUrl=queue_url, VisibilityTimeout=30)
+        ...     heartbeat.track(res["Messages"])
+        ...     process(res["Messages"])
+        ...     heartbeat.untrack([msg["ReceiptHandle"] for msg in res["Messages"]])
+    """
+
+    def __init__(
+        self,
+        queue_url: str,
+        visibility_timeout: int,
+        sqs_client: Optional["SQSClient"] = None,
+        session: Optional[boto3.session.Session] = None,
+        margin: Optional[float] = None,
+        codec: Optional[Codec] = None,
+    ):
+        """Create a VisibilityHeartbeat.
+
+        Args:
+            queue_url: URL of the queue the messages were received from.
+            visibility_timeout: Visibility timeout of the messages (in seconds)
+                                when they are received. Extensions set the
+                                visibility timeout to the same value.
+            sqs_client: boto3 SQS client to use. Optional. Default: client
+                        created with default session and configuration.
+            session: boto3 Session to use for creating SQS client if
+                     sqs_client is not provided. Optional. Default: boto3
+                     default session.
+            margin: How long before expiry (in seconds) the visibility timeout
+                    is extended. Optional. Default: one third of the
+                    visibility timeout.
+            codec: Codec the messages were decoded with. Optional.
+        """
+        if visibility_timeout <= 0:
+            raise ValueError(
+                f"visibility_timeout must be greater than 0 (got {visibility_timeout})"
+            )
+
+        self.queue_url = queue_url
+        self.visibility_timeout = visibility_timeout
+        self.sqs_client = sqs_client or create_sqs_client(session)
+        self.codec = codec
+        self.margin = visibility_timeout / 3 if margin is None else margin
+        if not 0 <= self.margin < visibility_timeout:
+            raise ValueError(
+                f"margin must be between 0 and visibility_timeout (got {self.margin})"
+            )
+
+        self._expires: Dict[str, float] = {}
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "VisibilityHeartbeat":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """Start extending the visibility timeout of tracked messages."""
+        with self._cond:
+            self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop extending the visibility timeout of tracked messages."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def track(
+        self,
+        messages: Iterable["MessageTypeDef"],
+        received_at: Optional[float] = None,
+    ) -> None:
+        """Start tracking messages.
+
+        Args:
+            messages: Messages to track.
+            received_at: Time (time.monotonic()) the messages were received at.
+                         Optional. Default: now.
+        """
+        expires = (received_at or time.monotonic()) + self.visibility_timeout
+        with self._cond:
+            for message in messages:
+                self._expires[message["ReceiptHandle"]] = expires
+            self._cond.notify_all()
+
+    def untrack(self, receipt_handles: Iterable[str]) -> None:
+        """Stop tracking messages, e.g. after they have been deleted.
+
+        Args:
+            receipt_handles: Receipt handles of the messages to stop tracking.
+        """
+        with self._cond:
+            for receipt_handle in receipt_handles:
+                self._expires.pop(receipt_handle, None)
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._expires)
+
+    def _run(self) -> None:
+        """Extend the visibility timeout of messages about to expire until
+        stopped."""
+        while receipt_handles := self._wait_for_expiring():
+            try:
+                self._extend(receipt_handles)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception(
+                    "Failed to extend visibility timeout of %i messages",
+                    len(receipt_handles),
+                )
+                with self._cond:
+                    self._cond.wait_for(lambda: self._stopped, timeout=1)
+
+    def _wait_for_expiring(self) -> List[str]:
+        """Wait until the visibility timeout of some messages needs to be
+        extended.
+
+        Returns: receipt handles of messages to extend the visibility timeout
+            of, or an empty list if stopped. Messages that would need to be
+            extended within margin / 2 seconds are included so that their
+            extensions can be sent in the same batch.
+        """
+        with self._cond:
+            while not self._stopped:
+                now = time.monotonic()
+                timeout = None
+                if self._expires:
+                    timeout = min(self._expires.values()) - self.margin - now
+                    if timeout <= 0:
+                        horizon = now + self.margin + self.margin / 2
+                        return [
+                            receipt_handle
+                            for receipt_handle, expires in self._expires.items()
+                            if expires <= horizon
+                        ]
+
+                self._cond.wait(timeout=timeout)
+
+            return []
+
+    def _extend(self, receipt_handles: List[str]) -> None:
+        """Extend the visibility timeout of the given messages."""
+        entries: List["ChangeMessageVisibilityBatchRequestEntryTypeDef"] = [
+            {
+                "Id": str(i),
+                "ReceiptHandle": receipt_handle,
+                "VisibilityTimeout": self.visibility_timeout,
+            }
+            for i, receipt_handle in enumerate(receipt_handles)
+        ]
+
+        extended_at = time.monotonic()
+        result = change_message_visibility_batch(
+            QueueUrl=self.queue_url,
+            Entries=entries,
+            sqs_client=self.sqs_client,
+            codec=self.codec,
+        )
+
+        with self._cond:
+            for res in result["Successful"]:
+                receipt_handle = receipt_handles[int(res["Id"])]
+                if receipt_handle in self._expires:
+                    self._expires[receipt_handle] = (
+                        extended_at + self.visibility_timeout
+                    )
+
+            for failure in result["Failed"]:
+                logger.warning(
+                    "Failed to extend visibility timeout of a message: %s (%s)",
+                    failure.get("Message"),
+                    failure["Code"],
+                )
+                self._expires.pop(receipt_handles[int(failure["Id"])], None)
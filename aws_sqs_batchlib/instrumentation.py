@@ -0,0 +1,145 @@
+"""Instrumentation hooks for Amazon SQS requests made by the library"""
+
+from typing import Any, Optional
+
+
+class Instrumentation:
+    """Hooks the library calls around SQS requests and retry decisions.
+
+    The default implementation does nothing. Subclass Instrumentation and
+    override the hooks to collect metrics, then install the instance with
+    set_instrumentation(). Hooks are called from the threads (or the event
+    loop) making the requests and must be thread-safe and fast.
+
+    Example:
+        >>> class Logging(Instrumentation):
+        ...     def request(self, operation, latency, size, error=None):
+        ...         print(operation, latency, size, error)
+        >>> set_instrumentation(Logging())
+    """
+
+    def request(
+        self,
+        operation: str,
+        latency: float,
+        size: int,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """Called after each SQS request.
+
+        Args:
+            operation: Name of the SQS client method (e.g. send_message_batch).
+            latency: Latency of the request in seconds.
+            size: Number of entries in the request, or the number of messages
+                  requested for receive_message().
+            error: Exception raised by the request, None if it succeeded.
+        """
+
+    def received(self, requested: int, received: int) -> None:
+        """Called after each successful receive_message() request.
+
+        Args:
+            requested: Number of messages requested (MaxNumberOfMessages).
+            received: Number of messages received (0 for an empty receive).
+        """
+
+    def failed(self, operation: str, code: str, retryable: bool) -> None:
+        """Called for each failed entry of a batch request.
+
+        Args:
+            operation: Name of the SQS client method.
+            code: Error code of the failure (e.g. InternalError).
+            retryable: The failure was retryable (SenderFault is False).
+        """
+
+    def retried(self, operation: str, count: int, delay: float) -> None:
+        """Called when failed entries of a batch request are scheduled for a
+        retry.
+
+        Args:
+            operation: Name of the SQS client method.
+            count: Number of entries to retry.
+            delay: Delay (in seconds) before the entries are retried.
+        """
+
+
+_instrumentation = Instrumentation()
+
+
+def get_instrumentation() -> Instrumentation:
+    """Get the installed Instrumentation."""
+    return _instrumentation
+
+
+def set_instrumentation(instrumentation: Optional[Instrumentation]) -> None:
+    """Install an Instrumentation for all SQS requests made by the library.
+
+    Args:
+        instrumentation: Instrumentation to install or None to restore the
+                         default no-op instrumentation.
+    """
+    global _instrumentation  # pylint: disable=global-statement
+    _instrumentation = instrumentation or Instrumentation()
+
+
+class PyformanceInstrumentation(Instrumentation):
+    """Instrumentation that records metrics in a pyformance MetricsRegistry.
+
+    Records the following metrics for each operation (e.g.
+    sqs.send_message_batch.latency):
+
+    * {prefix}.{operation}.requests: meter of requests
+    * {prefix}.{operation}.latency: histogram of request latencies (seconds)
+    * {prefix}.{operation}.errors: counter of requests that raised an error
+    * {prefix}.{operation}.batch_size: histogram of entries (or requested
+      messages) per request
+    * {prefix}.{operation}.failures.{code}: counter of failed entries by code
+    * {prefix}.{operation}.retries: counter of retried entries
+    * {prefix}.receive_message.fill: histogram of received divided by
+      requested messages
+    * {prefix}.receive_message.empty: counter of empty receives
+
+    Requires the pyformance package.
+    """
+
+    def __init__(self, registry: Optional[Any] = None, prefix: str = "sqs"):
+        """Create a PyformanceInstrumentation.
+
+        Args:
+            registry: pyformance MetricsRegistry to record the metrics in.
+                      Optional. Default: pyformance global registry.
+            prefix: Prefix for the metric names. Optional. Default: sqs.
+        """
+        if registry is None:
+            import pyformance  # type: ignore[import-untyped]  # pylint: disable=import-outside-toplevel
+
+            registry = pyformance.global_registry()
+
+        self.registry = registry
+        self.prefix = prefix
+
+    def request(
+        self,
+        operation: str,
+        latency: float,
+        size: int,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        name = f"{self.prefix}.{operation}"
+        self.registry.meter(f"{name}.requests").mark()
+        self.registry.histogram(f"{name}.latency").add(latency)
+        self.registry.histogram(f"{name}.batch_size").add(size)
+        if error is not None:
+            self.registry.counter(f"{name}.errors").inc()
+
+    def received(self, requested: int, received: int) -> None:
+        name = f"{self.prefix}.receive_message"
+        self.registry.histogram(f"{name}.fill").add(received / requested)
+        if not received:
+            self.registry.counter(f"{name}.empty").inc()
+
+    def failed(self, operation: str, code: str, retryable: bool) -> None:
+        self.registry.counter(f"{self.prefix}.{operation}.failures.{code}").inc()
+
+    def retried(self, operation: str, count: int, delay: float) -> None:
+        self.registry.counter(f"{self.prefix}.{operation}.retries").inc(count)
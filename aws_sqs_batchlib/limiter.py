@@ -0,0 +1,165 @@
+"""Adaptive concurrency limiter for Amazon SQS requests"""
+
+import threading
+import time
+from typing import Optional
+
+import botocore.exceptions
+
+THROTTLING_ERROR_CODES = frozenset(
+    ["ThrottlingException", "RequestThrottled", "Throttling", "ThrottledException"]
+)
+"""Error codes of requests that were rejected due to throttling."""
+
+
+class AdaptiveLimiter:
+    """Limit the number of in-flight requests with an AIMD algorithm.
+
+    The limit grows additively (by 1 for each window of `limit` successful
+    requests) while requests succeed with a healthy latency, and shrinks
+    multiplicatively when requests are throttled or fail with retryable
+    errors. The limit is decreased at most once per window of in-flight
+    requests: failures of requests that were started before the previous
+    decrease do not decrease it further.
+
+    A request has a healthy latency if it completes in less than
+    latency_tolerance times the lowest latency observed by the limiter.
+
+    A limiter can be shared by multiple calls and threads to limit their total
+    number of in-flight requests, e.g. when several workers use the same
+    queue.
+
+    Example:
+        >>> limiter = AdaptiveLimiter(max_limit=50)
+        >>> send_message_batch(
+        ...     QueueUrl=queue_url, Entries=entries, max_workers=50, limiter=limiter
+        ... )
+        >>> limiter.limit
+        23
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 2,
+        min_limit: int = 1,
+        max_limit: int = 50,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+    ):
+        """Create an AdaptiveLimiter.
+
+        Args:
+            initial_limit: Initial limit for in-flight requests. Optional.
+                           Default: 2.
+            min_limit: Lowest value of the limit. Optional. Default: 1.
+            max_limit: Highest value of the limit. Optional. Default: 50.
+            backoff: Factor to multiply the limit with when requests are
+                     throttled. Optional. Default: 0.5.
+            latency_tolerance: Requests with a latency of more than
+                               latency_tolerance times the lowest observed
+                               latency do not increase the limit. Optional.
+                               Default: 2.0.
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError(
+                "limits must satisfy 1 <= min_limit <= initial_limit <= max_limit "
+                f"(got {min_limit}, {initial_limit} and {max_limit})"
+            )
+        if not 0 < backoff < 1:
+            raise ValueError(f"backoff must be between 0 and 1 (got {backoff})")
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+
+        self._limit = float(initial_limit)
+        self._inflight = 0
+        self._min_latency: Optional[float] = None
+        self._last_decrease = float("-inf")
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """Current limit for in-flight requests."""
+        with self._cond:
+            return int(self._limit)
+
+    @property
+    def inflight(self) -> int:
+        """Current number of in-flight requests."""
+        with self._cond:
+            return self._inflight
+
+    def acquire(self, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        """Reserve a slot for a request.
+
+        Args:
+            blocking: Wait for a slot to become available if all of them are
+                      in use. Optional. Default: True.
+            timeout: Maximum time to wait for a slot (in seconds). Optional.
+                     Default: no limit.
+
+        Returns: True if a slot was reserved, False otherwise.
+        """
+        with self._cond:
+            if not blocking:
+                timeout = 0
+            if not self._cond.wait_for(
+                lambda: self._inflight < int(self._limit), timeout=timeout
+            ):
+                return False
+
+            self._inflight += 1
+            return True
+
+    def release(
+        self,
+        started: float,
+        throttled: bool = False,
+        latency: Optional[float] = None,
+        succeeded: bool = True,
+    ) -> None:
+        """Release the slot of a completed request and adjust the limit.
+
+        Args:
+            started: Time (time.monotonic()) the request was started at.
+            throttled: The request was throttled or it failed with a retryable
+                       error. Optional. Default: False.
+            latency: Latency of the request (in seconds) or None if latency
+                     of the request does not indicate the health of the
+                     service (e.g. long polls). Optional.
+            succeeded: The request succeeded. Requests that failed for other
+                       reasons than throttling do not change the limit.
+                       Optional. Default: True.
+        """
+        with self._cond:
+            self._inflight -= 1
+            if throttled:
+                if started >= self._last_decrease:
+                    self._limit = max(self._limit * self.backoff, self.min_limit)
+                    self._last_decrease = time.monotonic()
+            elif succeeded and self._healthy(latency):
+                self._limit = min(self._limit + 1 / self._limit, self.max_limit)
+
+            self._cond.notify_all()
+
+    def _healthy(self, latency: Optional[float]) -> bool:
+        """Check if a request latency is healthy. Must be called with the lock
+        of self._cond held."""
+        if latency is None:
+            return True
+
+        if self._min_latency is None or latency < self._min_latency:
+            self._min_latency = latency
+
+        return latency <= self._min_latency * self.latency_tolerance
+
+
+def _is_throttling_error(exc: BaseException) -> bool:
+    """Check if an exception was caused by throttling."""
+    if not isinstance(exc, botocore.exceptions.ClientError):
+        return False
+
+    code = exc.response.get("Error", {}).get("Code", "")
+    return code.rsplit(".", 1)[-1] in THROTTLING_ERROR_CODES
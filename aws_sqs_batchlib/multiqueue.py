@@ -0,0 +1,340 @@
+"""Receiving messages from multiple Amazon SQS queues"""
+
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Union,
+)
+
+import boto3.session
+
+from .aws_sqs_batchlib import (
+    DEFAULT_MAX_POOL_CONNECTIONS,
+    MAX_BATCH_ENTRIES,
+    _BatchReceiver,
+    _iter_pollers,
+    _process_received,
+    create_sqs_client,
+    delete_message_batch,
+)
+from .codec import Codec, _request_attributes
+from .dedup import DuplicateFilter
+from .limiter import AdaptiveLimiter
+
+if TYPE_CHECKING:  # pragma: no cover
+    from mypy_boto3_sqs import SQSClient
+    from mypy_boto3_sqs.type_defs import MessageTypeDef
+
+    from .aws_sqs_batchlib import (
+        DeleteMessageBatchResultTypeDef,
+        ReceiveMessageResultTypeDef,
+    )
+
+
+def receive_message_from_queues(
+    QueueUrls: Union[Sequence[str], Mapping[str, float]],  # pylint: disable=invalid-name
+    sqs_client: Optional["SQSClient"] = None,
+    session: Optional[boto3.session.Session] = None,
+    priority: bool = False,
+    limiter: Optional[AdaptiveLimiter] = None,
+    codec: Optional[Codec] = None,
+    dedup: Optional[DuplicateFilter] = None,
+    **kwargs,
+) -> "ReceiveMessageResultTypeDef":
+    """Receive an arbitrary number of messages from multiple Amazon SQS
+    queues into one batch.
+
+    Polls all queues concurrently until `MaxNumberOfMessages` messages in
+    total have been received or `WaitTimeSeconds` has elapsed. Each queue is
+    polled like with receive_message() (see its documentation for the
+    adaptive long poll duration).
+
+    The batch is shared between the queues by weight. Each queue is
+    guaranteed a share of the batch in proportion to its weight (equal
+    weights if QueueUrls is a sequence). A queue can receive more than its
+    share only when the other queues have no messages: the share of a queue
+    is given up as soon as it returns an empty response, so that empty queues
+    do not hold back busy ones. Queues that have returned an empty response
+    are polled again only when no other queue is returning messages.
+
+    With priority, QueueUrls is in priority order (highest first). A queue
+    is polled only after every queue before it has returned an empty
+    response, i.e. lower priority queues fill the rest of the batch when the
+    higher priority queues have been drained.
+
+    Each received message is tagged with the URL of its queue in the
+    QueueUrl key. Use delete_received_messages() to delete the messages from
+    their queues.
+
+    Args:
+        QueueUrls: URLs of the queues to receive messages from. A sequence of
+                   queue URLs or a mapping from queue URL to its weight.
+        sqs_client: boto3 SQS client to use. Optional. Default: client created
+                    with default session and configuration.
+        session: boto3 Session to use for creating SQS client if sqs_client is
+                 not provided. Optional. Default: boto3 default session.
+        priority: Poll the queues in strict priority order instead of sharing
+                  the batch by weight. Optional. Default: False.
+        limiter: Adaptive limiter for the number of concurrent requests.
+                 Optional. Default: no limiter.
+        codec: Codec for decoding received messages. Optional. Default:
+               messages are returned as they are.
+        dedup: Duplicate filter for removing duplicate deliveries from the
+               received messages. Optional. Default: duplicates are returned.
+        **kwargs: keyword arguments to pass to boto3 SQS receive_message()
+                  method of each queue (except QueueUrl)
+
+    Returns:
+        SQS messages similar to boto3 SQS receive_message() method, with the
+        QueueUrl of each message.
+    """
+    if isinstance(QueueUrls, str):
+        raise ValueError("QueueUrls must be a sequence of queue URLs, not a string")
+    weights = (
+        dict(QueueUrls)
+        if isinstance(QueueUrls, Mapping)
+        else dict.fromkeys(QueueUrls, 1.0)
+    )
+    if not weights:
+        raise ValueError("QueueUrls must not be empty")
+    if any(weight <= 0 for weight in weights.values()):
+        raise ValueError("queue weights must be greater than 0")
+    if "QueueUrl" in kwargs:
+        raise ValueError("use QueueUrls instead of QueueUrl")
+
+    sqs_client = sqs_client or create_sqs_client(
+        session, max(len(weights), DEFAULT_MAX_POOL_CONNECTIONS)
+    )
+
+    if codec is not None:
+        kwargs = _request_attributes(codec.attribute_names, kwargs)
+    if dedup is not None:
+        kwargs = _request_attributes(dedup.attribute_names, kwargs)
+
+    batch_size = kwargs.get("MaxNumberOfMessages", 1)
+    batching_window = kwargs.get("WaitTimeSeconds", 1)
+
+    fan_in = _FanIn(batch_size, batching_window, priority)
+    for queue_url, share in zip(weights, _shares(batch_size, weights.values())):
+        fan_in.receivers.append(
+            _QueueReceiver(
+                fan_in,
+                sqs_client,
+                {**kwargs, "QueueUrl": queue_url},
+                share,
+                limiter,
+            )
+        )
+
+    batch: List["MessageTypeDef"] = []
+    for receiver, messages in _iter_pollers(fan_in.receivers):
+        queue_url = receiver.request["QueueUrl"]
+        messages = _process_received(
+            messages, receiver.request, sqs_client, codec, dedup
+        )
+        for message in messages:
+            message["QueueUrl"] = queue_url  # type: ignore[typeddict-unknown-key]
+        batch.extend(messages)
+
+    return {"Messages": batch}
+
+
+def delete_received_messages(
+    messages: Iterable["MessageTypeDef"],
+    sqs_client: Optional["SQSClient"] = None,
+    session: Optional[boto3.session.Session] = None,
+    max_workers: int = 1,
+    codec: Optional[Codec] = None,
+) -> Dict[str, "DeleteMessageBatchResultTypeDef"]:
+    """Delete messages received with receive_message_from_queues() from their
+    queues.
+
+    Groups the messages by their QueueUrl and deletes the messages of each
+    queue with delete_message_batch(). The Id of each delete entry is the
+    index of the message in the given messages.
+
+    Args:
+        messages: Messages to delete, tagged with the QueueUrl they were
+                  received from.
+        sqs_client: boto3 SQS client to use. Optional. Default: client created
+                    with default session and configuration.
+        session: boto3 Session to use for creating SQS client if sqs_client is
+                 not provided. Optional. Default: boto3 default session.
+        max_workers: Maximum number of delete_message_batch() requests to have
+                     in flight concurrently per queue. Optional. Default: 1.
+        codec: Codec that decoded the messages. Optional.
+
+    Returns:
+        Results similar to boto3 SQS delete_message_batch() method by queue
+        URL.
+    """
+    entries: Dict[str, List[Any]] = {}
+    for i, message in enumerate(messages):
+        queue_url = message["QueueUrl"]  # type: ignore[typeddict-item]
+        entries.setdefault(queue_url, []).append(
+            {"Id": str(i), "ReceiptHandle": message["ReceiptHandle"]}
+        )
+
+    return {
+        queue_url: delete_message_batch(
+            QueueUrl=queue_url,
+            Entries=queue_entries,
+            sqs_client=sqs_client,
+            session=session,
+            max_workers=max_workers,
+            codec=codec,
+        )
+        for queue_url, queue_entries in entries.items()
+    }
+
+
+class _FanIn:
+    """Helper for sharing a batch of messages between the receivers of
+    multiple queues."""
+
+    def __init__(self, batch_size: int, batching_window: float, priority: bool):
+        self.batch_size = batch_size
+        self.batching_window = batching_window
+        self.priority = priority
+        self.receivers: List["_QueueReceiver"] = []
+        self.received = 0
+        self.reserved = 0
+        self.cond = threading.Condition()
+
+    def available(self, receiver: "_QueueReceiver") -> Optional[int]:
+        """Number of messages the given receiver can reserve, None if the
+        remaining messages have been reserved or are held for other queues.
+
+        Must be called with the lock of self.cond held.
+        """
+        if not self._eligible(receiver):
+            return None
+        if receiver.drained and any(
+            not other.drained and self._eligible(other)
+            for other in self.receivers
+            if other is not receiver
+        ):
+            # Drained queues poll only when no other queue is returning
+            # messages so that their long polls do not hold back busy queues
+            return None
+
+        free = self.batch_size - self.received - self.reserved
+        if not self.priority:
+            free -= sum(
+                other.claim for other in self.receivers if other is not receiver
+            )
+
+        if free <= 0:
+            return None
+        return min(free, MAX_BATCH_ENTRIES)
+
+    def _eligible(self, receiver: "_QueueReceiver") -> bool:
+        """Whether the receiver may poll, i.e. all higher priority queues
+        have been drained (always with weights)."""
+        if not self.priority:
+            return True
+        index = self.receivers.index(receiver)
+        return all(other.drained for other in self.receivers[:index])
+
+
+class _QueueReceiver(_BatchReceiver):
+    """Helper for receiving messages from one of the queues that share a
+    batch.
+
+    The receiver claims messages up to its share of the batch until it is
+    drained, i.e. its queue returns an empty response or it stops polling.
+    """
+
+    def __init__(
+        self,
+        fan_in: _FanIn,
+        sqs_client: "SQSClient",
+        request: dict,
+        share: int,
+        limiter: Optional[AdaptiveLimiter] = None,
+    ):
+        super().__init__(
+            sqs_client, request, fan_in.batch_size, fan_in.batching_window, limiter
+        )
+        self.fan_in = fan_in
+        self.cond = fan_in.cond
+        self.share = share
+        self.received = 0
+        self.finished = False
+
+    @property
+    def drained(self) -> bool:
+        """Whether the queue has returned an empty response since it last
+        returned messages."""
+        return self.finished or self.empty_receives > 0
+
+    @property
+    def claim(self) -> int:
+        """Number of messages held for this queue."""
+        if self.drained:
+            return 0
+        return max(self.share - self.received - self.reserved, 0)
+
+    def iter_poll(self) -> Iterator[List["MessageTypeDef"]]:
+        try:
+            yield from super().iter_poll()
+        finally:
+            with self.cond:
+                self._finish()
+
+    def try_reserve(self) -> Optional[int]:
+        remaining = self.deadline - time.time()
+        if remaining <= 0 or self.fan_in.received >= self.batch_size:
+            return self._finish()
+        if remaining < 1 and self.empty_receives:
+            return self._finish()
+
+        count = self.fan_in.available(self)
+        if count is not None:
+            self.reserved += count
+            self.fan_in.reserved += count
+        return count
+
+    def _finish(self) -> int:
+        """Stop polling and give up the claim of the receiver.
+
+        Must be called with the lock of self.cond held.
+        """
+        self.finished = True
+        self.cond.notify_all()
+        return 0
+
+    def complete(self, count: int, messages: List["MessageTypeDef"]) -> None:
+        self.reserved -= count
+        self.received += len(messages)
+        self.fan_in.reserved -= count
+        self.fan_in.received += len(messages)
+        self.empty_receives = 0 if messages else self.empty_receives + 1
+
+    def cancel(self, count: int) -> None:
+        self.reserved -= count
+        self.fan_in.reserved -= count
+
+
+def _shares(batch_size: int, weights: Iterable[float]) -> List[int]:
+    """Helper to divide a batch between queues in proportion to their weights
+    (largest remainder method)."""
+    weights = list(weights)
+    total = sum(weights)
+    exact = [batch_size * weight / total for weight in weights]
+    shares = [int(share) for share in exact]
+    by_remainder = sorted(
+        range(len(weights)), key=lambda i: exact[i] - shares[i], reverse=True
+    )
+    for i in by_remainder[: batch_size - sum(shares)]:
+        shares[i] += 1
+    return shares
@@ -0,0 +1,437 @@
+"""Offloading of large message bodies to Amazon S3"""
+
+import collections
+import concurrent.futures
+import io
+import json
+import logging
+import uuid
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    ItemsView,
+    Iterable,
+    Iterator,
+    KeysView,
+    List,
+    Optional,
+    Tuple,
+    ValuesView,
+)
+
+import boto3.session
+
+from .aws_sqs_batchlib import MAX_BATCH_ENTRIES, MAX_PAYLOAD_SIZE, _message_size
+from .codec import MAX_MESSAGE_ATTRIBUTES, Codec, _FailedEntry
+
+if TYPE_CHECKING:  # pragma: no cover
+    from mypy_boto3_s3 import S3Client
+    from mypy_boto3_sqs.type_defs import (
+        MessageTypeDef,
+        SendMessageBatchRequestEntryTypeDef,
+    )
+
+logger = logging.getLogger(__name__)
+
+POINTER_CLASS = "software.amazon.payloadoffloading.PayloadS3Pointer"
+"""Class name of S3 pointers in message bodies (Amazon SQS Extended Client)."""
+
+PAYLOAD_SIZE_ATTRIBUTE = "ExtendedPayloadSize"
+"""Message attribute with the size of an offloaded body."""
+
+LEGACY_PAYLOAD_SIZE_ATTRIBUTE = "SQSLargePayloadSize"
+"""Message attribute with the size of an offloaded body (older clients)."""
+
+DEFAULT_THRESHOLD = MAX_PAYLOAD_SIZE // MAX_BATCH_ENTRIES
+"""Default size of messages (in bytes) that are offloaded to S3."""
+
+UPLOAD_FAILED = "S3UploadFailed"
+"""Error code of send message entries whose body failed to upload to S3."""
+
+_BUCKET_MARKER = "-..s3BucketName..-"
+_KEY_MARKER = "-..s3Key..-"
+
+
+class S3OffloadCodec(Codec):
+    """Codec that stores large message bodies in Amazon S3.
+
+    Messages larger than threshold bytes (body and message attributes) are
+    uploaded to an S3 bucket and sent as compact pointer messages, so that
+    large messages fit into SQS and ten pointers still fit in one batch
+    request. Uploads are made concurrently and large bodies are uploaded in
+    parts. The pointers use the format of the Amazon SQS Extended Client
+    Library for Java (and Python), so messages can be exchanged with
+    applications using those libraries.
+
+    Received pointer messages are resolved by downloading their bodies from S3
+    concurrently. With lazy=True, the body of a pointer message is downloaded
+    when it is first accessed with message["Body"] instead.
+
+    The receipt handles of resolved messages embed the location of the S3
+    object like in the Extended Client Library. Pass the codec to
+    delete_message_batch() and change_message_visibility_batch() (or to
+    Acknowledger, Consumer and VisibilityHeartbeat) so that they use the
+    original receipt handles. With delete_objects=True, delete_message_batch()
+    deletes the S3 objects of deleted messages.
+
+    Example:
+        >>> codec = S3OffloadCodec("my-bucket", delete_objects=True)
+        >>> send_message_batch(QueueUrl=queue_url, Entries=entries, codec=codec)
+        >>> res = receive_message(QueueUrl=queue_url, codec=codec)
+        >>> delete_message_batch(QueueUrl=queue_url, Entries=entries, codec=codec)
+    """
+
+    attribute_names = [PAYLOAD_SIZE_ATTRIBUTE, LEGACY_PAYLOAD_SIZE_ATTRIBUTE]
+
+    def __init__(
+        self,
+        bucket: str,
+        s3_client: Optional["S3Client"] = None,
+        session: Optional[boto3.session.Session] = None,
+        threshold: int = DEFAULT_THRESHOLD,
+        prefix: str = "",
+        max_workers: int = 10,
+        lazy: bool = False,
+        delete_objects: bool = False,
+    ):
+        """Create an S3OffloadCodec.
+
+        Args:
+            bucket: Name of the S3 bucket to store message bodies in.
+            s3_client: boto3 S3 client to use. Optional. Default: client
+                       created with session.
+            session: boto3 Session to use for creating S3 client if s3_client
+                     is not provided. Optional. Default: boto3 default session.
+            threshold: Messages larger than this (in bytes) are offloaded to
+                       S3. Use 0 to offload all messages. Optional. Default:
+                       102 KiB, which keeps batches of 10 messages within the
+                       1 MiB payload limit.
+            prefix: Prefix for the keys of S3 objects. Optional. Default: no
+                    prefix.
+            max_workers: Maximum number of concurrent uploads and downloads.
+                         Optional. Default: 10.
+            lazy: Download bodies when they are first accessed instead of in
+                  receive_message(). Optional. Default: False.
+            delete_objects: Delete the S3 objects of messages deleted with
+                            delete_message_batch(). Optional. Default: False.
+        """
+        if max_workers < 1:
+            raise ValueError(f"max_workers must be 1 or greater (got {max_workers})")
+
+        self.bucket = bucket
+        self.s3_client = s3_client or (session or boto3.session.Session()).client("s3")
+        self.threshold = threshold
+        self.prefix = prefix
+        self.max_workers = max_workers
+        self.lazy = lazy
+        self.delete_objects = delete_objects
+
+    def encode(
+        self, entry: "SendMessageBatchRequestEntryTypeDef"
+    ) -> "SendMessageBatchRequestEntryTypeDef":
+        if not self._should_offload(entry):
+            return entry
+        return self._offload(entry)
+
+    def encode_all(
+        self, entries: Iterable["SendMessageBatchRequestEntryTypeDef"]
+    ) -> Iterator["SendMessageBatchRequestEntryTypeDef"]:
+        """Encode send message entries, uploading up-to max_workers bodies
+        concurrently. Entries are consumed lazily and returned in order.
+
+        Entries whose body fails to upload are failed with code
+        S3UploadFailed by send_message_batch() instead of being sent.
+        """
+        with concurrent.futures.ThreadPoolExecutor(self.max_workers) as executor:
+            pending: Deque[Tuple[Any, Any]] = collections.deque()
+            for entry in entries:
+                if self._should_offload(entry):
+                    pending.append((entry, executor.submit(self._offload, entry)))
+                else:
+                    pending.append((entry, entry))
+
+                if len(pending) >= self.max_workers:
+                    yield _result(*pending.popleft())
+
+            while pending:
+                yield _result(*pending.popleft())
+
+    def decode(self, message: "MessageTypeDef") -> "MessageTypeDef":
+        return self.decode_all([message])[0]
+
+    def decode_all(self, messages: List["MessageTypeDef"]) -> List["MessageTypeDef"]:
+        """Resolve pointer messages by downloading their bodies from S3
+        concurrently (or lazily)."""
+        pointers = {
+            i: pointer
+            for i, message in enumerate(messages)
+            if (pointer := _parse_pointer(message)) is not None
+        }
+        res: List[Any] = list(messages)
+        if self.lazy:
+            for i, pointer in pointers.items():
+                resolved = _resolved(messages[i], pointer)
+                res[i] = _LazyMessage(resolved, self._download, pointer)
+            return res
+
+        bodies: Dict[int, Optional[str]] = {}
+        if len(pointers) == 1:
+            bodies = {
+                i: self._try_download(messages[i], p) for i, p in pointers.items()
+            }
+        elif pointers:
+            workers = min(self.max_workers, len(pointers))
+            with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+                futures = {
+                    i: executor.submit(self._try_download, messages[i], pointer)
+                    for i, pointer in pointers.items()
+                }
+                bodies = {i: future.result() for i, future in futures.items()}
+
+        for i, body in bodies.items():
+            if body is not None:
+                res[i] = {**_resolved(messages[i], pointers[i]), "Body": body}
+        return res
+
+    def receipt_handle(self, receipt_handle: str) -> str:
+        parsed = _parse_receipt_handle(receipt_handle)
+        return receipt_handle if parsed is None else parsed[2]
+
+    def deleted(self, receipt_handles: List[str]) -> None:
+        """Delete the S3 objects of deleted messages if delete_objects is
+        set."""
+        if not self.delete_objects:
+            return
+
+        keys: Dict[str, List[str]] = collections.defaultdict(list)
+        for receipt_handle in receipt_handles:
+            parsed = _parse_receipt_handle(receipt_handle)
+            if parsed is not None:
+                keys[parsed[0]].append(parsed[1])
+
+        for bucket, bucket_keys in keys.items():
+            for i in range(0, len(bucket_keys), 1000):
+                chunk = bucket_keys[i : i + 1000]
+                try:
+                    res = self.s3_client.delete_objects(
+                        Bucket=bucket,
+                        Delete={
+                            "Objects": [{"Key": key} for key in chunk],
+                            "Quiet": True,
+                        },
+                    )
+                except Exception:  # pylint: disable=broad-exception-caught
+                    logger.exception(
+                        "Failed to delete %i objects from %s", len(chunk), bucket
+                    )
+                    continue
+
+                for error in res.get("Errors", []):
+                    logger.warning(
+                        "Failed to delete s3://%s/%s: %s (%s)",
+                        bucket,
+                        error.get("Key"),
+                        error.get("Message"),
+                        error.get("Code"),
+                    )
+
+    def _should_offload(self, entry: "SendMessageBatchRequestEntryTypeDef") -> bool:
+        attributes = entry.get("MessageAttributes", {})
+        return (
+            _message_size(entry) > self.threshold
+            and PAYLOAD_SIZE_ATTRIBUTE not in attributes
+            and len(attributes) < MAX_MESSAGE_ATTRIBUTES
+        )
+
+    def _offload(
+        self, entry: "SendMessageBatchRequestEntryTypeDef"
+    ) -> "SendMessageBatchRequestEntryTypeDef":
+        """Upload the body of an entry to S3 and replace it with a pointer."""
+        body = entry["MessageBody"].encode("utf-8")
+        key = f"{self.prefix}{uuid.uuid4()}"
+        # upload_fileobj() uploads large bodies in parts concurrently
+        self.s3_client.upload_fileobj(io.BytesIO(body), self.bucket, key)
+
+        pointer = [POINTER_CLASS, {"s3BucketName": self.bucket, "s3Key": key}]
+        return {
+            **entry,
+            "MessageBody": json.dumps(pointer, separators=(",", ":")),
+            "MessageAttributes": {
+                **entry.get("MessageAttributes", {}),
+                PAYLOAD_SIZE_ATTRIBUTE: {
+                    "DataType": "Number",
+                    "StringValue": str(len(body)),
+                },
+            },
+        }
+
+    def _download(self, pointer: Tuple[str, str]) -> str:
+        """Download a message body from S3."""
+        buffer = io.BytesIO()
+        self.s3_client.download_fileobj(pointer[0], pointer[1], buffer)
+        return buffer.getvalue().decode("utf-8")
+
+    def _try_download(
+        self, message: "MessageTypeDef", pointer: Tuple[str, str]
+    ) -> Optional[str]:
+        """Download a message body, logging errors."""
+        try:
+            return self._download(pointer)
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception(
+                "Failed to download body of message %s from s3://%s/%s",
+                message.get("MessageId"),
+                *pointer,
+            )
+            return None
+
+
+class _LazyMessage(dict):
+    """Message whose body is downloaded from S3 when first accessed.
+
+    Iterating, copying and comparing the message download the body as well so
+    that copies and serializations of the message include it.
+    """
+
+    def __init__(
+        self,
+        message: Any,
+        download: Callable[[Tuple[str, str]], str],
+        pointer: Tuple[str, str],
+    ):
+        super().__init__(message)
+        del self["Body"]
+        self._download = download
+        self._pointer = pointer
+
+    def __missing__(self, key: str) -> Any:
+        if key != "Body":
+            raise KeyError(key)
+        self["Body"] = body = self._download(self._pointer)
+        return body
+
+    def _load(self) -> None:
+        """Download the body if it has not been downloaded yet."""
+        if not super().__contains__("Body"):
+            self.__missing__("Body")
+
+    def __contains__(self, key: object) -> bool:
+        return key == "Body" or super().__contains__(key)
+
+    def get(self, key: str, default: Any = None) -> Any:  # type: ignore[override]
+        if key == "Body":
+            return self[key]
+        return super().get(key, default)
+
+    def __iter__(self) -> Iterator[str]:
+        self._load()
+        return super().__iter__()
+
+    def __len__(self) -> int:
+        self._load()
+        return super().__len__()
+
+    def __repr__(self) -> str:
+        self._load()
+        return super().__repr__()
+
+    def __eq__(self, other: object) -> bool:
+        self._load()
+        return super().__eq__(other)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def keys(self) -> KeysView[str]:  # type: ignore[override]
+        self._load()
+        return super().keys()
+
+    def values(self) -> ValuesView[Any]:  # type: ignore[override]
+        self._load()
+        return super().values()
+
+    def items(self) -> ItemsView[str, Any]:  # type: ignore[override]
+        self._load()
+        return super().items()
+
+    def copy(self) -> Dict[str, Any]:
+        self._load()
+        return dict(super().items())
+
+
+def _parse_pointer(message: "MessageTypeDef") -> Optional[Tuple[str, str]]:
+    """Helper to parse the S3 bucket and key of a pointer message.
+
+    Returns: bucket and key, or None if the message is not a pointer.
+    """
+    attributes = message.get("MessageAttributes", {})
+    if (
+        PAYLOAD_SIZE_ATTRIBUTE not in attributes
+        and LEGACY_PAYLOAD_SIZE_ATTRIBUTE not in attributes
+    ):
+        return None
+
+    try:
+        name, pointer = json.loads(message["Body"])
+        if name == POINTER_CLASS:
+            return pointer["s3BucketName"], pointer["s3Key"]
+    except (TypeError, ValueError, KeyError):
+        pass
+
+    logger.warning("Message %s has an invalid S3 pointer", message.get("MessageId"))
+    return None
+
+
+def _resolved(message: "MessageTypeDef", pointer: Tuple[str, str]) -> Any:
+    """Helper to build a resolved message without the payload size attribute
+    and with the S3 object embedded in the receipt handle."""
+    res: Any = {
+        **message,
+        "ReceiptHandle": (
+            f"{_BUCKET_MARKER}{pointer[0]}{_BUCKET_MARKER}"
+            f"{_KEY_MARKER}{pointer[1]}{_KEY_MARKER}{message['ReceiptHandle']}"
+        ),
+    }
+    attributes = {
+        name: value
+        for name, value in message.get("MessageAttributes", {}).items()
+        if name not in (PAYLOAD_SIZE_ATTRIBUTE, LEGACY_PAYLOAD_SIZE_ATTRIBUTE)
+    }
+    if attributes:
+        res["MessageAttributes"] = attributes
+    else:
+        res.pop("MessageAttributes", None)
+    return res
+
+
+def _parse_receipt_handle(receipt_handle: str) -> Optional[Tuple[str, str, str]]:
+    """Helper to parse a receipt handle with an embedded S3 object.
+
+    Returns: bucket, key and SQS receipt handle, or None if the receipt
+        handle has no embedded S3 object.
+    """
+    if not receipt_handle.startswith(_BUCKET_MARKER):
+        return None
+
+    _, bucket, rest = receipt_handle.split(_BUCKET_MARKER, 2)
+    if not rest.startswith(_KEY_MARKER):
+        return None
+
+    _, key, sqs_receipt_handle = rest.split(_KEY_MARKER, 2)
+    return bucket, key, sqs_receipt_handle
+
+
+def _result(entry: Any, item: Any) -> Any:
+    """Helper to get the encoded entry from the future of an upload or a plain
+    value. Entries whose upload failed are returned as failed entries."""
+    if not isinstance(item, concurrent.futures.Future):
+        return item
+    try:
+        return item.result()
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        logger.warning("Failed to upload body of entry %s to S3: %s", entry["Id"], exc)
+        return _FailedEntry(
+            entry, UPLOAD_FAILED, f"Failed to upload message body to S3: {exc}"
+        )
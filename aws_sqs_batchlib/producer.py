@@ -0,0 +1,120 @@
+"""Auto-batching producer for Amazon SQS queues"""
+
+import concurrent.futures
+import functools
+from typing import TYPE_CHECKING, Optional
+
+import boto3.session
+
+from .aws_sqs_batchlib import (
+    DEFAULT_MAX_POOL_CONNECTIONS,
+    _message_size,
+    create_sqs_client,
+    send_message_batch,
+)
+from .batcher import _Batcher
+from .codec import Codec
+from .retry import RetryPolicy
+
+if TYPE_CHECKING:  # pragma: no cover
+    from mypy_boto3_sqs import SQSClient
+
+
+class Producer(_Batcher):
+    """Send individual messages to an Amazon SQS queue in batches.
+
+    Producer is a thread-safe buffer that collects messages sent from one or
+    more threads into batches and sends them with send_message_batch() in the
+    background. Full batches (10 messages or 1 MiB of payload) are sent right
+    away. Partial batches are sent once the oldest message has waited for
+    `linger` seconds, or when flush() or close() is called.
+
+    send() returns a Future right away. The Future resolves to the Successful
+    result entry of the message (with MessageId) or fails with BatchEntryError
+    if SQS rejected the message. If max_pending messages are already waiting
+    to be sent, send() blocks until there is room in the buffer.
+
+    Example:
+        >>> with Producer(queue_url) as producer:
+        ...     future = producer.send(MessageBody="hello")
+        >>> future.result()["MessageId"]
+        '7d0e8a7a-...'
+    """
+
+    def __init__(
+        self,
+        queue_url: str,
+        sqs_client: Optional["SQSClient"] = None,
+        session: Optional[boto3.session.Session] = None,
+        linger: float = 0.05,
+        max_pending: int = 10000,
+        max_workers: int = 1,
+        retry_policy: Optional[RetryPolicy] = None,
+        codec: Optional[Codec] = None,
+        fifo: bool = False,
+    ):
+        """Create a Producer.
+
+        Args:
+            queue_url: URL of the queue to send messages to.
+            sqs_client: boto3 SQS client to use. Optional. Default: client
+                        created with default session and configuration.
+            session: boto3 Session to use for creating SQS client if
+                     sqs_client is not provided. Optional. Default: boto3
+                     default session.
+            linger: Maximum time (in seconds) to wait for a batch to fill up
+                    before sending a partial batch. Optional. Default: 0.05.
+            max_pending: Maximum number of messages waiting to be sent before
+                         send() blocks. Optional. Default: 10000.
+            max_workers: Maximum number of send_message_batch() requests to
+                         have in flight concurrently. Optional. Default: 1.
+                         With FIFO queues, use the default or set
+                         fifo=True as concurrent requests do not retain
+                         message order otherwise.
+            retry_policy: Retry policy for messages that fail with a retryable
+                          error. Optional. Default: RetryPolicy().
+            codec: Codec for encoding the messages before they are sent, e.g.
+                   CompressionCodec. Optional. Default: messages are sent as
+                   they are.
+            fifo: Send different message groups concurrently while keeping
+                  the messages of each message group in order (see
+                  send_message_batch()). Optional. Default: False.
+        """
+        self.queue_url = queue_url
+        self.sqs_client = sqs_client or create_sqs_client(
+            session, max(max_workers, DEFAULT_MAX_POOL_CONNECTIONS)
+        )
+        super().__init__(
+            functools.partial(
+                send_message_batch,
+                QueueUrl=queue_url,
+                sqs_client=self.sqs_client,
+                max_workers=max_workers,
+                retry_policy=retry_policy,
+                codec=codec,
+                fifo=fifo,
+            ),
+            linger,
+            max_pending=max_pending,
+            entry_size=_message_size,
+        )
+
+    def __enter__(self) -> "Producer":
+        return self
+
+    def send(
+        self,
+        MessageBody: str,  # pylint: disable=invalid-name
+        **kwargs,
+    ) -> concurrent.futures.Future:
+        """Send a message to the queue.
+
+        Args:
+            MessageBody: Body of the message.
+            **kwargs: Other attributes of the message, e.g. DelaySeconds,
+                      MessageAttributes or MessageGroupId (same as in
+                      send_message_batch() entries).
+
+        Returns: Future for the result of the send.
+        """
+        return self._submit({**kwargs, "MessageBody": MessageBody})
@@ -0,0 +1,141 @@
+"""Retry policy for retryable failures of Amazon SQS batch requests"""
+
+import random
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover
+    from mypy_boto3_sqs.type_defs import BatchResultErrorEntryTypeDef
+
+RETRIES_EXHAUSTED = "RetriesExhausted"
+"""Error code of entries that failed because they ran out of retries."""
+
+
+class RetryPolicy:
+    """Retry policy for entries that fail with a retryable error.
+
+    Batch requests may fail for some of their entries with a server-side
+    error (SenderFault is False). Such entries are retried after a delay
+    that grows exponentially with the number of attempts made for the entry.
+    The delay is randomized with full jitter, i.e. the delay before attempt
+    n + 1 is a random value between 0 and min(max_delay, base_delay * 2 **
+    (n - 1)) seconds.
+
+    Entries that fail max_attempts times, or fail after the retry budget of
+    the call has been used up, are returned in Failed with code
+    RetriesExhausted.
+
+    Example:
+        >>> send_message_batch(
+        ...     QueueUrl=queue_url,
+        ...     Entries=entries,
+        ...     retry_policy=RetryPolicy(max_attempts=3, budget=100),
+        ... )
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 10,
+        base_delay: float = 0.05,
+        max_delay: float = 5.0,
+        budget: Optional[int] = None,
+    ):
+        """Create a RetryPolicy.
+
+        Args:
+            max_attempts: Maximum number of attempts (including the first one)
+                          for each entry. Optional. Default: 10.
+            base_delay: Maximum delay (in seconds) before the first retry.
+                        Optional. Default: 0.05.
+            max_delay: Maximum delay (in seconds) before any retry. Optional.
+                       Default: 5.0.
+            budget: Maximum number of entry retries in a single call. Optional.
+                    Default: no limit (only limited by max_attempts).
+        """
+        if max_attempts < 1:
+            raise ValueError(f"max_attempts must be 1 or greater (got {max_attempts})")
+        if base_delay < 0 or max_delay < 0:
+            raise ValueError(
+                f"delays must not be negative (got {base_delay} and {max_delay})"
+            )
+        if budget is not None and budget < 0:
+            raise ValueError(f"budget must not be negative (got {budget})")
+
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+
+    def delay(self, attempt: int) -> float:
+        """Delay (in seconds) before retrying an entry that has failed attempt
+        times."""
+        # Jitter only, not used for security
+        return random.uniform(  # nosec B311
+            0, min(self.max_delay, self.base_delay * 2 ** min(attempt - 1, 32))
+        )
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+"""Retry policy used if the caller does not provide one."""
+
+
+class _RetryState:
+    """Helper for tracking retries of entries during a single call."""
+
+    def __init__(self, policy: RetryPolicy):
+        self.policy = policy
+        self.retries = 0
+        # Map from id() of an entry to the entry and the number of attempts
+        # made for it. The entry is kept alive so that its id is not reused.
+        self.attempts: Dict[int, Tuple[Any, int]] = {}
+
+    def schedule(
+        self,
+        entries: Sequence[Any],
+        failures: Sequence["BatchResultErrorEntryTypeDef"],
+    ) -> Tuple[List[Any], List["BatchResultErrorEntryTypeDef"], float]:
+        """Decide which failed entries to retry and when.
+
+        Args:
+            entries: entries that failed with a retryable error
+            failures: failed result entries of the request
+
+        Returns: tuple with (retry, exhausted, delay) where retry contains the
+            entries to retry after delay seconds and exhausted contains
+            failure results for entries that ran out of retries.
+        """
+        failure_map = {failure["Id"]: failure for failure in failures}
+        retry: List[Any] = []
+        exhausted: List["BatchResultErrorEntryTypeDef"] = []
+        max_attempt = 0
+        for entry in entries:
+            attempt = self.attempts.get(id(entry), (entry, 1))[1]
+            out_of_budget = (
+                self.policy.budget is not None and self.retries >= self.policy.budget
+            )
+            if attempt >= self.policy.max_attempts or out_of_budget:
+                self.attempts.pop(id(entry), None)
+                exhausted.append(
+                    _exhausted_failure(entry, attempt, failure_map.get(entry["Id"]))
+                )
+                continue
+
+            self.retries += 1
+            self.attempts[id(entry)] = (entry, attempt + 1)
+            max_attempt = max(max_attempt, attempt)
+            retry.append(entry)
+
+        delay = self.policy.delay(max_attempt) if retry else 0.0
+        return retry, exhausted, delay
+
+
+def _exhausted_failure(
+    entry: Any, attempts: int, failure: Optional["BatchResultErrorEntryTypeDef"]
+) -> "BatchResultErrorEntryTypeDef":
+    """Helper to build a failure result for an entry that ran out of retries."""
+    reason = f"{failure['Code']}: {failure.get('Message', '')}" if failure else ""
+    return {
+        "Id": entry["Id"],
+        "SenderFault": False,
+        "Code": RETRIES_EXHAUSTED,
+        "Message": f"Gave up after {attempts} attempts. Last error: {reason}",
+    }
@@ -0,0 +1,381 @@
+"""Fault-injecting in-memory Amazon SQS client for tests and benchmarks"""
+
+import bisect
+import collections
+import hashlib
+import heapq
+import random
+import threading
+import time
+import uuid
+from typing import Any, Deque, Dict, List, Mapping, Optional, Set, Tuple, Union
+
+import botocore.exceptions
+
+from .aws_sqs_batchlib import MAX_BATCH_ENTRIES, MAX_PAYLOAD_SIZE, _message_size
+
+
+class _Message:
+    """A message stored in a fake queue."""
+
+    def __init__(self, body: str, attributes: Dict[str, Any], visible_at: float):
+        self.message_id = str(uuid.uuid4())
+        self.body = body
+        self.md5 = hashlib.md5(body.encode("utf-8"), usedforsecurity=False).hexdigest()
+        self.attributes = attributes
+        self.sent_at = time.time()
+        self.visible_at = visible_at
+        self.available = False
+        self.receive_count = 0
+        self.receipt_handles: Set[str] = set()
+
+
+class _Queue:
+    """State of a fake queue.
+
+    Visible messages are kept in `available` in the order they became
+    visible. Delayed and in-flight messages are kept in the `invisible` heap
+    until they become visible. Deleted messages and stale heap entries are
+    skipped lazily.
+    """
+
+    def __init__(self, visibility_timeout: float):
+        self.visibility_timeout = visibility_timeout
+        self.messages: Dict[str, _Message] = {}
+        self.available: Deque[_Message] = collections.deque()
+        self.invisible: List[Tuple[float, int, _Message]] = []
+        self.receipt_handles: Dict[str, _Message] = {}
+        self.seq = 0
+
+    def hide(self, message: _Message, visible_at: float) -> None:
+        message.visible_at = visible_at
+        self.seq += 1
+        heapq.heappush(self.invisible, (visible_at, self.seq, message))
+
+    def show(self, message: _Message) -> None:
+        if not message.available:
+            message.available = True
+            self.available.append(message)
+
+    def promote(self, now: float) -> Optional[float]:
+        """Make messages visible whose delay or visibility timeout expired.
+
+        Returns: time when the next invisible message becomes visible, or None
+            if there are no invisible messages.
+        """
+        while self.invisible:
+            visible_at, _, message = self.invisible[0]
+            if visible_at > now:
+                return visible_at
+            heapq.heappop(self.invisible)
+            if message.message_id in self.messages and message.visible_at == visible_at:
+                self.show(message)
+        return None
+
+    def delete(self, message: _Message) -> None:
+        self.messages.pop(message.message_id, None)
+        for receipt_handle in message.receipt_handles:
+            self.receipt_handles.pop(receipt_handle, None)
+
+
+class FakeSQSClient:
+    """In-memory stand-in for a boto3 SQS client with fault injection.
+
+    FakeSQSClient implements the SQS client methods used by the library
+    (send_message_batch, delete_message_batch, change_message_visibility_batch
+    and receive_message) without network access, so that retries and
+    concurrency can be exercised under load in tests and benchmarks. It is
+    thread-safe and can be passed as the sqs_client of any function or class
+    of the library, including aws_sqs_batchlib.aio.
+
+    Messages are delivered at least once like with a standard queue: received
+    messages become visible again after the visibility timeout unless they are
+    deleted, and with duplicate_rate > 0 messages may be delivered again while
+    they are still in flight.
+
+    Faults are injected at random with the configured rates:
+
+    * Requests are delayed by a latency sampled from the given percentiles.
+    * Requests fail with a ThrottlingException ClientError (throttle_rate).
+    * Entries of batch requests fail with a retryable InternalError
+      (SenderFault is False) (failure_rate).
+    * Received messages are delivered again (duplicate_rate).
+
+    Example:
+        >>> sqs = FakeSQSClient(latency={50: 0.01, 99: 0.2}, failure_rate=0.05)
+        >>> queue_url = sqs.create_queue(QueueName="test")["QueueUrl"]
+        >>> send_message_batch(QueueUrl=queue_url, Entries=entries, sqs_client=sqs)
+    """
+
+    def __init__(
+        self,
+        latency: Union[float, Mapping[float, float]] = 0.0,
+        throttle_rate: float = 0.0,
+        failure_rate: float = 0.0,
+        duplicate_rate: float = 0.0,
+        visibility_timeout: float = 30.0,
+        seed: Optional[int] = None,
+    ):
+        """Create a FakeSQSClient.
+
+        Args:
+            latency: Latency of each request in seconds, or a mapping from
+                     percentiles (0 to 100) to latencies in seconds from which
+                     the latency of each request is interpolated, e.g. {50:
+                     0.01, 99: 0.1}. Optional. Default: 0.
+            throttle_rate: Fraction of requests that fail with a throttling
+                           error. Optional. Default: 0.
+            failure_rate: Fraction of batch request entries that fail with a
+                          retryable error. Optional. Default: 0.
+            duplicate_rate: Fraction of received messages that are delivered
+                            again to the next receive. Optional. Default: 0.
+            visibility_timeout: Default visibility timeout of the queues in
+                                seconds. Optional. Default: 30.
+            seed: Seed for the random number generator. Optional. Default:
+                  random seed.
+        """
+        for name, rate in [
+            ("throttle_rate", throttle_rate),
+            ("failure_rate", failure_rate),
+            ("duplicate_rate", duplicate_rate),
+        ]:
+            if not 0 <= rate <= 1:
+                raise ValueError(f"{name} must be between 0 and 1 (got {rate})")
+
+        if isinstance(latency, Mapping):
+            points = sorted(latency.items())
+            if not points or any(not 0 <= p <= 100 for p, _ in points):
+                raise ValueError(f"latency percentiles must be 0 to 100 ({latency})")
+            self._percentiles = [p for p, _ in points]
+            self._latencies = [value for _, value in points]
+        else:
+            self._percentiles, self._latencies = [0.0], [latency]
+
+        self.throttle_rate = throttle_rate
+        self.failure_rate = failure_rate
+        self.duplicate_rate = duplicate_rate
+        self.visibility_timeout = visibility_timeout
+        self.requests: Dict[str, int] = collections.Counter()
+        """Number of requests made per operation (including throttled ones)."""
+
+        self._random = random.Random(seed)  # nosec B311
+        self._queues: Dict[str, _Queue] = {}
+        self._cond = threading.Condition()
+
+    def create_queue(self, QueueName: str, **kwargs) -> Dict[str, Any]:  # pylint: disable=invalid-name
+        """Create a queue (or return the URL of an existing queue)."""
+        queue_url = f"https://sqs.fake.amazonaws.com/123456789012/{QueueName}"
+        with self._cond:
+            self._queues.setdefault(queue_url, _Queue(self.visibility_timeout))
+        return {"QueueUrl": queue_url}
+
+    def get_queue_attributes(self, QueueUrl: str, **kwargs) -> Dict[str, Any]:  # pylint: disable=invalid-name
+        """Get the approximate number of visible and in-flight messages."""
+        with self._cond:
+            queue = self._queue(QueueUrl, "GetQueueAttributes")
+            queue.promote(time.monotonic())
+            visible = sum(m.available for m in queue.messages.values())
+            return {
+                "Attributes": {
+                    "ApproximateNumberOfMessages": str(visible),
+                    "ApproximateNumberOfMessagesNotVisible": str(
+                        len(queue.messages) - visible
+                    ),
+                }
+            }
+
+    def send_message_batch(self, QueueUrl: str, Entries: List[Any]) -> Dict[str, Any]:  # pylint: disable=invalid-name
+        def send(queue: _Queue, entry: Any, now: float) -> Dict[str, Any]:
+            attributes = entry.get("MessageAttributes", {})
+            message = _Message(entry["MessageBody"], attributes, now)
+            queue.messages[message.message_id] = message
+            delay = entry.get("DelaySeconds", 0)
+            if delay:
+                queue.hide(message, now + delay)
+            else:
+                queue.show(message)
+            return {
+                "Id": entry["Id"],
+                "MessageId": message.message_id,
+                "MD5OfMessageBody": message.md5,
+            }
+
+        if sum(_message_size(entry) for entry in Entries) > MAX_PAYLOAD_SIZE:
+            raise _client_error("BatchRequestTooLong", "SendMessageBatch")
+
+        return self._batch("SendMessageBatch", QueueUrl, Entries, send)
+
+    def delete_message_batch(self, QueueUrl: str, Entries: List[Any]) -> Dict[str, Any]:  # pylint: disable=invalid-name
+        def delete(queue: _Queue, entry: Any, now: float) -> Dict[str, Any]:
+            message = queue.receipt_handles.get(entry["ReceiptHandle"])
+            if message is not None:
+                queue.delete(message)
+            elif "#" not in entry["ReceiptHandle"]:
+                # Deleting an already deleted message succeeds like in SQS
+                raise _EntryError("ReceiptHandleIsInvalid")
+            return {"Id": entry["Id"]}
+
+        return self._batch("DeleteMessageBatch", QueueUrl, Entries, delete)
+
+    def change_message_visibility_batch(  # pylint: disable=invalid-name
+        self, QueueUrl: str, Entries: List[Any]
+    ) -> Dict[str, Any]:
+        def change(queue: _Queue, entry: Any, now: float) -> Dict[str, Any]:
+            message = queue.receipt_handles.get(entry["ReceiptHandle"])
+            if message is None:
+                raise _EntryError("ReceiptHandleIsInvalid")
+            queue.hide(message, now + entry["VisibilityTimeout"])
+            return {"Id": entry["Id"]}
+
+        return self._batch("ChangeMessageVisibilityBatch", QueueUrl, Entries, change)
+
+    def receive_message(  # pylint: disable=invalid-name
+        self,
+        QueueUrl: str,
+        MaxNumberOfMessages: int = 1,
+        WaitTimeSeconds: int = 0,
+        VisibilityTimeout: Optional[float] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        """Receive messages, waiting up to WaitTimeSeconds for a message."""
+        self._request("ReceiveMessage")
+        deadline = time.monotonic() + WaitTimeSeconds
+        with self._cond:
+            queue = self._queue(QueueUrl, "ReceiveMessage")
+            if VisibilityTimeout is None:
+                VisibilityTimeout = queue.visibility_timeout
+
+            while True:
+                now = time.monotonic()
+                next_visible = queue.promote(now)
+                messages: List[Dict[str, Any]] = []
+                while queue.available and len(messages) < MaxNumberOfMessages:
+                    message = queue.available.popleft()
+                    message.available = False
+                    if message.message_id not in queue.messages:
+                        continue
+
+                    messages.append(self._deliver(queue, message, now))
+                    queue.hide(message, now + VisibilityTimeout)
+                    if self.duplicate_rate and self._chance(self.duplicate_rate):
+                        queue.show(message)
+
+                if messages or now >= deadline:
+                    return {"Messages": messages} if messages else {}
+
+                timeout = deadline - now
+                if next_visible is not None:
+                    timeout = min(timeout, next_visible - now)
+                self._cond.wait(timeout)
+
+    def _deliver(self, queue: _Queue, message: _Message, now: float) -> Dict[str, Any]:
+        """Create the received message with a new receipt handle."""
+        receipt_handle = f"{message.message_id}#{uuid.uuid4()}"
+        message.receipt_handles.add(receipt_handle)
+        queue.receipt_handles[receipt_handle] = message
+        message.receive_count += 1
+
+        res: Dict[str, Any] = {
+            "MessageId": message.message_id,
+            "ReceiptHandle": receipt_handle,
+            "MD5OfBody": message.md5,
+            "Body": message.body,
+            "Attributes": {
+                "ApproximateReceiveCount": str(message.receive_count),
+                "SentTimestamp": str(int(message.sent_at * 1000)),
+            },
+        }
+        if message.attributes:
+            res["MessageAttributes"] = message.attributes
+        return res
+
+    def _batch(self, operation: str, queue_url: str, entries: List[Any], func):
+        """Validate a batch request and call func for each entry.
+
+        Entries fail at random with failure_rate. func raises _EntryError to
+        fail an entry with a sender fault.
+        """
+        self._request(operation)
+        if not entries:
+            raise _client_error("EmptyBatchRequest", operation)
+        if len(entries) > MAX_BATCH_ENTRIES:
+            raise _client_error("TooManyEntriesInBatchRequest", operation)
+        if len({entry["Id"] for entry in entries}) != len(entries):
+            raise _client_error("BatchEntryIdsNotDistinct", operation)
+
+        successful, failed = [], []
+        with self._cond:
+            queue = self._queue(queue_url, operation)
+            now = time.monotonic()
+            for entry in entries:
+                if self.failure_rate and self._chance(self.failure_rate):
+                    failed.append(_failure(entry["Id"], "InternalError", False))
+                    continue
+
+                try:
+                    successful.append(func(queue, entry, now))
+                except _EntryError as exc:
+                    failed.append(_failure(entry["Id"], exc.code, True))
+
+            self._cond.notify_all()
+
+        return {"Successful": successful, "Failed": failed}
+
+    def _request(self, operation: str) -> None:
+        """Count a request, wait for its latency and throttle it at random."""
+        with self._cond:
+            self.requests[operation] += 1
+            throttled = self.throttle_rate and self._chance(self.throttle_rate)
+            latency = self._latency()
+
+        if latency > 0:
+            time.sleep(latency)
+        if throttled:
+            raise _client_error("ThrottlingException", operation)
+
+    def _latency(self) -> float:
+        """Sample a request latency from the latency percentiles."""
+        if len(self._latencies) == 1:
+            return self._latencies[0]
+
+        percentile = self._random.uniform(0, 100)
+        i = bisect.bisect_right(self._percentiles, percentile)
+        if i == 0:
+            return self._latencies[0]
+        if i == len(self._percentiles):
+            return self._latencies[-1]
+
+        low, high = self._percentiles[i - 1], self._percentiles[i]
+        fraction = (percentile - low) / (high - low)
+        return self._latencies[i - 1] + fraction * (
+            self._latencies[i] - self._latencies[i - 1]
+        )
+
+    def _chance(self, rate: float) -> bool:
+        return self._random.random() < rate
+
+    def _queue(self, queue_url: str, operation: str) -> _Queue:
+        try:
+            return self._queues[queue_url]
+        except KeyError:
+            raise _client_error(
+                "AWS.SimpleQueueService.NonExistentQueue", operation
+            ) from None
+
+
+class _EntryError(Exception):
+    """Error for failing a batch entry with a sender fault."""
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.code = code
+
+
+def _failure(entry_id: str, code: str, sender_fault: bool) -> Dict[str, Any]:
+    return {"Id": entry_id, "SenderFault": sender_fault, "Code": code, "Message": code}
+
+
+def _client_error(code: str, operation: str) -> botocore.exceptions.ClientError:
+    return botocore.exceptions.ClientError(
+        {"Error": {"Code": code, "Message": code}}, operation
+    )
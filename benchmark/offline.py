@@ -0,0 +1,219 @@
+"""Offline benchmark for the overhead of aws-sqs-batchlib library.
+
+Runs the library against aws_sqs_batchlib.testing.FakeSQSClient that responds
+instantly (or with a configured latency) so that the results measure the
+library (and the in-memory fake queue) instead of network latency. Prints one
+JSON object per benchmark case, e.g.
+
+    python benchmark/offline.py --entries 10 1000 100000 > before.jsonl
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import sys
+import time
+import tracemalloc
+
+import aws_sqs_batchlib
+from aws_sqs_batchlib.testing import FakeSQSClient
+
+
+def _fill_queue(client, queue_url, num_entries, body_size):
+    """Send messages to the queue with fault injection disabled."""
+    failure_rate, client.failure_rate = client.failure_rate, 0.0
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=queue_url,
+        Entries=_send_entries(num_entries, body_size),
+        sqs_client=client,
+    )
+    client.failure_rate = failure_rate
+
+
+def _send_entries(num_entries, body_size):
+    return [{"Id": f"{i}", "MessageBody": "a" * body_size} for i in range(num_entries)]
+
+
+def run_send(client, queue_url, num_entries, body_size, max_workers):
+    entries = _send_entries(num_entries, body_size)
+    return lambda: len(
+        aws_sqs_batchlib.send_message_batch(
+            QueueUrl=queue_url,
+            Entries=entries,
+            sqs_client=client,
+            max_workers=max_workers,
+            retry_policy=aws_sqs_batchlib.RetryPolicy(base_delay=0),
+        )["Successful"]
+    )
+
+
+def run_delete(client, queue_url, num_entries, body_size, max_workers):
+    _fill_queue(client, queue_url, num_entries, body_size)
+    messages = client.receive_message(
+        QueueUrl=queue_url, MaxNumberOfMessages=num_entries
+    )["Messages"]
+    entries = [
+        {"Id": f"{i}", "ReceiptHandle": message["ReceiptHandle"]}
+        for i, message in enumerate(messages)
+    ]
+    return lambda: len(
+        aws_sqs_batchlib.delete_message_batch(
+            QueueUrl=queue_url,
+            Entries=entries,
+            sqs_client=client,
+            max_workers=max_workers,
+            retry_policy=aws_sqs_batchlib.RetryPolicy(base_delay=0),
+        )["Successful"]
+    )
+
+
+def run_receive(client, queue_url, num_entries, body_size, max_workers):
+    _fill_queue(client, queue_url, num_entries, body_size)
+    return lambda: len(
+        aws_sqs_batchlib.receive_message(
+            QueueUrl=queue_url,
+            MaxNumberOfMessages=num_entries,
+            WaitTimeSeconds=3600,
+            sqs_client=client,
+            pollers=max_workers,
+        )["Messages"]
+    )
+
+
+OPERATIONS = {"send": run_send, "delete": run_delete, "receive": run_receive}
+
+
+def setup(args, operation, num_entries, body_size, failure_rate):
+    """Create a queue with a fake SQS client and prepare a benchmark case."""
+    client = FakeSQSClient(args.latency, failure_rate=failure_rate, seed=0)
+    queue_url = client.create_queue(QueueName="benchmark")["QueueUrl"]
+    return OPERATIONS[operation](
+        client, queue_url, num_entries, body_size, args.max_workers
+    )
+
+
+def measure(args, operation, num_entries, body_size, failure_rate):
+    """Run one benchmark case and return its results."""
+    run = setup(args, operation, num_entries, body_size, failure_rate)
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    processed = run()
+    seconds = time.perf_counter() - wall_start
+    cpu_seconds = time.process_time() - cpu_start
+
+    peak_memory = None
+    if not args.no_memory:
+        # Separate run as tracing allocations slows down the code
+        run = setup(args, operation, num_entries, body_size, failure_rate)
+        tracemalloc.start()
+        try:
+            run()
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "version": aws_sqs_batchlib.__version__,
+        "operation": operation,
+        "entries": num_entries,
+        "body_size": body_size,
+        "failure_rate": failure_rate,
+        "latency": args.latency,
+        "max_workers": args.max_workers,
+        "processed": processed,
+        "seconds": seconds,
+        "cpu_seconds": cpu_seconds,
+        "msgs_per_second": processed / seconds if seconds else None,
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-o",
+        "--operations",
+        nargs="+",
+        choices=sorted(OPERATIONS),
+        help="Operations to benchmark",
+        default=["send", "delete", "receive"],
+    )
+    parser.add_argument(
+        "-n",
+        "--entries",
+        nargs="+",
+        type=int,
+        help="Number of entries / messages to process per call",
+        default=[10, 1000, 100000],
+    )
+    parser.add_argument(
+        "-b",
+        "--body-sizes",
+        nargs="+",
+        type=int,
+        help="Message body sizes in bytes",
+        default=[1024],
+    )
+    parser.add_argument(
+        "-f",
+        "--failure-rates",
+        nargs="+",
+        type=float,
+        help="Fraction of entries that fail with a retryable error",
+        default=[0.0, 0.01],
+    )
+    parser.add_argument(
+        "-l",
+        "--latency",
+        type=float,
+        help="Latency of each fake SQS request in seconds",
+        default=0.0,
+    )
+    parser.add_argument(
+        "-w",
+        "--max-workers",
+        type=int,
+        help="Number of concurrent requests (max_workers / pollers)",
+        default=1,
+    )
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="Skip measuring peak memory usage",
+    )
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    for operation, num_entries, body_size, failure_rate in itertools.product(
+        args.operations, args.entries, args.body_sizes, args.failure_rates
+    ):
+        if operation == "receive" and failure_rate:
+            continue
+
+        result = measure(args, operation, num_entries, body_size, failure_rate)
+        logging.info(
+            "%s: %i entries (%i bytes, %.2f failure rate) in %.3f seconds "
+            "(%i / second)",
+            operation,
+            num_entries,
+            body_size,
+            failure_rate,
+            result["seconds"],
+            result["msgs_per_second"] or 0,
+        )
+        print(json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        format="%(asctime)s.%(msecs)03d %(levelname)-8s %(name)s %(message)s",
+        level=logging.INFO,
+        datefmt="%Y-%m-%d %H:%M:%S",
+        stream=sys.stderr,
+    )
+
+    main()
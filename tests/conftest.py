@@ -0,0 +1,72 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring,redefined-outer-name
+import unittest.mock
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import aws_sqs_batchlib
+
+
+@pytest.fixture
+def aws_credentials(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "eu-north-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    # Do not share clients (and their credentials) between tests
+    aws_sqs_batchlib.clear_client_cache()
+
+
+@pytest.fixture
+def sqs_queue(aws_credentials):  # pylint: disable=unused-argument
+    with mock_aws():
+        sqs = aws_sqs_batchlib.create_sqs_client()
+        yield sqs.create_queue(QueueName="aws-sqs-batchlib-testqueue")["QueueUrl"]
+
+
+@pytest.fixture
+def batch_client_mock():
+    """Factory for SQS client mocks with a batch request operation that fails
+    the entries with the given (invalid) receipt handles."""
+
+    def factory(operation, invalid=()):
+        def batch_request(QueueUrl, Entries):  # pylint: disable=invalid-name
+            return {
+                "Successful": [
+                    {"Id": entry["Id"]}
+                    for entry in Entries
+                    if entry["ReceiptHandle"] not in invalid
+                ],
+                "Failed": [
+                    {
+                        "Id": entry["Id"],
+                        "SenderFault": True,
+                        "Code": "ReceiptHandleIsInvalid",
+                        "Message": "ReceiptHandleIsInvalid",
+                    }
+                    for entry in Entries
+                    if entry["ReceiptHandle"] in invalid
+                ],
+            }
+
+        client_mock = unittest.mock.Mock(
+            spec=boto3.client("sqs", region_name="eu-north-1")
+        )
+        getattr(client_mock, operation).side_effect = batch_request
+        return client_mock
+
+    return factory
+
+
+@pytest.fixture
+def batch_requests():
+    """Receipt handles of each request made with a batch request operation of
+    a client mock."""
+
+    def requests(operation_mock):
+        return [
+            [entry["ReceiptHandle"] for entry in call.kwargs["Entries"]]
+            for call in operation_mock.call_args_list
+        ]
+
+    return requests
@@ -0,0 +1,119 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring,redefined-outer-name
+import threading
+import time
+
+import pytest
+
+import aws_sqs_batchlib
+
+
+def test_ack_full_batches_right_away(batch_client_mock, batch_requests):
+    client_mock = batch_client_mock("delete_message_batch")
+    with aws_sqs_batchlib.Acknowledger(
+        "queue", sqs_client=client_mock, linger=60
+    ) as acknowledger:
+        futures = [acknowledger.ack(f"{i}") for i in range(25)]
+        concurrent_results = [future.result(timeout=5) for future in futures[:20]]
+        assert not futures[24].done()
+
+    assert len(concurrent_results) == 20
+    assert all(future.done() for future in futures)
+    # Full batches are sent as soon as they are available, the partial last
+    # batch on close
+    deleted = batch_requests(client_mock.delete_message_batch)
+    assert [len(entries) for entries in deleted][-1] == 5
+    assert sorted(sum(deleted, []), key=int) == [f"{i}" for i in range(25)]
+
+
+def test_ack_partial_batch_after_linger(batch_client_mock, batch_requests):
+    client_mock = batch_client_mock("delete_message_batch")
+    with aws_sqs_batchlib.Acknowledger(
+        "queue", sqs_client=client_mock, linger=0.05
+    ) as acknowledger:
+        started = time.monotonic()
+        future = acknowledger.ack("1")
+        acknowledger.ack("2")
+        future.result(timeout=5)
+        assert time.monotonic() - started >= 0.05
+
+    assert batch_requests(client_mock.delete_message_batch) == [["1", "2"]]
+
+
+def test_ack_flush(batch_client_mock, batch_requests):
+    client_mock = batch_client_mock("delete_message_batch")
+    acknowledger = aws_sqs_batchlib.Acknowledger(
+        "queue", sqs_client=client_mock, linger=60
+    )
+    futures = [acknowledger.ack(f"{i}") for i in range(3)]
+    acknowledger.flush()
+
+    assert all(future.done() for future in futures)
+    assert batch_requests(client_mock.delete_message_batch) == [["0", "1", "2"]]
+
+    acknowledger.close()
+    with pytest.raises(RuntimeError):
+        acknowledger.ack("3")
+
+
+def test_ack_failure(batch_client_mock):
+    client_mock = batch_client_mock("delete_message_batch", invalid={"2"})
+    with aws_sqs_batchlib.Acknowledger("queue", sqs_client=client_mock) as acknowledger:
+        futures = {handle: acknowledger.ack(handle) for handle in ["1", "2", "3"]}
+
+    assert futures["1"].result() == {"Id": "0"}
+    with pytest.raises(aws_sqs_batchlib.BatchEntryError) as excinfo:
+        futures["2"].result()
+    assert excinfo.value.failure["Code"] == "ReceiptHandleIsInvalid"
+    assert futures["3"].exception() is None
+
+
+def test_ack_request_error(batch_client_mock):
+    client_mock = batch_client_mock("delete_message_batch")
+    client_mock.delete_message_batch.side_effect = RuntimeError("boom")
+    with aws_sqs_batchlib.Acknowledger("queue", sqs_client=client_mock) as acknowledger:
+        future = acknowledger.ack("1")
+
+    with pytest.raises(RuntimeError):
+        future.result()
+
+
+def test_ack_from_many_threads(sqs_queue):
+    num_messages = 50
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue,
+        Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(num_messages)],
+    )
+    messages = aws_sqs_batchlib.receive_message(
+        QueueUrl=sqs_queue, MaxNumberOfMessages=num_messages, WaitTimeSeconds=5
+    )["Messages"]
+    assert len(messages) == num_messages
+
+    futures = []
+    with aws_sqs_batchlib.Acknowledger(sqs_queue) as acknowledger:
+        threads = [
+            threading.Thread(
+                target=lambda chunk: futures.extend(
+                    acknowledger.ack(msg["ReceiptHandle"]) for msg in chunk
+                ),
+                args=(messages[i : i + 5],),
+            )
+            for i in range(0, num_messages, 5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert all(future.exception() is None for future in futures)
+    sqs = aws_sqs_batchlib.create_sqs_client()
+    attributes = sqs.get_queue_attributes(
+        QueueUrl=sqs_queue, AttributeNames=["ApproximateNumberOfMessagesNotVisible"]
+    )["Attributes"]
+    assert attributes["ApproximateNumberOfMessagesNotVisible"] == "0"
+
+
+def test_ack_invalid_linger(batch_client_mock):
+    with pytest.raises(ValueError):
+        aws_sqs_batchlib.Acknowledger(
+            "queue", sqs_client=batch_client_mock("delete_message_batch"), linger=-1
+        )
@@ -0,0 +1,242 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring,redefined-outer-name
+import asyncio
+import unittest.mock
+
+import boto3
+import botocore.exceptions
+import pytest
+
+import aws_sqs_batchlib
+import aws_sqs_batchlib.aio
+from aws_sqs_batchlib.testing import FakeSQSClient
+
+
+def _async_client():
+    inflight = {"current": 0, "max": 0}
+
+    async def send_message_batch(QueueUrl, Entries):  # pylint: disable=invalid-name
+        inflight["current"] += 1
+        inflight["max"] = max(inflight["max"], inflight["current"])
+        await asyncio.sleep(0.01)
+        inflight["current"] -= 1
+        return {"Successful": [{"Id": entry["Id"]} for entry in Entries]}
+
+    client = unittest.mock.Mock()
+    client.send_message_batch = unittest.mock.AsyncMock(side_effect=send_message_batch)
+    client.delete_message_batch = unittest.mock.AsyncMock(
+        side_effect=send_message_batch
+    )
+    return client, inflight
+
+
+def test_send_async_client():
+    client, inflight = _async_client()
+    resp = asyncio.run(
+        aws_sqs_batchlib.aio.send_message_batch(
+            QueueUrl="queue",
+            Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(95)],
+            sqs_client=client,
+            max_workers=4,
+        )
+    )
+
+    assert not resp["Failed"]
+    assert [res["Id"] for res in resp["Successful"]] == [str(i) for i in range(95)]
+    assert client.send_message_batch.await_count == 10
+    assert inflight["max"] == 4
+
+
+def test_send_shared_semaphore():
+    client, inflight = _async_client()
+    semaphore = asyncio.Semaphore(3)
+
+    async def send_all():
+        return await asyncio.gather(
+            *(
+                aws_sqs_batchlib.aio.send_message_batch(
+                    QueueUrl="queue",
+                    Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(50)],
+                    sqs_client=client,
+                    semaphore=semaphore,
+                )
+                for _ in range(4)
+            )
+        )
+
+    results = asyncio.run(send_all())
+
+    assert all(len(resp["Successful"]) == 50 for resp in results)
+    assert inflight["max"] == 3
+
+
+def test_delete_retry_failures():
+    client = unittest.mock.Mock()
+    client.delete_message_batch = unittest.mock.AsyncMock(
+        side_effect=[
+            {
+                "Successful": [{"Id": f"{i}"} for i in range(2, 10)],
+                "Failed": [
+                    {
+                        "Id": "0",
+                        "SenderFault": True,
+                        "Code": "ReceiptHandleIsInvalid",
+                        "Message": "ReceiptHandleIsInvalid",
+                    },
+                    {
+                        "Id": "1",
+                        "SenderFault": False,
+                        "Code": "InternalFailure",
+                        "Message": "InternalFailure",
+                    },
+                ],
+            },
+            {"Successful": [{"Id": "1"}, {"Id": "10"}]},
+        ]
+    )
+
+    resp = asyncio.run(
+        aws_sqs_batchlib.aio.delete_message_batch(
+            QueueUrl="queue",
+            Entries=[{"Id": f"{i}", "ReceiptHandle": f"{i}"} for i in range(11)],
+            sqs_client=client,
+            max_workers=1,
+        )
+    )
+
+    assert [res["Id"] for res in resp["Successful"]] == [
+        *(str(i) for i in range(2, 10)),
+        "1",
+        "10",
+    ]
+    assert [res["Id"] for res in resp["Failed"]] == ["0"]
+
+
+def test_send_receive_delete_sync_client(sqs_queue):
+    num_messages = 35
+    resp = asyncio.run(
+        aws_sqs_batchlib.aio.send_message_batch(
+            QueueUrl=sqs_queue,
+            Entries=[
+                {"Id": f"{i}", "MessageBody": f"{i}"} for i in range(num_messages)
+            ],
+        )
+    )
+    assert len(resp["Successful"]) == num_messages
+
+    batch = asyncio.run(
+        aws_sqs_batchlib.aio.receive_message(
+            QueueUrl=sqs_queue,
+            MaxNumberOfMessages=num_messages,
+            WaitTimeSeconds=10,
+            pollers=3,
+        )
+    )
+    assert len(batch["Messages"]) == num_messages
+
+    resp = asyncio.run(
+        aws_sqs_batchlib.aio.delete_message_batch(
+            QueueUrl=sqs_queue,
+            Entries=[
+                {"Id": f"{i}", "ReceiptHandle": msg["ReceiptHandle"]}
+                for i, msg in enumerate(batch["Messages"])
+            ],
+        )
+    )
+    assert not resp["Failed"]
+    assert len(resp["Successful"]) == num_messages
+
+
+def test_receive_async_client():
+    async def receive_message(**kwargs):
+        await asyncio.sleep(0.01)
+        return {
+            "Messages": [{"MessageId": "id"}]
+            * max(kwargs["MaxNumberOfMessages"] - 3, 1)
+        }
+
+    client = unittest.mock.Mock()
+    client.receive_message = unittest.mock.AsyncMock(side_effect=receive_message)
+
+    batch = asyncio.run(
+        aws_sqs_batchlib.aio.receive_message(
+            QueueUrl="queue",
+            MaxNumberOfMessages=64,
+            WaitTimeSeconds=5,
+            sqs_client=client,
+            pollers=4,
+        )
+    )
+
+    assert len(batch["Messages"]) == 64
+    for call in client.receive_message.await_args_list:
+        assert 1 <= call.kwargs["MaxNumberOfMessages"] <= 10
+
+
+def test_receive_empty_queue_respects_window():
+    client = unittest.mock.Mock(spec=boto3.client("sqs", region_name="eu-north-1"))
+    client.receive_message.return_value = {}
+
+    batch = asyncio.run(
+        aws_sqs_batchlib.aio.receive_message(
+            QueueUrl="queue",
+            MaxNumberOfMessages=5,
+            WaitTimeSeconds=0.1,
+            sqs_client=client,
+            pollers=2,
+        )
+    )
+
+    assert not batch["Messages"]
+
+
+def test_send_request_error_cancels_inflight():
+    client = unittest.mock.Mock()
+    client.send_message_batch = unittest.mock.AsyncMock(
+        side_effect=RuntimeError("boom")
+    )
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(
+            aws_sqs_batchlib.aio.send_message_batch(
+                QueueUrl="queue",
+                Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(50)],
+                sqs_client=client,
+            )
+        )
+
+
+def test_send_retries_throttled_requests():
+    sqs = FakeSQSClient(throttle_rate=0.2, seed=1)
+    queue_url = sqs.create_queue(QueueName="test")["QueueUrl"]
+
+    resp = asyncio.run(
+        aws_sqs_batchlib.aio.send_message_batch(
+            QueueUrl=queue_url,
+            Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(200)],
+            sqs_client=sqs,
+            max_workers=4,
+            retry_policy=aws_sqs_batchlib.RetryPolicy(base_delay=0.001),
+        )
+    )
+
+    assert len(resp["Successful"]) == 200
+    assert not resp["Failed"]
+
+
+def test_send_non_throttling_client_error_raises():
+    client = unittest.mock.Mock()
+    client.send_message_batch = unittest.mock.AsyncMock(
+        side_effect=botocore.exceptions.ClientError(
+            {"Error": {"Code": "AccessDenied", "Message": "Denied"}},
+            "SendMessageBatch",
+        )
+    )
+
+    with pytest.raises(botocore.exceptions.ClientError):
+        asyncio.run(
+            aws_sqs_batchlib.aio.send_message_batch(
+                QueueUrl="queue",
+                Entries=[{"Id": "1", "MessageBody": "1"}],
+                sqs_client=client,
+            )
+        )
@@ -1,6 +1,9 @@
 # pylint: disable=missing-module-docstring,missing-function-docstring,redefined-outer-name
+import collections
 import contextlib
 import importlib.metadata
+import threading
+import time
 import unittest.mock
 import uuid
 
@@ -22,6 +25,8 @@ QUEUE_REAL = "real queue"
 @pytest.fixture(autouse=True)
 def _setup_env(monkeypatch):
     monkeypatch.setenv("AWS_DEFAULT_REGION", "eu-north-1")
+    # Do not share clients (and their credentials) between tests
+    aws_sqs_batchlib.clear_client_cache()
 
 
 def _fake_credentials(monkeypatch):
@@ -89,6 +94,49 @@ def fifo_queue(request, monkeypatch, _setup_env):
         sqs.delete_queue(QueueUrl=queue_url)
 
 
+def test_create_sqs_client_cached(monkeypatch):
+    _fake_credentials(monkeypatch)
+    client = aws_sqs_batchlib.create_sqs_client()
+
+    assert aws_sqs_batchlib.create_sqs_client() is client
+    assert client.meta.endpoint_url == "https://sqs.eu-north-1.amazonaws.com"
+    assert client.meta.config.tcp_keepalive
+    assert client.meta.config.max_pool_connections == 10
+
+    larger_pool = aws_sqs_batchlib.create_sqs_client(max_pool_connections=50)
+    assert larger_pool is not client
+    assert larger_pool.meta.config.max_pool_connections == 50
+
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "eu-west-1")
+    other_region = aws_sqs_batchlib.create_sqs_client()
+    assert other_region is not client
+    assert other_region.meta.endpoint_url == "https://sqs.eu-west-1.amazonaws.com"
+
+
+def test_create_sqs_client_credentials_from_environment(monkeypatch):
+    _fake_credentials(monkeypatch)
+    client = aws_sqs_batchlib.create_sqs_client()
+
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "other")
+    other_credentials = aws_sqs_batchlib.create_sqs_client()
+    assert other_credentials is not client
+    assert aws_sqs_batchlib.create_sqs_client() is other_credentials
+
+    aws_sqs_batchlib.clear_client_cache()
+    assert aws_sqs_batchlib.create_sqs_client() is not other_credentials
+
+
+def test_create_sqs_client_custom_session(monkeypatch):
+    _fake_credentials(monkeypatch)
+    session = boto3.Session(region_name="eu-west-1")
+    client = aws_sqs_batchlib.create_sqs_client(session)
+
+    assert aws_sqs_batchlib.create_sqs_client(session) is client
+    assert aws_sqs_batchlib.create_sqs_client() is not client
+    assert client.meta.region_name == "eu-west-1"
+    assert client.meta.endpoint_url == "https://sqs.eu-west-1.amazonaws.com"
+
+
 def read_messages(queue_url, num_messages, delete=True):
     """Helper to read and delete N messages from SQS queue."""
     sqsc = aws_sqs_batchlib.create_sqs_client()
@@ -129,6 +177,236 @@ def test_receive(sqs_queue, num_messages, wait_time):
     assert len(messages) == num_messages
 
 
+@pytest.mark.parametrize(["num_messages", "batch_size"], [(48, 48), (60, 35)])
+def test_receive_pollers(sqs_queue, num_messages, batch_size):
+    sqs = aws_sqs_batchlib.create_sqs_client()
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue,
+        Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(num_messages)],
+        sqs_client=sqs,
+    )
+
+    batch = aws_sqs_batchlib.receive_message(
+        QueueUrl=sqs_queue,
+        MaxNumberOfMessages=batch_size,
+        WaitTimeSeconds=15,
+        pollers=4,
+    )
+    messages = batch["Messages"]
+    assert len(messages) == batch_size
+
+
+def test_receive_pollers_share_batch_size():
+    inflight, max_inflight = [0], [0]
+    lock = threading.Lock()
+
+    def receive_message(**kwargs):
+        with lock:
+            inflight[0] += 1
+            max_inflight[0] = max(max_inflight[0], inflight[0])
+        time.sleep(0.01)
+        with lock:
+            inflight[0] -= 1
+        return {
+            "Messages": [
+                {"MessageId": str(uuid.uuid4())}
+                for _ in range(kwargs["MaxNumberOfMessages"] // 2 or 1)
+            ]
+        }
+
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.receive_message.side_effect = receive_message
+
+    batch = aws_sqs_batchlib.receive_message(
+        QueueUrl="queue",
+        MaxNumberOfMessages=95,
+        WaitTimeSeconds=5,
+        sqs_client=client_mock,
+        pollers=8,
+    )
+
+    assert len(batch["Messages"]) == 95
+    assert max_inflight[0] > 1
+    for call in client_mock.receive_message.call_args_list:
+        assert 1 <= call.kwargs["MaxNumberOfMessages"] <= 10
+
+
+def test_receive_adaptive_wait_time():
+    now = [1000.0]
+    responses = iter([[], [], [{"MessageId": "1"}], [], [], [], [], [], []])
+
+    def receive_message(**kwargs):
+        now[0] += kwargs["WaitTimeSeconds"] or 0.25
+        return {"Messages": next(responses)}
+
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.receive_message.side_effect = receive_message
+
+    with unittest.mock.patch("time.time", lambda: now[0]):
+        batch = aws_sqs_batchlib.receive_message(
+            QueueUrl="queue",
+            MaxNumberOfMessages=10,
+            WaitTimeSeconds=40,
+            sqs_client=client_mock,
+        )
+
+    assert len(batch["Messages"]) == 1
+    # Empty responses double the wait time, messages reset it and the window
+    # is never exceeded
+    assert [
+        call.kwargs["WaitTimeSeconds"]
+        for call in client_mock.receive_message.call_args_list
+    ] == [1, 2, 4, 1, 2, 4, 8, 16, 2]
+
+
+def test_receive_short_polls_at_end_of_window():
+    now = [1000.0]
+
+    def receive_message(**kwargs):
+        now[0] += kwargs["WaitTimeSeconds"] or 0.3
+        return {"Messages": [{"MessageId": "1"}]}
+
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.receive_message.side_effect = receive_message
+
+    with unittest.mock.patch("time.time", lambda: now[0]):
+        batch = aws_sqs_batchlib.receive_message(
+            QueueUrl="queue",
+            MaxNumberOfMessages=100,
+            WaitTimeSeconds=2.5,
+            sqs_client=client_mock,
+        )
+
+    # Queue keeps returning messages, short polls fill the last second
+    assert [
+        call.kwargs["WaitTimeSeconds"]
+        for call in client_mock.receive_message.call_args_list
+    ] == [1, 1, 0, 0]
+    assert len(batch["Messages"]) == 4
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"WaitTimeSeconds": 1}])
+def test_receive_default_window_long_polls(kwargs):
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.receive_message.return_value = {}
+
+    # Real clock: the window has slightly less than a second left when the
+    # first request is made
+    aws_sqs_batchlib.receive_message(QueueUrl="queue", sqs_client=client_mock, **kwargs)
+
+    assert [
+        call.kwargs["WaitTimeSeconds"]
+        for call in client_mock.receive_message.call_args_list
+    ] == [1]
+
+
+def test_receive_invalid_pollers():
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    with pytest.raises(ValueError):
+        aws_sqs_batchlib.receive_message(
+            QueueUrl="queue", sqs_client=client_mock, pollers=0
+        )
+
+
+def test_iter_messages_yields_each_response():
+    responses = iter(
+        [[{"MessageId": "1"}, {"MessageId": "2"}], [], [{"MessageId": "3"}]]
+    )
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.receive_message.side_effect = lambda **kwargs: {
+        "Messages": next(responses)
+    }
+
+    received = aws_sqs_batchlib.iter_messages(
+        QueueUrl="queue",
+        MaxNumberOfMessages=3,
+        WaitTimeSeconds=10,
+        sqs_client=client_mock,
+    )
+
+    # First messages are yielded before the queue is polled again
+    assert next(received) == [{"MessageId": "1"}, {"MessageId": "2"}]
+    assert client_mock.receive_message.call_count == 1
+
+    assert list(received) == [[{"MessageId": "3"}]]
+    assert client_mock.receive_message.call_count == 3
+    assert [
+        call.kwargs["MaxNumberOfMessages"]
+        for call in client_mock.receive_message.call_args_list
+    ] == [3, 1, 1]
+
+
+def test_iter_messages_pollers():
+    def receive_message(**kwargs):
+        time.sleep(0.01)
+        return {
+            "Messages": [
+                {"MessageId": str(uuid.uuid4())}
+                for _ in range(kwargs["MaxNumberOfMessages"])
+            ]
+        }
+
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.receive_message.side_effect = receive_message
+
+    batches = list(
+        aws_sqs_batchlib.iter_messages(
+            QueueUrl="queue",
+            MaxNumberOfMessages=95,
+            WaitTimeSeconds=5,
+            sqs_client=client_mock,
+            pollers=4,
+        )
+    )
+
+    assert sum(len(batch) for batch in batches) == 95
+    assert all(1 <= len(batch) <= 10 for batch in batches)
+
+
+def test_iter_messages_close_stops_pollers():
+    def receive_message(**kwargs):
+        time.sleep(0.01)
+        return {"Messages": [{"MessageId": str(uuid.uuid4())}]}
+
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.receive_message.side_effect = receive_message
+
+    received = aws_sqs_batchlib.iter_messages(
+        QueueUrl="queue",
+        MaxNumberOfMessages=1000,
+        WaitTimeSeconds=20,
+        sqs_client=client_mock,
+        pollers=3,
+    )
+    assert len(next(received)) == 1
+
+    started = time.monotonic()
+    received.close()
+    assert time.monotonic() - started < 1
+
+    call_count = client_mock.receive_message.call_count
+    time.sleep(0.05)
+    assert client_mock.receive_message.call_count == call_count
+
+
+def test_iter_messages_raises_poller_errors():
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.receive_message.side_effect = botocore.exceptions.ClientError(
+        {"Error": {"Code": "AccessDenied", "Message": "denied"}}, "ReceiveMessage"
+    )
+
+    with pytest.raises(botocore.exceptions.ClientError):
+        list(
+            aws_sqs_batchlib.iter_messages(
+                QueueUrl="queue",
+                MaxNumberOfMessages=20,
+                WaitTimeSeconds=5,
+                sqs_client=client_mock,
+                pollers=2,
+            )
+        )
+
+
 def test_receive_no_batching_args(sqs_queue):
     sqs = aws_sqs_batchlib.create_sqs_client()
     for i in range(4):
@@ -574,6 +852,666 @@ def test_send_retry_failures():
     }
 
 
+def test_send_concurrent(sqs_queue):
+    num_messages = 95
+    resp = aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue,
+        Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(num_messages)],
+        max_workers=4,
+    )
+
+    assert not resp["Failed"]
+    assert [res["Id"] for res in resp["Successful"]] == [
+        str(i) for i in range(num_messages)
+    ]
+
+    messages = read_messages(sqs_queue, num_messages, delete=False)
+    assert len(messages) == num_messages
+
+
+def test_delete_concurrent(sqs_queue):
+    num_messages = 35
+    sqs = aws_sqs_batchlib.create_sqs_client()
+    for i in range(num_messages):
+        sqs.send_message(QueueUrl=sqs_queue, MessageBody=str(i))
+
+    messages = read_messages(sqs_queue, num_messages, delete=False)
+    resp = aws_sqs_batchlib.delete_message_batch(
+        QueueUrl=sqs_queue,
+        Entries=[
+            {"Id": msg["MessageId"], "ReceiptHandle": msg["ReceiptHandle"]}
+            for msg in messages
+        ],
+        max_workers=3,
+    )
+
+    assert not resp["Failed"]
+    assert [res["Id"] for res in resp["Successful"]] == [
+        msg["MessageId"] for msg in messages
+    ]
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_change_message_visibility(sqs_queue, max_workers):
+    num_messages = 25
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue,
+        Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(num_messages)],
+    )
+
+    messages = read_messages(sqs_queue, num_messages, delete=False)
+    resp = aws_sqs_batchlib.change_message_visibility_batch(
+        QueueUrl=sqs_queue,
+        Entries=[
+            {
+                "Id": f"{i}",
+                "ReceiptHandle": msg["ReceiptHandle"],
+                "VisibilityTimeout": 0,
+            }
+            for i, msg in enumerate(messages)
+        ],
+        max_workers=max_workers,
+    )
+
+    assert not resp["Failed"]
+    assert [res["Id"] for res in resp["Successful"]] == [
+        str(i) for i in range(num_messages)
+    ]
+
+    # Released messages are visible again
+    messages = read_messages(sqs_queue, num_messages, delete=False)
+    assert len(messages) == num_messages
+
+
+def test_change_message_visibility_client_retry_failures():
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.change_message_visibility_batch.side_effect = [
+        {
+            "Successful": [{"Id": f"{i}"} for i in range(2, 10)],
+            "Failed": [
+                {
+                    "Id": "0",
+                    "SenderFault": True,
+                    "Code": "ReceiptHandleIsInvalid",
+                    "Message": "ReceiptHandleIsInvalid",
+                },
+                {
+                    "Id": "1",
+                    "SenderFault": False,
+                    "Code": "InternalFailure",
+                    "Message": "InternalFailure",
+                },
+            ],
+        },
+        {"Successful": [{"Id": "1"}, {"Id": "10"}]},
+    ]
+
+    resp = aws_sqs_batchlib.change_message_visibility_batch(
+        QueueUrl="queue",
+        Entries=[
+            {"Id": f"{i}", "ReceiptHandle": f"{i}", "VisibilityTimeout": 0}
+            for i in range(11)
+        ],
+        sqs_client=client_mock,
+    )
+
+    assert [res["Id"] for res in resp["Successful"]] == [
+        *(str(i) for i in range(2, 10)),
+        "1",
+        "10",
+    ]
+    assert [res["Id"] for res in resp["Failed"]] == ["0"]
+    retried = client_mock.change_message_visibility_batch.call_args_list[1]
+    assert [entry["Id"] for entry in retried.kwargs["Entries"]] == ["1", "10"]
+
+
+def test_send_concurrent_retry_failures():
+    attempts = collections.Counter()
+
+    def send_message_batch(QueueUrl, Entries):  # pylint: disable=invalid-name
+        successful, failed = [], []
+        for entry in Entries:
+            attempts[entry["Id"]] += 1
+            if entry["Id"] == "13" and attempts[entry["Id"]] == 1:
+                failed.append(
+                    {
+                        "Id": entry["Id"],
+                        "SenderFault": False,
+                        "Code": "InternalFailure",
+                        "Message": "InternalFailure",
+                    }
+                )
+            elif entry["Id"] == "27":
+                failed.append(
+                    {
+                        "Id": entry["Id"],
+                        "SenderFault": True,
+                        "Code": "InvalidMessageContents",
+                        "Message": "InvalidMessageContents",
+                    }
+                )
+            else:
+                successful.append({"Id": entry["Id"]})
+        return {"Successful": successful, "Failed": failed}
+
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.send_message_batch.side_effect = send_message_batch
+
+    resp = aws_sqs_batchlib.send_message_batch(
+        QueueUrl="queue",
+        Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(50)],
+        sqs_client=client_mock,
+        max_workers=4,
+    )
+
+    assert sorted(res["Id"] for res in resp["Successful"]) == sorted(
+        str(i) for i in range(50) if i != 27
+    )
+    assert [res["Id"] for res in resp["Failed"]] == ["27"]
+    assert attempts["13"] == 2
+
+
+class _FifoRecorder:
+    """Fake send_message_batch() recording the order of sent messages per
+    message group and the message groups in flight."""
+
+    def __init__(self, fail_groups=(), fail_position=-1):
+        self.lock = threading.Lock()
+        self.inflight = collections.Counter()
+        self.overlapping = []
+        self.max_inflight = 0
+        self.sent = collections.defaultdict(list)
+        # Fail an entry (the last by default) of these message groups in their
+        # first request
+        self.fail_groups = set(fail_groups)
+        self.fail_position = fail_position
+        self.failed = []
+
+    def __call__(self, QueueUrl, Entries):  # pylint: disable=invalid-name
+        groups = {entry["MessageGroupId"] for entry in Entries}
+        with self.lock:
+            self.overlapping.extend(g for g in groups if self.inflight[g])
+            self.inflight.update(groups)
+            self.max_inflight = max(self.max_inflight, sum(self.inflight.values()))
+        time.sleep(0.005)
+
+        successful, failed = [], []
+        with self.lock:
+            self.inflight.subtract(groups)
+            fail = {
+                [e for e in Entries if e["MessageGroupId"] == group][
+                    self.fail_position
+                ]["Id"]
+                for group in groups & self.fail_groups
+            }
+            self.fail_groups -= groups
+            for entry in Entries:
+                if entry["Id"] in fail:
+                    self.failed.append(int(entry["Id"]))
+                    failed.append(
+                        {
+                            "Id": entry["Id"],
+                            "SenderFault": False,
+                            "Code": "InternalFailure",
+                            "Message": "InternalFailure",
+                        }
+                    )
+                else:
+                    self.sent[entry["MessageGroupId"]].append(int(entry["Id"]))
+                    successful.append({"Id": entry["Id"]})
+        return {"Successful": successful, "Failed": failed}
+
+
+def _fifo_entries(num_groups, num_messages):
+    return [
+        {"Id": f"{i}", "MessageBody": f"{i}", "MessageGroupId": f"g{i % num_groups}"}
+        for i in range(num_messages)
+    ]
+
+
+def test_send_fifo_groups_concurrently():
+    recorder = _FifoRecorder()
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.send_message_batch.side_effect = recorder
+
+    resp = aws_sqs_batchlib.send_message_batch(
+        QueueUrl="queue",
+        Entries=_fifo_entries(30, 300),
+        sqs_client=client_mock,
+        max_workers=4,
+        fifo=True,
+    )
+
+    assert not resp["Failed"]
+    assert len(resp["Successful"]) == 300
+    assert not recorder.overlapping
+    assert recorder.max_inflight > 1
+    for group, ids in recorder.sent.items():
+        assert ids == sorted(ids), group
+
+
+def test_send_fifo_single_group_is_sequential():
+    recorder = _FifoRecorder()
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.send_message_batch.side_effect = recorder
+
+    resp = aws_sqs_batchlib.send_message_batch(
+        QueueUrl="queue",
+        Entries=_fifo_entries(1, 45),
+        sqs_client=client_mock,
+        max_workers=4,
+        fifo=True,
+    )
+
+    assert len(resp["Successful"]) == 45
+    assert recorder.sent["g0"] == list(range(45))
+    assert recorder.max_inflight == 1
+    assert client_mock.send_message_batch.call_count == 5
+
+
+def test_send_fifo_retries_in_group_order():
+    recorder = _FifoRecorder(fail_groups=["g0", "g1"])
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.send_message_batch.side_effect = recorder
+
+    resp = aws_sqs_batchlib.send_message_batch(
+        QueueUrl="queue",
+        Entries=_fifo_entries(3, 60),
+        sqs_client=client_mock,
+        max_workers=3,
+        retry_policy=aws_sqs_batchlib.RetryPolicy(base_delay=0.01),
+        fifo=True,
+    )
+
+    assert not resp["Failed"]
+    assert len(resp["Successful"]) == 60
+    assert not recorder.overlapping
+    assert len(recorder.failed) == 2
+    for group, ids in recorder.sent.items():
+        assert ids == sorted(ids), group
+
+
+def test_send_fifo_fails_retries_that_would_break_order():
+    recorder = _FifoRecorder(fail_groups=["g0"], fail_position=2)
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.send_message_batch.side_effect = recorder
+
+    resp = aws_sqs_batchlib.send_message_batch(
+        QueueUrl="queue",
+        Entries=_fifo_entries(1, 30),
+        sqs_client=client_mock,
+        max_workers=2,
+        retry_policy=aws_sqs_batchlib.RetryPolicy(base_delay=0.01),
+        fifo=True,
+    )
+
+    # The middle entry failed after later entries of its group were sent
+    assert recorder.failed == [2]
+    assert [(f["Id"], f["Code"]) for f in resp["Failed"]] == [("2", "OutOfOrder")]
+    assert len(resp["Successful"]) == 29
+    assert recorder.sent["g0"] == [i for i in range(30) if i != 2]
+    assert client_mock.send_message_batch.call_count == 3
+
+
+def test_send_fifo_reads_entries_ahead_boundedly():
+    consumed = [0]
+
+    def entries():
+        for entry in _fifo_entries(1, 1000):
+            consumed[0] += 1
+            yield entry
+
+    def send_message_batch(QueueUrl, Entries):  # pylint: disable=invalid-name
+        # One message group: reads at most 10 chunks per worker ahead
+        assert consumed[0] <= int(Entries[0]["Id"]) + 10 * 2 * 10 + 10
+        return _send_message_batch_ok(QueueUrl, Entries)
+
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.send_message_batch.side_effect = send_message_batch
+
+    resp = aws_sqs_batchlib.send_message_batch(
+        QueueUrl="queue",
+        Entries=entries(),
+        sqs_client=client_mock,
+        max_workers=2,
+        fifo=True,
+    )
+
+    assert [res["Id"] for res in resp["Successful"]] == [str(i) for i in range(1000)]
+
+
+def test_send_fifo_queue_concurrently(fifo_queue):
+    num_messages = 60
+    resp = aws_sqs_batchlib.send_message_batch(
+        QueueUrl=fifo_queue,
+        Entries=[
+            {**entry, "MessageDeduplicationId": entry["Id"]}
+            for entry in _fifo_entries(4, num_messages)
+        ],
+        max_workers=4,
+        fifo=True,
+    )
+
+    assert not resp["Failed"]
+    messages = read_messages(fifo_queue, num_messages, delete=True)
+    bodies = collections.defaultdict(list)
+    for msg in messages:
+        bodies[int(msg["Body"]) % 4].append(int(msg["Body"]))
+    assert all(ids == sorted(ids) for ids in bodies.values())
+
+
+def _send_message_batch_ok(QueueUrl, Entries):  # pylint: disable=invalid-name
+    return {"Successful": [{"Id": entry["Id"]} for entry in Entries]}
+
+
+def test_send_limits_batch_payload_size():
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.send_message_batch.side_effect = _send_message_batch_ok
+
+    body = "a" * 300 * 1024
+    resp = aws_sqs_batchlib.send_message_batch(
+        QueueUrl="queue",
+        Entries=[{"Id": f"{i}", "MessageBody": body} for i in range(7)]
+        + [{"Id": f"{i}", "MessageBody": "a"} for i in range(7, 20)],
+        sqs_client=client_mock,
+    )
+
+    assert not resp["Failed"]
+    assert [res["Id"] for res in resp["Successful"]] == [str(i) for i in range(20)]
+    assert [
+        [entry["Id"] for entry in call.kwargs["Entries"]]
+        for call in client_mock.send_message_batch.call_args_list
+    ] == [
+        ["0", "1", "2"],
+        ["3", "4", "5"],
+        ["6", *(str(i) for i in range(7, 16))],
+        [str(i) for i in range(16, 20)],
+    ]
+
+
+def test_send_counts_attributes_to_payload_size():
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.send_message_batch.side_effect = _send_message_batch_ok
+
+    body = "a" * (aws_sqs_batchlib.MAX_PAYLOAD_SIZE // 2 - 16)
+    entries = [
+        {
+            "Id": f"{i}",
+            "MessageBody": body,
+            "MessageAttributes": {
+                "attr": {"DataType": "Binary", "BinaryValue": b"b" * 10}
+            },
+            "MessageSystemAttributes": {
+                "AWSTraceHeader": {"DataType": "String", "StringValue": "c" * 10}
+            },
+        }
+        for i in range(2)
+    ]
+    resp = aws_sqs_batchlib.send_message_batch(
+        QueueUrl="queue", Entries=entries, sqs_client=client_mock
+    )
+
+    assert not resp["Failed"]
+    assert len(resp["Successful"]) == 2
+    assert client_mock.send_message_batch.call_count == 2
+
+
+def test_send_fails_oversized_messages():
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.send_message_batch.side_effect = _send_message_batch_ok
+
+    resp = aws_sqs_batchlib.send_message_batch(
+        QueueUrl="queue",
+        Entries=[
+            {"Id": "0", "MessageBody": "a"},
+            {"Id": "1", "MessageBody": "a" * (aws_sqs_batchlib.MAX_PAYLOAD_SIZE + 1)},
+            {
+                "Id": "2",
+                "MessageBody": "ä" * (aws_sqs_batchlib.MAX_PAYLOAD_SIZE // 2 + 1),
+            },
+            {"Id": "3", "MessageBody": "a"},
+        ],
+        sqs_client=client_mock,
+    )
+
+    assert resp["Successful"] == [{"Id": "0"}, {"Id": "3"}]
+    assert [res["Id"] for res in resp["Failed"]] == ["1", "2"]
+    assert all(res["SenderFault"] for res in resp["Failed"])
+    assert all(res["Code"] == "InvalidParameterValue" for res in resp["Failed"])
+    assert client_mock.send_message_batch.call_count == 1
+
+
+def test_send_only_oversized_messages():
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+
+    resp = aws_sqs_batchlib.send_message_batch(
+        QueueUrl="queue",
+        Entries=[
+            {"Id": f"{i}", "MessageBody": "a" * (aws_sqs_batchlib.MAX_PAYLOAD_SIZE + 1)}
+            for i in range(12)
+        ],
+        sqs_client=client_mock,
+        max_workers=2,
+    )
+
+    assert not resp["Successful"]
+    assert len(resp["Failed"]) == 12
+    client_mock.send_message_batch.assert_not_called()
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_send_consumes_entries_lazily(max_workers):
+    consumed = [0]
+
+    def entries():
+        for i in range(95):
+            consumed[0] += 1
+            yield {"Id": f"{i}", "MessageBody": f"{i}"}
+
+    def send_message_batch(QueueUrl, Entries):  # pylint: disable=invalid-name
+        # Reads at most one chunk per worker and one entry ahead
+        assert consumed[0] <= int(Entries[0]["Id"]) + max_workers * 10 + 1
+        return _send_message_batch_ok(QueueUrl, Entries)
+
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.send_message_batch.side_effect = send_message_batch
+
+    resp = aws_sqs_batchlib.send_message_batch(
+        QueueUrl="queue",
+        Entries=entries(),
+        sqs_client=client_mock,
+        max_workers=max_workers,
+    )
+
+    assert not resp["Failed"]
+    assert [res["Id"] for res in resp["Successful"]] == [str(i) for i in range(95)]
+    assert client_mock.send_message_batch.call_count == 10
+
+
+def test_delete_generator_entries(sqs_queue):
+    num_messages = 25
+    sqs = aws_sqs_batchlib.create_sqs_client()
+    for i in range(num_messages):
+        sqs.send_message(QueueUrl=sqs_queue, MessageBody=str(i))
+
+    messages = read_messages(sqs_queue, num_messages, delete=False)
+    resp = aws_sqs_batchlib.delete_message_batch(
+        QueueUrl=sqs_queue,
+        Entries=(
+            {"Id": msg["MessageId"], "ReceiptHandle": msg["ReceiptHandle"]}
+            for msg in messages
+        ),
+    )
+
+    assert not resp["Failed"]
+    assert len(resp["Successful"]) == num_messages
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_iter_send_yields_per_request(max_workers):
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.send_message_batch.side_effect = _send_message_batch_ok
+
+    results = list(
+        aws_sqs_batchlib.iter_send_message_batch(
+            QueueUrl="queue",
+            Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(25)],
+            sqs_client=client_mock,
+            max_workers=max_workers,
+        )
+    )
+
+    assert [[res["Id"] for res in r["Successful"]] for r in results] == [
+        [str(i) for i in range(0, 10)],
+        [str(i) for i in range(10, 20)],
+        [str(i) for i in range(20, 25)],
+    ]
+    assert all(not r["Failed"] for r in results)
+
+
+def test_iter_send_yields_before_all_entries_are_sent():
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.send_message_batch.side_effect = _send_message_batch_ok
+
+    results = aws_sqs_batchlib.iter_send_message_batch(
+        QueueUrl="queue",
+        Entries=({"Id": f"{i}", "MessageBody": f"{i}"} for i in range(100)),
+        sqs_client=client_mock,
+    )
+
+    assert len(next(results)["Successful"]) == 10
+    assert client_mock.send_message_batch.call_count == 1
+
+    results.close()
+    assert client_mock.send_message_batch.call_count == 1
+
+
+def test_iter_send_reports_retried_entries_once():
+    failure = {"SenderFault": False, "Code": "InternalFailure", "Message": "x"}
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.send_message_batch.side_effect = [
+        {"Failed": [{"Id": "0", **failure}, {"Id": "1", **failure}]},
+        {"Successful": [{"Id": "0"}], "Failed": [{"Id": "1", **failure}]},
+        {"Successful": [{"Id": "1"}]},
+    ]
+
+    results = list(
+        aws_sqs_batchlib.iter_send_message_batch(
+            QueueUrl="queue",
+            Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(2)],
+            sqs_client=client_mock,
+            retry_policy=aws_sqs_batchlib.RetryPolicy(base_delay=0),
+        )
+    )
+
+    # The first request has only retried entries and yields nothing
+    assert results == [
+        {"Successful": [{"Id": "0"}], "Failed": []},
+        {"Successful": [{"Id": "1"}], "Failed": []},
+    ]
+    assert client_mock.send_message_batch.call_count == 3
+
+
+def test_iter_send_yields_oversized_failures():
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.send_message_batch.side_effect = _send_message_batch_ok
+
+    results = list(
+        aws_sqs_batchlib.iter_send_message_batch(
+            QueueUrl="queue",
+            Entries=[
+                {"Id": "0", "MessageBody": "a"},
+                {
+                    "Id": "1",
+                    "MessageBody": "a" * (aws_sqs_batchlib.MAX_PAYLOAD_SIZE + 1),
+                },
+            ],
+            sqs_client=client_mock,
+        )
+    )
+
+    assert [(len(r["Successful"]), len(r["Failed"])) for r in results] == [
+        (0, 1),
+        (1, 0),
+    ]
+
+
+def test_iter_delete_and_change_visibility(sqs_queue):
+    num_messages = 25
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue,
+        Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(num_messages)],
+    )
+
+    messages = read_messages(sqs_queue, num_messages, delete=False)
+    results = list(
+        aws_sqs_batchlib.iter_change_message_visibility_batch(
+            QueueUrl=sqs_queue,
+            Entries=[
+                {
+                    "Id": f"{i}",
+                    "ReceiptHandle": msg["ReceiptHandle"],
+                    "VisibilityTimeout": 0,
+                }
+                for i, msg in enumerate(messages)
+            ],
+        )
+    )
+    assert [len(r["Successful"]) for r in results] == [10, 10, 5]
+
+    messages = read_messages(sqs_queue, num_messages, delete=False)
+    results = list(
+        aws_sqs_batchlib.iter_delete_message_batch(
+            QueueUrl=sqs_queue,
+            Entries=[
+                {"Id": f"{i}", "ReceiptHandle": msg["ReceiptHandle"]}
+                for i, msg in enumerate(messages)
+            ],
+            max_workers=2,
+        )
+    )
+    assert [len(r["Successful"]) for r in results] == [10, 10, 5]
+    sqs = aws_sqs_batchlib.create_sqs_client()
+    assert "Messages" not in sqs.receive_message(QueueUrl=sqs_queue)
+
+
+def test_iter_delete_notifies_codec_per_request():
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    client_mock.delete_message_batch.side_effect = lambda QueueUrl, Entries: {
+        "Successful": [{"Id": entry["Id"]} for entry in Entries]
+    }
+    codec = unittest.mock.Mock(spec=aws_sqs_batchlib.Codec)
+    codec.receipt_handle.side_effect = lambda receipt_handle: receipt_handle.upper()
+
+    results = aws_sqs_batchlib.iter_delete_message_batch(
+        QueueUrl="queue",
+        Entries=[{"Id": f"{i}", "ReceiptHandle": f"rh{i}"} for i in range(15)],
+        sqs_client=client_mock,
+        codec=codec,
+    )
+
+    next(results)
+    codec.deleted.assert_called_once_with([f"rh{i}" for i in range(10)])
+    assert client_mock.delete_message_batch.call_args.kwargs["Entries"][0] == {
+        "Id": "0",
+        "ReceiptHandle": "RH0",
+    }
+
+    next(results)
+    codec.deleted.assert_called_with([f"rh{i}" for i in range(10, 15)])
+
+
+def test_send_invalid_max_workers():
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs"))
+    with pytest.raises(ValueError):
+        aws_sqs_batchlib.send_message_batch(
+            QueueUrl="queue",
+            Entries=[{"Id": "1", "MessageBody": "1"}],
+            sqs_client=client_mock,
+            max_workers=0,
+        )
+
+
 def test_version():
     """Test that version is set correctly."""
     assert (
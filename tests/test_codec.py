@@ -0,0 +1,183 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring,redefined-outer-name
+import asyncio
+import base64
+import json
+import logging
+import zlib
+
+import pytest
+
+import aws_sqs_batchlib
+import aws_sqs_batchlib.aio
+from aws_sqs_batchlib.codec import ENCODING_ATTRIBUTE, CompressionCodec
+from aws_sqs_batchlib.testing import FakeSQSClient
+
+
+def _body(i):
+    return json.dumps({"id": i, "items": [{"name": f"item-{j}"} for j in range(50)]})
+
+
+def test_send_receive_compressed(sqs_queue):
+    codec = CompressionCodec(algorithm="zlib")
+    entries = [
+        {
+            "Id": f"{i}",
+            "MessageBody": _body(i),
+            "MessageAttributes": {"foo": {"DataType": "String", "StringValue": "x"}},
+        }
+        for i in range(15)
+    ]
+
+    res = aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue, Entries=entries, codec=codec
+    )
+    assert len(res["Successful"]) == 15
+
+    res = aws_sqs_batchlib.receive_message(
+        QueueUrl=sqs_queue,
+        MaxNumberOfMessages=15,
+        WaitTimeSeconds=1,
+        MessageAttributeNames=["foo"],
+        codec=codec,
+    )
+    messages = sorted(res["Messages"], key=lambda m: json.loads(m["Body"])["id"])
+    assert [m["Body"] for m in messages] == [_body(i) for i in range(15)]
+    for message in messages:
+        assert message["MessageAttributes"] == {
+            "foo": {"DataType": "String", "StringValue": "x"}
+        }
+
+
+def test_encode_tags_compressed_body():
+    codec = CompressionCodec(algorithm="zlib")
+    entry = codec.encode({"Id": "0", "MessageBody": _body(0)})
+
+    assert entry["MessageAttributes"] == {
+        ENCODING_ATTRIBUTE: {"DataType": "String", "StringValue": "zlib"}
+    }
+    assert len(entry["MessageBody"]) < len(_body(0)) / 3
+    assert zlib.decompress(base64.b64decode(entry["MessageBody"])).decode() == _body(0)
+
+
+def test_encode_skips_small_and_incompressible_bodies():
+    codec = CompressionCodec(algorithm="zlib", min_size=10)
+    small = {"Id": "0", "MessageBody": "a" * 9}
+    random_body = {
+        "Id": "1",
+        "MessageBody": base64.b64encode(bytes(range(256))).decode(),
+    }
+    full = {
+        "Id": "2",
+        "MessageBody": _body(0),
+        "MessageAttributes": {
+            f"a{i}": {"DataType": "String", "StringValue": "x"} for i in range(10)
+        },
+    }
+
+    assert codec.encode(small) is small
+    assert codec.encode(random_body) is random_body
+    assert codec.encode(full) is full
+
+
+def test_decode_passes_through_untagged_and_invalid_messages(caplog):
+    codec = CompressionCodec(algorithm="zlib")
+    plain = {"MessageId": "0", "Body": "hello"}
+    invalid = {
+        "MessageId": "1",
+        "Body": "not base64!",
+        "MessageAttributes": {
+            ENCODING_ATTRIBUTE: {"DataType": "String", "StringValue": "zlib"}
+        },
+    }
+    unknown = {
+        "MessageId": "2",
+        "Body": "aGVsbG8=",
+        "MessageAttributes": {
+            ENCODING_ATTRIBUTE: {"DataType": "String", "StringValue": "br"}
+        },
+    }
+
+    with caplog.at_level(logging.WARNING):
+        assert codec.decode(plain) is plain
+        assert codec.decode(invalid) is invalid
+        assert codec.decode(unknown) is unknown
+
+    assert "Failed to decode message 1 (zlib)" in caplog.text
+    assert "Failed to decode message 2 (br)" in caplog.text
+
+
+def test_receive_mixed_messages():
+    sqs = FakeSQSClient()
+    queue_url = sqs.create_queue(QueueName="test")["QueueUrl"]
+    codec = CompressionCodec(algorithm="zlib")
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=queue_url,
+        Entries=[{"Id": "0", "MessageBody": _body(0)}],
+        sqs_client=sqs,
+        codec=codec,
+    )
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=queue_url,
+        Entries=[{"Id": "0", "MessageBody": _body(1)}],
+        sqs_client=sqs,
+    )
+
+    raw = sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=2)["Messages"]
+    assert raw[0]["Body"] != _body(0)
+    assert raw[1]["Body"] == _body(1)
+    assert "MessageAttributes" not in codec.decode(raw[0])
+    assert [codec.decode(m)["Body"] for m in raw] == [_body(0), _body(1)]
+
+
+def test_aio_send_receive_compressed():
+    sqs = FakeSQSClient()
+    queue_url = sqs.create_queue(QueueName="test")["QueueUrl"]
+    codec = CompressionCodec(algorithm="zlib")
+
+    async def run():
+        await aws_sqs_batchlib.aio.send_message_batch(
+            QueueUrl=queue_url,
+            Entries=[{"Id": f"{i}", "MessageBody": _body(i)} for i in range(5)],
+            sqs_client=sqs,
+            codec=codec,
+        )
+        return await aws_sqs_batchlib.aio.receive_message(
+            QueueUrl=queue_url,
+            MaxNumberOfMessages=5,
+            WaitTimeSeconds=1,
+            sqs_client=sqs,
+            codec=codec,
+        )
+
+    res = asyncio.run(run())
+    assert sorted(m["Body"] for m in res["Messages"]) == sorted(
+        _body(i) for i in range(5)
+    )
+
+
+def test_producer_compresses_messages():
+    sqs = FakeSQSClient()
+    queue_url = sqs.create_queue(QueueName="test")["QueueUrl"]
+    codec = CompressionCodec(algorithm="zlib")
+
+    with aws_sqs_batchlib.Producer(queue_url, sqs_client=sqs, codec=codec) as producer:
+        producer.send(MessageBody=_body(0))
+
+    raw = sqs.receive_message(QueueUrl=queue_url)["Messages"][0]
+    assert ENCODING_ATTRIBUTE in raw["MessageAttributes"]
+    assert codec.decode(raw)["Body"] == _body(0)
+
+
+def test_zstd():
+    pytest.importorskip("zstandard")
+    codec = CompressionCodec(algorithm="zstd")
+    entry = codec.encode({"Id": "0", "MessageBody": _body(0)})
+
+    assert entry["MessageAttributes"][ENCODING_ATTRIBUTE]["StringValue"] == "zstd"
+    message = {"MessageId": "0", "Body": entry["MessageBody"], **entry}
+    assert codec.decode(message)["Body"] == _body(0)
+
+
+def test_invalid_algorithm():
+    with pytest.raises(ValueError):
+        CompressionCodec(algorithm="br")
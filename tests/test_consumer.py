@@ -0,0 +1,339 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring,redefined-outer-name
+import threading
+import time
+import unittest.mock
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import aws_sqs_batchlib
+
+
+def _queue_attributes(queue_url):
+    sqs = aws_sqs_batchlib.create_sqs_client()
+    attributes = sqs.get_queue_attributes(
+        QueueUrl=queue_url,
+        AttributeNames=[
+            "ApproximateNumberOfMessages",
+            "ApproximateNumberOfMessagesNotVisible",
+        ],
+    )["Attributes"]
+    return (
+        int(attributes["ApproximateNumberOfMessages"]),
+        int(attributes["ApproximateNumberOfMessagesNotVisible"]),
+    )
+
+
+def test_consumer(sqs_queue):
+    num_messages = 25
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue,
+        Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(num_messages)],
+    )
+
+    received = []
+
+    def handler(message):
+        received.append(message["Body"])
+        if len(received) == num_messages:
+            consumer.stop()
+        if message["Body"] == "13":
+            raise ValueError("failed to process message")
+
+    consumer = aws_sqs_batchlib.Consumer(
+        sqs_queue,
+        handler,
+        MaxNumberOfMessages=10,
+        WaitTimeSeconds=1,
+        VisibilityTimeout=30,
+    )
+    consumer.run()
+
+    assert sorted(received, key=int) == [str(i) for i in range(num_messages)]
+    # Failed message is left in the queue, others are deleted
+    assert _queue_attributes(sqs_queue) == (0, 1)
+
+
+def test_consumer_max_batches(sqs_queue):
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue,
+        Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(20)],
+    )
+
+    received = []
+    consumer = aws_sqs_batchlib.Consumer(
+        sqs_queue,
+        lambda message: received.append(message["Body"]),
+        MaxNumberOfMessages=5,
+    )
+    consumer.run(max_batches=2)
+
+    assert len(received) == 10
+
+
+def test_consumer_prefetches_next_batch():
+    receiving = threading.Event()
+    batches = iter(range(3))
+
+    def receive_message(**kwargs):
+        receiving.set()
+        batch = next(batches, None)
+        if batch is None:
+            return {}
+        return {
+            "Messages": [
+                {"MessageId": f"{batch}-{i}", "ReceiptHandle": f"{batch}-{i}"}
+                for i in range(kwargs["MaxNumberOfMessages"])
+            ]
+        }
+
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs", region_name="eu-north-1"))
+    client_mock.receive_message.side_effect = receive_message
+    client_mock.delete_message_batch.side_effect = lambda QueueUrl, Entries: {
+        "Successful": [{"Id": entry["Id"]} for entry in Entries]
+    }
+
+    prefetched = []
+
+    def handler(message):
+        if message["MessageId"] == "0-0":
+            receiving.clear()
+            # Next batch is received while the current batch is processed
+            prefetched.append(receiving.wait(timeout=5))
+
+    consumer = aws_sqs_batchlib.Consumer(
+        "queue", handler, sqs_client=client_mock, prefetch=1, MaxNumberOfMessages=3
+    )
+    consumer.run(max_batches=3)
+
+    assert prefetched == [True]
+    deleted = [
+        entry["ReceiptHandle"]
+        for call in client_mock.delete_message_batch.call_args_list
+        for entry in call.kwargs["Entries"]
+    ]
+    assert deleted == [f"{batch}-{i}" for batch in range(3) for i in range(3)]
+
+
+def test_consumer_receive_error():
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs", region_name="eu-north-1"))
+    client_mock.receive_message.side_effect = RuntimeError("boom")
+
+    consumer = aws_sqs_batchlib.Consumer("queue", print, sqs_client=client_mock)
+    with pytest.raises(RuntimeError):
+        consumer.run()
+
+
+def test_consumer_invalid_prefetch():
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs", region_name="eu-north-1"))
+    with pytest.raises(ValueError):
+        aws_sqs_batchlib.Consumer("queue", print, sqs_client=client_mock, prefetch=0)
+
+
+def test_consumer_invalid_wait_time():
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs", region_name="eu-north-1"))
+    with pytest.raises(ValueError):
+        aws_sqs_batchlib.Consumer(
+            "queue", print, sqs_client=client_mock, WaitTimeSeconds=0
+        )
+
+
+def test_consumer_releases_prefetched_messages(sqs_queue):
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue,
+        Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(20)],
+    )
+
+    received = []
+
+    def handler(message):
+        received.append(message["Body"])
+        if len(received) == 5:
+            consumer.stop()
+
+    consumer = aws_sqs_batchlib.Consumer(
+        sqs_queue,
+        handler,
+        prefetch=2,
+        MaxNumberOfMessages=5,
+        VisibilityTimeout=30,
+    )
+    consumer.run()
+
+    assert len(received) == 5
+    # Prefetched batches were made visible again instead of waiting for the
+    # visibility timeout to expire
+    assert _queue_attributes(sqs_queue) == (15, 0)
+
+
+def _batch_ok(QueueUrl, Entries):  # pylint: disable=invalid-name,unused-argument
+    return {"Successful": [{"Id": entry["Id"]} for entry in Entries]}
+
+
+def _fifo_client(batch):
+    batches = iter([batch])
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs", region_name="eu-north-1"))
+    client_mock.receive_message.side_effect = lambda **kwargs: {
+        "Messages": next(batches, [])
+    }
+    client_mock.delete_message_batch.side_effect = _batch_ok
+    client_mock.change_message_visibility_batch.side_effect = _batch_ok
+    return client_mock
+
+
+def _fifo_batch(num_groups, num_messages):
+    return [
+        {
+            "MessageId": f"g{i % num_groups}-{i // num_groups}",
+            "ReceiptHandle": f"g{i % num_groups}-{i // num_groups}",
+            "Body": f"{i}",
+            "Attributes": {"MessageGroupId": f"g{i % num_groups}"},
+        }
+        for i in range(num_messages)
+    ]
+
+
+def _handled(client_mock, method):
+    return [
+        entry["ReceiptHandle"]
+        for call in getattr(client_mock, method).call_args_list
+        for entry in call.kwargs["Entries"]
+    ]
+
+
+def test_consumer_fifo_processes_groups_concurrently():
+    client_mock = _fifo_client(_fifo_batch(4, 20))
+    lock = threading.Lock()
+    active, max_active = set(), [0]
+    processed = []
+
+    def handler(message):
+        group = message["Attributes"]["MessageGroupId"]
+        with lock:
+            assert group not in active
+            active.add(group)
+            max_active[0] = max(max_active[0], len(active))
+        time.sleep(0.01)
+        with lock:
+            active.remove(group)
+            processed.append(message["MessageId"])
+
+    consumer = aws_sqs_batchlib.Consumer(
+        "queue",
+        handler,
+        sqs_client=client_mock,
+        max_workers=4,
+        fifo=True,
+        MaxNumberOfMessages=20,
+    )
+    consumer.run(max_batches=1)
+
+    assert max_active[0] > 1
+    for group in range(4):
+        assert [m for m in processed if m.startswith(f"g{group}-")] == [
+            f"g{group}-{i}" for i in range(5)
+        ]
+    assert _handled(client_mock, "delete_message_batch") == [
+        m["ReceiptHandle"] for m in _fifo_batch(4, 20)
+    ]
+    assert client_mock.receive_message.call_args.kwargs[
+        "MessageSystemAttributeNames"
+    ] == ["MessageGroupId"]
+
+
+def test_consumer_fifo_releases_rest_of_failed_group():
+    client_mock = _fifo_client(_fifo_batch(3, 15))
+    processed = []
+
+    def handler(message):
+        if message["MessageId"] == "g1-2":
+            raise RuntimeError("boom")
+        processed.append(message["MessageId"])
+
+    consumer = aws_sqs_batchlib.Consumer(
+        "queue",
+        handler,
+        sqs_client=client_mock,
+        max_workers=2,
+        fifo=True,
+        MaxNumberOfMessages=15,
+    )
+    consumer.run(max_batches=1)
+
+    assert "g1-3" not in processed
+    deleted = _handled(client_mock, "delete_message_batch")
+    assert sorted(deleted) == sorted(
+        [f"g0-{i}" for i in range(5)] + [f"g2-{i}" for i in range(5)] + ["g1-0", "g1-1"]
+    )
+    # The failed message is left to its visibility timeout, the rest of the
+    # message group is released back to the queue
+    assert _handled(client_mock, "change_message_visibility_batch") == [
+        "g1-3",
+        "g1-4",
+    ]
+
+
+def test_consumer_processes_messages_concurrently():
+    client_mock = _fifo_client(_fifo_batch(1, 10))
+    lock = threading.Lock()
+    active, max_active = [0], [0]
+
+    def handler(message):  # pylint: disable=unused-argument
+        with lock:
+            active[0] += 1
+            max_active[0] = max(max_active[0], active[0])
+        time.sleep(0.01)
+        with lock:
+            active[0] -= 1
+
+    consumer = aws_sqs_batchlib.Consumer(
+        "queue",
+        handler,
+        sqs_client=client_mock,
+        max_workers=4,
+        MaxNumberOfMessages=10,
+    )
+    consumer.run(max_batches=1)
+
+    assert max_active[0] > 1
+    assert len(_handled(client_mock, "delete_message_batch")) == 10
+    assert "MessageSystemAttributeNames" not in (
+        client_mock.receive_message.call_args.kwargs
+    )
+
+
+@pytest.mark.usefixtures("aws_credentials")
+def test_consumer_fifo_queue():
+    with mock_aws():
+        sqs = aws_sqs_batchlib.create_sqs_client()
+        queue_url = sqs.create_queue(
+            QueueName="aws-sqs-batchlib-testqueue.fifo",
+            Attributes={"FifoQueue": "true", "ContentBasedDeduplication": "true"},
+        )["QueueUrl"]
+        aws_sqs_batchlib.send_message_batch(
+            QueueUrl=queue_url,
+            Entries=[
+                {"Id": f"{i}", "MessageBody": f"{i}", "MessageGroupId": f"g{i % 3}"}
+                for i in range(9)
+            ],
+        )
+
+        processed = []
+        consumer = aws_sqs_batchlib.Consumer(
+            queue_url,
+            lambda message: processed.append(
+                (message["Attributes"]["MessageGroupId"], int(message["Body"]))
+            ),
+            max_workers=3,
+            fifo=True,
+            MaxNumberOfMessages=9,
+            WaitTimeSeconds=1,
+        )
+        consumer.run(max_batches=1)
+
+        for group in range(3):
+            assert [i for g, i in processed if g == f"g{group}"] == [
+                i for i in range(9) if i % 3 == group
+            ]
+        assert _queue_attributes(queue_url) == (0, 0)
@@ -0,0 +1,272 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import asyncio
+import unittest.mock
+
+import boto3
+import pytest
+
+import aws_sqs_batchlib
+import aws_sqs_batchlib.aio
+from aws_sqs_batchlib.dedup import DuplicateFilter
+from aws_sqs_batchlib.testing import FakeSQSClient
+
+
+def _message(message_id, body="body", **kwargs):
+    return {
+        "MessageId": message_id,
+        "ReceiptHandle": f"rh-{message_id}",
+        "Body": body,
+        **kwargs,
+    }
+
+
+def test_filter_duplicates():
+    dedup = DuplicateFilter()
+    first = [_message("1"), _message("2"), _message("1")]
+
+    # Duplicates of in-flight messages are dropped but not deleted
+    assert dedup.filter(first) == ([_message("1"), _message("2")], [])
+    assert dedup.filter([_message("2")]) == ([], [])
+
+    dedup.processed([_message("1")])
+    dedup.discard([_message("2")])
+    assert dedup.filter([_message("1"), _message("2")]) == (
+        [_message("2")],
+        [_message("1")],
+    )
+
+
+def test_filter_is_bounded():
+    dedup = DuplicateFilter(max_size=2)
+    dedup.filter([_message("1"), _message("2")])
+    dedup.processed([_message("1")])
+    dedup.filter([_message("3")])
+
+    assert len(dedup) == 2
+    # Least recently updated key was forgotten
+    assert dedup.filter([_message("2")]) == ([_message("2")], [])
+
+
+def test_filter_keys_expire():
+    now = [1000.0]
+    dedup = DuplicateFilter(ttl=10)
+    with unittest.mock.patch("time.monotonic", lambda: now[0]):
+        dedup.filter([_message("1")])
+        dedup.processed([_message("1")])
+
+        now[0] += 9
+        assert dedup.filter([_message("1")]) == ([], [_message("1")])
+
+        now[0] += 2
+        assert dedup.filter([_message("1")]) == ([_message("1")], [])
+        assert len(dedup) == 1
+
+
+def test_filter_in_flight_keys_expire():
+    now = [1000.0]
+    dedup = DuplicateFilter(ttl=3600, visibility_timeout=30)
+    with unittest.mock.patch("time.monotonic", lambda: now[0]):
+        assert dedup.filter([_message("1")]) == ([_message("1")], [])
+        assert dedup.filter([_message("2")], visibility_timeout=5) == (
+            [_message("2")],
+            [],
+        )
+
+        now[0] += 6
+        # Messages that were neither processed nor discarded are received
+        # again once their visibility timeout has expired
+        assert dedup.filter([_message("1"), _message("2")]) == ([_message("2")], [])
+
+        now[0] += 25
+        assert dedup.filter([_message("1")]) == ([_message("1")], [])
+        assert len(dedup) == 2
+
+
+def test_filter_keys():
+    content = DuplicateFilter(key="MD5OfBody")
+    assert content.attribute_names == []
+    assert content.filter(
+        [_message("1", MD5OfBody="a"), _message("2", MD5OfBody="a")]
+    ) == ([_message("1", MD5OfBody="a")], [])
+
+    attribute = DuplicateFilter(key="OrderId")
+    assert attribute.attribute_names == ["OrderId"]
+    tagged = [
+        _message(f"{i}", MessageAttributes={"OrderId": {"StringValue": "x"}})
+        for i in range(2)
+    ]
+    untagged = [_message("3"), _message("4")]
+    assert attribute.filter(tagged + untagged) == ([tagged[0], *untagged], [])
+
+    function = DuplicateFilter(key=lambda message: message["Body"].lower())
+    assert function.filter([_message("1", "A"), _message("2", "a")]) == (
+        [_message("1", "A")],
+        [],
+    )
+
+
+def test_invalid_max_size():
+    with pytest.raises(ValueError):
+        DuplicateFilter(max_size=0)
+
+
+def _redeliver(sqs, queue_url, messages):
+    sqs.change_message_visibility_batch(
+        QueueUrl=queue_url,
+        Entries=[
+            {
+                "Id": str(i),
+                "ReceiptHandle": msg["ReceiptHandle"],
+                "VisibilityTimeout": 0,
+            }
+            for i, msg in enumerate(messages)
+        ],
+    )
+
+
+def test_receive_deletes_duplicates_of_processed_messages():
+    sqs = FakeSQSClient()
+    queue_url = sqs.create_queue(QueueName="test")["QueueUrl"]
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=queue_url,
+        Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(5)],
+        sqs_client=sqs,
+    )
+    dedup = DuplicateFilter()
+
+    messages = aws_sqs_batchlib.receive_message(
+        QueueUrl=queue_url, MaxNumberOfMessages=5, sqs_client=sqs, dedup=dedup
+    )["Messages"]
+    assert len(messages) == 5
+    dedup.processed(messages[:3])
+    dedup.discard(messages[3:])
+
+    # All messages are delivered again
+    _redeliver(sqs, queue_url, messages)
+    redelivered = aws_sqs_batchlib.receive_message(
+        QueueUrl=queue_url, MaxNumberOfMessages=5, sqs_client=sqs, dedup=dedup
+    )["Messages"]
+
+    assert [m["Body"] for m in redelivered] == ["3", "4"]
+    assert sqs.requests["DeleteMessageBatch"] == 1
+    assert sqs.get_queue_attributes(QueueUrl=queue_url)["Attributes"] == {
+        "ApproximateNumberOfMessages": "0",
+        "ApproximateNumberOfMessagesNotVisible": "2",
+    }
+
+
+def test_receive_returns_redelivery_of_unprocessed_message():
+    sqs = FakeSQSClient()
+    queue_url = sqs.create_queue(QueueName="test")["QueueUrl"]
+    sqs.send_message_batch(
+        QueueUrl=queue_url, Entries=[{"Id": "0", "MessageBody": "0"}]
+    )
+    dedup = DuplicateFilter()
+
+    def receive():
+        return aws_sqs_batchlib.receive_message(
+            QueueUrl=queue_url,
+            VisibilityTimeout=1,
+            WaitTimeSeconds=2,
+            sqs_client=sqs,
+            dedup=dedup,
+        )["Messages"]
+
+    # Neither processed nor discarded, e.g. the processing crashed
+    first = receive()
+    redelivered = receive()
+
+    assert [m["Body"] for m in redelivered] == ["0"]
+    assert redelivered[0]["MessageId"] == first[0]["MessageId"]
+
+
+def test_receive_requests_key_attribute():
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs", region_name="eu-north-1"))
+    client_mock.receive_message.return_value = {}
+
+    aws_sqs_batchlib.receive_message(
+        QueueUrl="queue",
+        MessageAttributeNames=["foo"],
+        sqs_client=client_mock,
+        dedup=DuplicateFilter(key="OrderId"),
+    )
+
+    assert client_mock.receive_message.call_args.kwargs["MessageAttributeNames"] == [
+        "foo",
+        "OrderId",
+    ]
+
+
+def test_aio_receive_deletes_duplicates():
+    sqs = FakeSQSClient()
+    queue_url = sqs.create_queue(QueueName="test")["QueueUrl"]
+    sqs.send_message_batch(
+        QueueUrl=queue_url, Entries=[{"Id": "0", "MessageBody": "0"}]
+    )
+    dedup = DuplicateFilter()
+
+    async def receive():
+        return (
+            await aws_sqs_batchlib.aio.receive_message(
+                QueueUrl=queue_url, sqs_client=sqs, dedup=dedup
+            )
+        )["Messages"]
+
+    messages = asyncio.run(receive())
+    dedup.processed(messages)
+    _redeliver(sqs, queue_url, messages)
+
+    assert not asyncio.run(receive())
+    assert sqs.requests["DeleteMessageBatch"] == 1
+
+
+def test_consumer_skips_duplicates():
+    batches = iter(
+        [
+            [_message("1"), _message("2"), _message("1")],
+            [_message("2"), _message("3")],
+        ]
+    )
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs", region_name="eu-north-1"))
+    client_mock.receive_message.side_effect = lambda **kwargs: {
+        "Messages": next(batches, [])
+    }
+    client_mock.delete_message_batch.side_effect = lambda QueueUrl, Entries: {
+        "Successful": [{"Id": entry["Id"]} for entry in Entries]
+    }
+
+    handled = []
+    consumer = aws_sqs_batchlib.Consumer(
+        "queue",
+        lambda message: handled.append(message["MessageId"]),
+        sqs_client=client_mock,
+        MaxNumberOfMessages=3,
+        dedup=DuplicateFilter(),
+    )
+    consumer.run(max_batches=2)
+
+    assert handled == ["1", "2", "3"]
+    deleted = [
+        entry["ReceiptHandle"]
+        for call in client_mock.delete_message_batch.call_args_list
+        for entry in call.kwargs["Entries"]
+    ]
+    # The duplicate of message 2 is deleted if it was received after message 2
+    # was processed, the next batch is received while processing
+    assert set(deleted) == {"rh-1", "rh-2", "rh-3"}
+
+
+def test_consumer_discards_failed_messages():
+    dedup = DuplicateFilter()
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs", region_name="eu-north-1"))
+    client_mock.receive_message.return_value = {"Messages": [_message("1")]}
+
+    def handler(message):
+        raise RuntimeError(message["MessageId"])
+
+    consumer = aws_sqs_batchlib.Consumer(
+        "queue", handler, sqs_client=client_mock, dedup=dedup
+    )
+    consumer.run(max_batches=1)
+
+    assert dedup.filter([_message("1")]) == ([_message("1")], [])
@@ -0,0 +1,182 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring,redefined-outer-name
+import time
+
+import pytest
+
+import aws_sqs_batchlib
+from aws_sqs_batchlib.heartbeat import VisibilityHeartbeat
+
+
+def test_heartbeat_extends_in_batches(batch_client_mock, batch_requests):
+    client_mock = batch_client_mock("change_message_visibility_batch")
+    messages = [{"ReceiptHandle": f"{i}"} for i in range(25)]
+
+    with VisibilityHeartbeat(
+        "queue", visibility_timeout=1, sqs_client=client_mock, margin=0.5
+    ) as heartbeat:
+        heartbeat.track(messages)
+        heartbeat.track([{"ReceiptHandle": "late"}], time.monotonic() + 0.1)
+        time.sleep(0.7)
+
+    assert batch_requests(client_mock.change_message_visibility_batch) == [
+        [f"{i}" for i in range(10)],
+        [f"{i}" for i in range(10, 20)],
+        [*(f"{i}" for i in range(20, 25)), "late"],
+    ]
+    for call in client_mock.change_message_visibility_batch.call_args_list:
+        assert all(entry["VisibilityTimeout"] == 1 for entry in call.kwargs["Entries"])
+
+
+def test_heartbeat_keeps_extending(batch_client_mock, batch_requests):
+    client_mock = batch_client_mock("change_message_visibility_batch")
+    with VisibilityHeartbeat(
+        "queue", visibility_timeout=1, sqs_client=client_mock, margin=0.5
+    ) as heartbeat:
+        heartbeat.track([{"ReceiptHandle": "1"}])
+        time.sleep(1.8)
+
+    assert batch_requests(client_mock.change_message_visibility_batch) == [
+        ["1"],
+        ["1"],
+        ["1"],
+    ]
+
+
+def test_heartbeat_untrack(batch_client_mock, batch_requests):
+    client_mock = batch_client_mock("change_message_visibility_batch")
+    with VisibilityHeartbeat(
+        "queue", visibility_timeout=1, sqs_client=client_mock, margin=0.5
+    ) as heartbeat:
+        heartbeat.track([{"ReceiptHandle": "1"}, {"ReceiptHandle": "2"}])
+        heartbeat.untrack(["1"])
+        assert len(heartbeat) == 1
+        time.sleep(0.7)
+
+    assert batch_requests(client_mock.change_message_visibility_batch) == [["2"]]
+
+
+def test_heartbeat_stops_tracking_failed_messages(batch_client_mock, batch_requests):
+    client_mock = batch_client_mock("change_message_visibility_batch", invalid={"1"})
+    with VisibilityHeartbeat(
+        "queue", visibility_timeout=1, sqs_client=client_mock, margin=0.5
+    ) as heartbeat:
+        heartbeat.track([{"ReceiptHandle": "1"}, {"ReceiptHandle": "2"}])
+        time.sleep(0.7)
+        assert len(heartbeat) == 1
+
+    assert batch_requests(client_mock.change_message_visibility_batch) == [["1", "2"]]
+
+
+def test_heartbeat_request_error(batch_client_mock, batch_requests):
+    client_mock = batch_client_mock("change_message_visibility_batch")
+    client_mock.change_message_visibility_batch.side_effect = [
+        RuntimeError("boom"),
+        {"Successful": [{"Id": "0"}]},
+    ]
+    with VisibilityHeartbeat(
+        "queue", visibility_timeout=2, sqs_client=client_mock, margin=1.5
+    ) as heartbeat:
+        heartbeat.track([{"ReceiptHandle": "1"}])
+        time.sleep(1.6)
+
+    assert batch_requests(client_mock.change_message_visibility_batch) == [
+        ["1"],
+        ["1"],
+    ]
+
+
+@pytest.mark.parametrize(["visibility_timeout", "margin"], [(0, None), (10, 10)])
+def test_heartbeat_invalid_arguments(visibility_timeout, margin, batch_client_mock):
+    with pytest.raises(ValueError):
+        VisibilityHeartbeat(
+            "queue",
+            visibility_timeout=visibility_timeout,
+            sqs_client=batch_client_mock("change_message_visibility_batch"),
+            margin=margin,
+        )
+
+
+def test_consumer_heartbeat(sqs_queue, monkeypatch):
+    sqs = aws_sqs_batchlib.create_sqs_client()
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue,
+        Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(5)],
+        sqs_client=sqs,
+    )
+
+    receive_message = sqs.receive_message
+    receives = []
+
+    def record_receive_message(**kwargs):
+        res = receive_message(**kwargs)
+        receives.extend(msg["MessageId"] for msg in res.get("Messages", []))
+        return res
+
+    monkeypatch.setattr(sqs, "receive_message", record_receive_message)
+
+    received = []
+
+    def handler(message):
+        received.append(message["Body"])
+        if len(received) == 1:
+            # Longer than the visibility timeout of the messages in the batch
+            time.sleep(2.5)
+        if len(received) == 5:
+            consumer.stop()
+
+    consumer = aws_sqs_batchlib.Consumer(
+        sqs_queue,
+        handler,
+        sqs_client=sqs,
+        heartbeat=True,
+        MaxNumberOfMessages=5,
+        VisibilityTimeout=2,
+    )
+    consumer.run()
+
+    assert sorted(received) == [f"{i}" for i in range(5)]
+    # No message became visible again and got received for the second time
+    # while the first message was processed
+    assert len(receives) == 5
+
+
+def test_consumer_heartbeat_until_deleted(sqs_queue, monkeypatch):
+    sqs = aws_sqs_batchlib.create_sqs_client()
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue,
+        Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(5)],
+        sqs_client=sqs,
+    )
+
+    delete_message_batch = sqs.delete_message_batch
+    tracked = []
+
+    def record_delete_message_batch(**kwargs):
+        tracked.append(len(consumer.heartbeat))
+        return delete_message_batch(**kwargs)
+
+    monkeypatch.setattr(sqs, "delete_message_batch", record_delete_message_batch)
+
+    consumer = aws_sqs_batchlib.Consumer(
+        sqs_queue,
+        lambda message: None,
+        sqs_client=sqs,
+        heartbeat=True,
+        MaxNumberOfMessages=5,
+        VisibilityTimeout=2,
+    )
+    consumer.run(max_batches=1)
+
+    # Processed messages are tracked until they have been deleted
+    assert tracked == [5]
+    assert len(consumer.heartbeat) == 0
+
+
+def test_consumer_heartbeat_requires_visibility_timeout(batch_client_mock):
+    with pytest.raises(ValueError):
+        aws_sqs_batchlib.Consumer(
+            "queue",
+            print,
+            sqs_client=batch_client_mock("change_message_visibility_batch"),
+            heartbeat=True,
+        )
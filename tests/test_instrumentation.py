@@ -0,0 +1,175 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring,redefined-outer-name
+import asyncio
+import collections
+import unittest.mock
+
+import boto3
+import pyformance
+import pytest
+
+import aws_sqs_batchlib
+import aws_sqs_batchlib.aio
+from aws_sqs_batchlib.instrumentation import PyformanceInstrumentation
+
+
+class Recorder(aws_sqs_batchlib.Instrumentation):
+    def __init__(self):
+        self.requests = []
+        self.receives = []
+        self.failures = collections.Counter()
+        self.retries = 0
+
+    def request(self, operation, latency, size, error=None):
+        assert latency >= 0
+        self.requests.append((operation, size, error is not None))
+
+    def received(self, requested, received):
+        self.receives.append((requested, received))
+
+    def failed(self, operation, code, retryable):
+        self.failures[(operation, code, retryable)] += 1
+
+    def retried(self, operation, count, delay):
+        self.retries += count
+
+
+@pytest.fixture
+def recorder():
+    recorder = Recorder()
+    aws_sqs_batchlib.set_instrumentation(recorder)
+    yield recorder
+    aws_sqs_batchlib.set_instrumentation(None)
+
+
+def test_instrumentation_requests(sqs_queue, recorder):
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue,
+        Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(25)],
+    )
+    batch = aws_sqs_batchlib.receive_message(
+        QueueUrl=sqs_queue, MaxNumberOfMessages=25, WaitTimeSeconds=5
+    )
+    aws_sqs_batchlib.delete_message_batch(
+        QueueUrl=sqs_queue,
+        Entries=[
+            {"Id": f"{i}", "ReceiptHandle": msg["ReceiptHandle"]}
+            for i, msg in enumerate(batch["Messages"])
+        ],
+    )
+    aws_sqs_batchlib.receive_message(
+        QueueUrl=sqs_queue, MaxNumberOfMessages=5, WaitTimeSeconds=1
+    )
+
+    operations = [operation for operation, _, _ in recorder.requests]
+    assert operations.count("send_message_batch") == 3
+    assert operations.count("delete_message_batch") == 3
+    assert [
+        size for op, size, _ in recorder.requests if op == "send_message_batch"
+    ] == [
+        10,
+        10,
+        5,
+    ]
+    assert sum(received for _, received in recorder.receives) == 25
+    # Last receive from an empty queue
+    assert recorder.receives[-1] == (5, 0)
+
+
+def test_instrumentation_failures_and_retries(recorder):
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs", region_name="eu-north-1"))
+    client_mock.send_message_batch.__name__ = "send_message_batch"
+    client_mock.send_message_batch.side_effect = [
+        {
+            "Successful": [{"Id": f"{i}"} for i in range(2, 5)],
+            "Failed": [
+                {"Id": "0", "SenderFault": True, "Code": "InvalidMessageContents"},
+                {"Id": "1", "SenderFault": False, "Code": "InternalError"},
+            ],
+        },
+        {
+            "Failed": [{"Id": "1", "SenderFault": False, "Code": "InternalError"}],
+        },
+        RuntimeError("boom"),
+    ]
+
+    resp = aws_sqs_batchlib.send_message_batch(
+        QueueUrl="queue",
+        Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(5)],
+        sqs_client=client_mock,
+        retry_policy=aws_sqs_batchlib.RetryPolicy(max_attempts=2, base_delay=0),
+    )
+
+    assert [res["Code"] for res in resp["Failed"]] == [
+        "InvalidMessageContents",
+        "RetriesExhausted",
+    ]
+    assert recorder.failures == {
+        ("send_message_batch", "InvalidMessageContents", False): 1,
+        ("send_message_batch", "InternalError", True): 2,
+        ("send_message_batch", "RetriesExhausted", False): 1,
+    }
+    assert recorder.retries == 1
+    assert recorder.requests == [
+        ("send_message_batch", 5, False),
+        ("send_message_batch", 1, False),
+    ]
+
+
+def test_instrumentation_request_error(recorder):
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs", region_name="eu-north-1"))
+    client_mock.receive_message.__name__ = "receive_message"
+    client_mock.receive_message.side_effect = RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        aws_sqs_batchlib.receive_message(
+            QueueUrl="queue", MaxNumberOfMessages=5, sqs_client=client_mock
+        )
+
+    assert recorder.requests == [("receive_message", 5, True)]
+    assert not recorder.receives
+
+
+def test_instrumentation_async(sqs_queue, recorder):
+    asyncio.run(
+        aws_sqs_batchlib.aio.send_message_batch(
+            QueueUrl=sqs_queue,
+            Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(15)],
+        )
+    )
+    asyncio.run(
+        aws_sqs_batchlib.aio.receive_message(
+            QueueUrl=sqs_queue, MaxNumberOfMessages=15, WaitTimeSeconds=5
+        )
+    )
+
+    assert sorted(
+        size for op, size, _ in recorder.requests if op == "send_message_batch"
+    ) == [5, 10]
+    assert sum(received for _, received in recorder.receives) == 15
+
+
+def test_pyformance_instrumentation(sqs_queue):
+    registry = pyformance.MetricsRegistry()
+    aws_sqs_batchlib.set_instrumentation(PyformanceInstrumentation(registry))
+    try:
+        aws_sqs_batchlib.send_message_batch(
+            QueueUrl=sqs_queue,
+            Entries=[
+                {"Id": f"{i}", "MessageBody": f"{i}", "DelaySeconds": 1000 * (i == 3)}
+                for i in range(15)
+            ],
+        )
+        aws_sqs_batchlib.receive_message(
+            QueueUrl=sqs_queue, MaxNumberOfMessages=20, WaitTimeSeconds=1
+        )
+    finally:
+        aws_sqs_batchlib.set_instrumentation(None)
+
+    metrics = registry.dump_metrics()
+    assert metrics["sqs.send_message_batch.requests"]["count"] == 2
+    assert metrics["sqs.send_message_batch.batch_size"]["avg"] == 7.5
+    assert metrics["sqs.send_message_batch.failures.InvalidParameterValue"] == {
+        "count": 1
+    }
+    assert metrics["sqs.receive_message.fill"]["count"] >= 2
+    assert metrics["sqs.receive_message.empty"]["count"] >= 1
@@ -0,0 +1,191 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import threading
+import time
+import unittest.mock
+
+import boto3
+import botocore.exceptions
+import pytest
+
+import aws_sqs_batchlib
+from aws_sqs_batchlib.limiter import AdaptiveLimiter
+
+
+def _throttling_error(code="ThrottlingException"):
+    return botocore.exceptions.ClientError(
+        {"Error": {"Code": code, "Message": "Rate exceeded"}}, "SendMessageBatch"
+    )
+
+
+def test_limiter_additive_increase():
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=4)
+    for _ in range(5):
+        assert limiter.acquire(blocking=False)
+        limiter.release(time.monotonic())
+
+    # 2 -> 2.5 -> 2.9 -> 3.24 -> 3.55 -> 3.83
+    assert limiter.limit == 3
+
+    for _ in range(10):
+        assert limiter.acquire(blocking=False)
+        limiter.release(time.monotonic())
+
+    assert limiter.limit == 4
+
+
+def test_limiter_multiplicative_decrease_once_per_window():
+    limiter = AdaptiveLimiter(initial_limit=16, max_limit=16)
+    started = time.monotonic()
+    for _ in range(4):
+        assert limiter.acquire(blocking=False)
+
+    # Requests started before the first decrease do not decrease the limit
+    # again
+    for _ in range(4):
+        limiter.release(started, throttled=True)
+    assert limiter.limit == 8
+
+    assert limiter.acquire(blocking=False)
+    limiter.release(time.monotonic(), throttled=True)
+    assert limiter.limit == 4
+
+
+def test_limiter_unhealthy_latency_holds_limit():
+    limiter = AdaptiveLimiter(initial_limit=2)
+    limiter.acquire()
+    limiter.release(time.monotonic(), latency=0.1)
+    assert limiter.limit == 2  # 2.5
+
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release(time.monotonic(), latency=0.5)
+    assert limiter.limit == 2
+
+    limiter.acquire()
+    limiter.release(time.monotonic(), latency=0.1, succeeded=False)
+    assert limiter.limit == 2
+
+
+def test_limiter_acquire_blocks_at_limit():
+    limiter = AdaptiveLimiter(initial_limit=1)
+    assert limiter.acquire()
+    assert not limiter.acquire(blocking=False)
+    assert not limiter.acquire(timeout=0.01)
+    assert limiter.inflight == 1
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"min_limit": 0},
+        {"initial_limit": 5, "max_limit": 4},
+        {"backoff": 1},
+    ],
+)
+def test_limiter_invalid_arguments(kwargs):
+    with pytest.raises(ValueError):
+        AdaptiveLimiter(**kwargs)
+
+
+def test_send_limiter_finds_throttling_ceiling():
+    ceiling = 4
+    inflight = [0]
+    lock = threading.Lock()
+
+    def send_message_batch(QueueUrl, Entries):  # pylint: disable=invalid-name
+        with lock:
+            inflight[0] += 1
+            throttled = inflight[0] > ceiling
+        try:
+            time.sleep(0.002)
+            if throttled:
+                raise _throttling_error()
+            return {"Successful": [{"Id": entry["Id"]} for entry in Entries]}
+        finally:
+            with lock:
+                inflight[0] -= 1
+
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs", region_name="eu-north-1"))
+    client_mock.send_message_batch.side_effect = send_message_batch
+
+    limiter = AdaptiveLimiter(initial_limit=1, max_limit=20)
+    resp = aws_sqs_batchlib.send_message_batch(
+        QueueUrl="queue",
+        Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(2000)],
+        sqs_client=client_mock,
+        max_workers=20,
+        retry_policy=aws_sqs_batchlib.RetryPolicy(base_delay=0.001),
+        limiter=limiter,
+    )
+
+    assert not resp["Failed"]
+    assert sorted(int(res["Id"]) for res in resp["Successful"]) == list(range(2000))
+    assert 1 <= limiter.limit <= 2 * ceiling
+    assert limiter.inflight == 0
+
+
+def test_send_retries_throttled_requests():
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs", region_name="eu-north-1"))
+    client_mock.send_message_batch.side_effect = [
+        _throttling_error("AWS.SimpleQueueService.RequestThrottled"),
+        {"Successful": [{"Id": f"{i}"} for i in range(5)]},
+    ]
+
+    resp = aws_sqs_batchlib.send_message_batch(
+        QueueUrl="queue",
+        Entries=[{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(5)],
+        sqs_client=client_mock,
+        retry_policy=aws_sqs_batchlib.RetryPolicy(base_delay=0.001),
+    )
+
+    assert len(resp["Successful"]) == 5
+    assert client_mock.send_message_batch.call_count == 2
+
+
+def test_send_non_throttling_client_error_raises():
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs", region_name="eu-north-1"))
+    client_mock.send_message_batch.side_effect = _throttling_error("AccessDenied")
+
+    limiter = AdaptiveLimiter()
+    with pytest.raises(botocore.exceptions.ClientError):
+        aws_sqs_batchlib.send_message_batch(
+            QueueUrl="queue",
+            Entries=[{"Id": "1", "MessageBody": "1"}],
+            sqs_client=client_mock,
+            limiter=limiter,
+        )
+
+    assert limiter.inflight == 0
+    assert limiter.limit == 2
+
+
+def test_receive_limiter():
+    calls = []
+
+    def receive_message(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            raise _throttling_error()
+        return {
+            "Messages": [
+                {"MessageId": f"{i}"} for i in range(kwargs["MaxNumberOfMessages"])
+            ]
+        }
+
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs", region_name="eu-north-1"))
+    client_mock.receive_message.side_effect = receive_message
+
+    limiter = AdaptiveLimiter(initial_limit=4)
+    batch = aws_sqs_batchlib.receive_message(
+        QueueUrl="queue",
+        MaxNumberOfMessages=15,
+        WaitTimeSeconds=5,
+        sqs_client=client_mock,
+        limiter=limiter,
+    )
+
+    # Throttled request counted as an empty receive and decreased the limit
+    assert len(batch["Messages"]) == 15
+    assert len(calls) == 3
+    assert limiter.limit == 2
+    assert limiter.inflight == 0
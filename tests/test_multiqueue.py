@@ -0,0 +1,133 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring,redefined-outer-name
+import collections
+import time
+
+import pytest
+
+import aws_sqs_batchlib
+from aws_sqs_batchlib.multiqueue import _shares
+from aws_sqs_batchlib.testing import FakeSQSClient
+
+
+@pytest.fixture
+def sqs():
+    return FakeSQSClient()
+
+
+def _create_queues(sqs, *num_messages):
+    queue_urls = []
+    for i, count in enumerate(num_messages):
+        queue_url = sqs.create_queue(QueueName=f"queue-{i}")["QueueUrl"]
+        aws_sqs_batchlib.send_message_batch(
+            QueueUrl=queue_url,
+            Entries=[{"Id": f"{j}", "MessageBody": f"{i}-{j}"} for j in range(count)],
+            sqs_client=sqs,
+        )
+        queue_urls.append(queue_url)
+    return queue_urls
+
+
+def _counts(messages):
+    return collections.Counter(message["QueueUrl"] for message in messages)
+
+
+def _visible(sqs, queue_url):
+    attributes = sqs.get_queue_attributes(QueueUrl=queue_url)["Attributes"]
+    return (
+        int(attributes["ApproximateNumberOfMessages"]),
+        int(attributes["ApproximateNumberOfMessagesNotVisible"]),
+    )
+
+
+def test_receive_from_queues(sqs):
+    queue_urls = _create_queues(sqs, 5, 7, 3)
+
+    res = aws_sqs_batchlib.receive_message_from_queues(
+        QueueUrls=queue_urls,
+        MaxNumberOfMessages=100,
+        WaitTimeSeconds=1,
+        sqs_client=sqs,
+    )
+
+    messages = res["Messages"]
+    assert _counts(messages) == dict(zip(queue_urls, [5, 7, 3]))
+    for message in messages:
+        i = queue_urls.index(message["QueueUrl"])
+        assert message["Body"].startswith(f"{i}-")
+
+    results = aws_sqs_batchlib.delete_received_messages(messages, sqs_client=sqs)
+    assert {url: len(res["Successful"]) for url, res in results.items()} == {
+        queue_urls[0]: 5,
+        queue_urls[1]: 7,
+        queue_urls[2]: 3,
+    }
+    assert all(_visible(sqs, url) == (0, 0) for url in queue_urls)
+
+
+def test_receive_shares_batch_by_weight(sqs):
+    queue_urls = _create_queues(sqs, 100, 100)
+
+    res = aws_sqs_batchlib.receive_message_from_queues(
+        QueueUrls={queue_urls[0]: 3, queue_urls[1]: 1},
+        MaxNumberOfMessages=40,
+        WaitTimeSeconds=5,
+        sqs_client=sqs,
+    )
+
+    assert _counts(res["Messages"]) == {queue_urls[0]: 30, queue_urls[1]: 10}
+
+
+def test_receive_empty_queue_gives_up_share(sqs):
+    queue_urls = _create_queues(sqs, 0, 50)
+
+    started = time.monotonic()
+    res = aws_sqs_batchlib.receive_message_from_queues(
+        QueueUrls=queue_urls,
+        MaxNumberOfMessages=20,
+        WaitTimeSeconds=10,
+        sqs_client=sqs,
+    )
+
+    assert _counts(res["Messages"]) == {queue_urls[1]: 20}
+    # Batch is filled once the empty queue returns an empty response
+    assert time.monotonic() - started < 3
+
+
+@pytest.mark.parametrize(
+    ["num_messages", "expected"], [((5, 50), (5, 15)), ((30, 50), (20, 0))]
+)
+def test_receive_priority(sqs, num_messages, expected):
+    queue_urls = _create_queues(sqs, *num_messages)
+
+    res = aws_sqs_batchlib.receive_message_from_queues(
+        QueueUrls=queue_urls,
+        MaxNumberOfMessages=20,
+        WaitTimeSeconds=5,
+        sqs_client=sqs,
+        priority=True,
+    )
+
+    counts = _counts(res["Messages"])
+    assert (counts[queue_urls[0]], counts[queue_urls[1]]) == expected
+
+
+def test_receive_invalid_queue_urls(sqs):
+    with pytest.raises(ValueError):
+        aws_sqs_batchlib.receive_message_from_queues(QueueUrls=[], sqs_client=sqs)
+    with pytest.raises(ValueError):
+        aws_sqs_batchlib.receive_message_from_queues(QueueUrls="queue", sqs_client=sqs)
+    with pytest.raises(ValueError):
+        aws_sqs_batchlib.receive_message_from_queues(
+            QueueUrls={"queue": 0}, sqs_client=sqs
+        )
+    with pytest.raises(ValueError):
+        aws_sqs_batchlib.receive_message_from_queues(
+            QueueUrls=["queue"], QueueUrl="queue", sqs_client=sqs
+        )
+
+
+def test_shares():
+    assert _shares(40, [3, 1]) == [30, 10]
+    assert _shares(10, [1, 1, 1]) == [4, 3, 3]
+    assert _shares(1, [1, 1, 1]) == [1, 0, 0]
+    assert sum(_shares(100, [0.5, 2.25, 7])) == 100
@@ -0,0 +1,282 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring,redefined-outer-name
+import json
+import threading
+import unittest.mock
+
+import boto3
+import pytest
+
+import aws_sqs_batchlib
+from aws_sqs_batchlib.offload import (
+    PAYLOAD_SIZE_ATTRIBUTE,
+    POINTER_CLASS,
+    UPLOAD_FAILED,
+    S3OffloadCodec,
+)
+
+BUCKET = "aws-sqs-batchlib-testbucket"
+
+
+@pytest.fixture
+def sqs_queue(sqs_queue):
+    boto3.client("s3").create_bucket(
+        Bucket=BUCKET,
+        CreateBucketConfiguration={"LocationConstraint": "eu-north-1"},
+    )
+    return sqs_queue
+
+
+def _objects():
+    res = boto3.client("s3").list_objects_v2(Bucket=BUCKET)
+    return [obj["Key"] for obj in res.get("Contents", [])]
+
+
+def _entries(count, size):
+    return [
+        {
+            "Id": f"{i}",
+            "MessageBody": f"{i:03}" + "a" * size,
+            "MessageAttributes": {"foo": {"DataType": "String", "StringValue": "x"}},
+        }
+        for i in range(count)
+    ]
+
+
+def _receive(queue_url, count, **kwargs):
+    res = aws_sqs_batchlib.receive_message(
+        QueueUrl=queue_url, MaxNumberOfMessages=count, WaitTimeSeconds=1, **kwargs
+    )
+    return sorted(res["Messages"], key=lambda m: m["Body"])
+
+
+def _delete(queue_url, messages, **kwargs):
+    return aws_sqs_batchlib.delete_message_batch(
+        QueueUrl=queue_url,
+        Entries=[
+            {"Id": f"{i}", "ReceiptHandle": m["ReceiptHandle"]}
+            for i, m in enumerate(messages)
+        ],
+        **kwargs,
+    )
+
+
+def test_offload_roundtrip(sqs_queue):
+    codec = S3OffloadCodec(BUCKET, delete_objects=True)
+    entries = _entries(12, 200 * 1024) + [{"Id": "small", "MessageBody": "small"}]
+
+    res = aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue, Entries=entries, codec=codec
+    )
+    assert len(res["Successful"]) == 13
+    assert len(_objects()) == 12
+
+    messages = _receive(sqs_queue, 13, MessageAttributeNames=["foo"], codec=codec)
+    assert [m["Body"] for m in messages] == sorted(e["MessageBody"] for e in entries)
+    for message in messages[:12]:
+        assert message["MessageAttributes"] == {
+            "foo": {"DataType": "String", "StringValue": "x"}
+        }
+        assert message["ReceiptHandle"].startswith("-..s3BucketName..-")
+    assert "MessageAttributes" not in messages[12]
+
+    res = _delete(sqs_queue, messages, codec=codec)
+    assert len(res["Successful"]) == 13
+    assert not _objects()
+    assert not _receive(sqs_queue, 13)
+
+
+def test_pointer_format(sqs_queue):
+    codec = S3OffloadCodec(BUCKET, threshold=0, prefix="messages/")
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue,
+        Entries=[{"Id": "0", "MessageBody": "hello"}],
+        codec=codec,
+    )
+
+    message = _receive(sqs_queue, 1, MessageAttributeNames=["All"])[0]
+    key = _objects()[0]
+    assert key.startswith("messages/")
+    assert json.loads(message["Body"]) == [
+        POINTER_CLASS,
+        {"s3BucketName": BUCKET, "s3Key": key},
+    ]
+    assert message["MessageAttributes"][PAYLOAD_SIZE_ATTRIBUTE] == {
+        "DataType": "Number",
+        "StringValue": "5",
+    }
+
+    decoded = codec.decode(message)
+    assert decoded["Body"] == "hello"
+    assert decoded["ReceiptHandle"] == (
+        f"-..s3BucketName..-{BUCKET}-..s3BucketName..-"
+        f"-..s3Key..-{key}-..s3Key..-{message['ReceiptHandle']}"
+    )
+    assert codec.receipt_handle(decoded["ReceiptHandle"]) == message["ReceiptHandle"]
+
+
+def test_offload_messages_over_sqs_limit(sqs_queue):
+    codec = S3OffloadCodec(BUCKET)
+    body = "a" * (2 * 1024 * 1024)
+
+    res = aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue, Entries=[{"Id": "0", "MessageBody": body}], codec=codec
+    )
+    assert len(res["Successful"]) == 1
+
+    assert _receive(sqs_queue, 1, codec=codec)[0]["Body"] == body
+
+
+def test_failed_uploads_are_reported_per_entry(sqs_queue):
+    s3 = boto3.client("s3")
+    upload = s3.upload_fileobj
+    s3_client = unittest.mock.Mock(wraps=s3)
+    s3_client.upload_fileobj.side_effect = lambda fileobj, bucket, key: (
+        _raise(RuntimeError("s3 down"))
+        if fileobj.getvalue().startswith(b"014")
+        else upload(fileobj, bucket, key)
+    )
+    codec = S3OffloadCodec(BUCKET, s3_client=s3_client, threshold=0)
+
+    res = aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue, Entries=_entries(25, 10), codec=codec
+    )
+
+    assert len(res["Successful"]) == 24
+    assert res["Failed"] == [
+        {
+            "Id": "14",
+            "SenderFault": True,
+            "Code": UPLOAD_FAILED,
+            "Message": "Failed to upload message body to S3: s3 down",
+        }
+    ]
+    assert len(_receive(sqs_queue, 25, codec=codec)) == 24
+
+
+def _raise(exc):
+    raise exc
+
+
+def test_lazy_download(sqs_queue):
+    s3_client = unittest.mock.Mock(wraps=boto3.client("s3"))
+    codec = S3OffloadCodec(BUCKET, s3_client=s3_client, threshold=0, lazy=True)
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue, Entries=_entries(3, 10), codec=codec
+    )
+
+    messages = aws_sqs_batchlib.receive_message(
+        QueueUrl=sqs_queue, MaxNumberOfMessages=3, WaitTimeSeconds=1, codec=codec
+    )["Messages"]
+    assert s3_client.download_fileobj.call_count == 0
+    assert "Body" in messages[0]
+
+    bodies = sorted(m["Body"] for m in messages)
+    assert bodies == [e["MessageBody"] for e in _entries(3, 10)]
+    assert messages[0].get("Body") == messages[0]["Body"]
+    assert s3_client.download_fileobj.call_count == 3
+
+
+@pytest.mark.parametrize(
+    "copy",
+    [dict, lambda m: {**m}, lambda m: m.copy(), lambda m: dict(m.items())],
+)
+def test_lazy_download_copy(sqs_queue, copy):
+    codec = S3OffloadCodec(BUCKET, threshold=0, lazy=True)
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue, Entries=_entries(1, 10), codec=codec
+    )
+    (message,) = aws_sqs_batchlib.receive_message(
+        QueueUrl=sqs_queue, WaitTimeSeconds=1, codec=codec
+    )["Messages"]
+
+    copied = copy(message)
+    assert type(copied) is dict  # pylint: disable=unidiomatic-typecheck
+    assert copied["Body"] == _entries(1, 10)[0]["MessageBody"]
+    assert copied == message
+    assert "Body" in message.keys()
+    assert len(message) == len(copied)
+
+
+def test_lazy_download_json(sqs_queue):
+    codec = S3OffloadCodec(BUCKET, threshold=0, lazy=True)
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue, Entries=_entries(1, 10), codec=codec
+    )
+    (message,) = aws_sqs_batchlib.receive_message(
+        QueueUrl=sqs_queue, WaitTimeSeconds=1, codec=codec
+    )["Messages"]
+
+    assert json.loads(json.dumps(message))["Body"] == _entries(1, 10)[0]["MessageBody"]
+
+
+def test_change_visibility_with_codec(sqs_queue):
+    codec = S3OffloadCodec(BUCKET, threshold=0)
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue, Entries=_entries(2, 10), codec=codec
+    )
+    messages = _receive(sqs_queue, 2, codec=codec)
+
+    res = aws_sqs_batchlib.change_message_visibility_batch(
+        QueueUrl=sqs_queue,
+        Entries=[
+            {"Id": f"{i}", "ReceiptHandle": m["ReceiptHandle"], "VisibilityTimeout": 0}
+            for i, m in enumerate(messages)
+        ],
+        codec=codec,
+    )
+    assert len(res["Successful"]) == 2
+    assert len(_receive(sqs_queue, 2)) == 2
+
+
+def test_objects_kept_without_delete_objects(sqs_queue):
+    codec = S3OffloadCodec(BUCKET, threshold=0)
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue, Entries=_entries(2, 10), codec=codec
+    )
+    messages = _receive(sqs_queue, 2, codec=codec)
+
+    res = _delete(sqs_queue, messages, codec=codec)
+    assert len(res["Successful"]) == 2
+    assert len(_objects()) == 2
+
+
+def test_missing_object_is_passed_through(sqs_queue):
+    codec = S3OffloadCodec(BUCKET, threshold=0)
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue, Entries=_entries(1, 10), codec=codec
+    )
+    boto3.client("s3").delete_object(Bucket=BUCKET, Key=_objects()[0])
+
+    message = _receive(sqs_queue, 1, codec=codec)[0]
+    assert json.loads(message["Body"])[0] == POINTER_CLASS
+
+
+def test_consumer_with_offload_codec(sqs_queue):
+    codec = S3OffloadCodec(BUCKET, threshold=0, delete_objects=True)
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl=sqs_queue, Entries=_entries(5, 10), codec=codec
+    )
+
+    bodies = []
+    done = threading.Event()
+
+    def handler(message):
+        bodies.append(message["Body"])
+        if len(bodies) == 5:
+            done.set()
+
+    consumer = aws_sqs_batchlib.Consumer(
+        sqs_queue,
+        handler,
+        codec=codec,
+        MaxNumberOfMessages=5,
+        WaitTimeSeconds=1,
+    )
+    thread = threading.Thread(target=consumer.run)
+    thread.start()
+    assert done.wait(timeout=10)
+    consumer.stop()
+    thread.join()
+
+    assert sorted(bodies) == [e["MessageBody"] for e in _entries(5, 10)]
+    assert not _objects()
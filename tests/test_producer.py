@@ -0,0 +1,131 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring,redefined-outer-name
+import threading
+import time
+import unittest.mock
+
+import boto3
+import pytest
+
+import aws_sqs_batchlib
+
+
+def _client_mock(block=None):
+    def send_message_batch(QueueUrl, Entries):  # pylint: disable=invalid-name
+        if block is not None:
+            block.wait(timeout=5)
+        return {
+            "Successful": [
+                {"Id": entry["Id"], "MessageId": entry["MessageBody"]}
+                for entry in Entries
+            ]
+        }
+
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs", region_name="eu-north-1"))
+    client_mock.send_message_batch.side_effect = send_message_batch
+    return client_mock
+
+
+def _sent(client_mock):
+    return [
+        [entry["MessageBody"] for entry in call.kwargs["Entries"]]
+        for call in client_mock.send_message_batch.call_args_list
+    ]
+
+
+def test_producer_from_many_threads(sqs_queue):
+    futures = []
+    lock = threading.Lock()
+
+    def produce(thread):
+        for i in range(20):
+            future = producer.send(MessageBody=f"{thread}-{i}", DelaySeconds=0)
+            with lock:
+                futures.append(future)
+
+    with aws_sqs_batchlib.Producer(sqs_queue, linger=0.05) as producer:
+        threads = [threading.Thread(target=produce, args=(t,)) for t in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(futures) == 100
+    assert len({future.result()["MessageId"] for future in futures}) == 100
+
+    sqs = aws_sqs_batchlib.create_sqs_client()
+    attributes = sqs.get_queue_attributes(
+        QueueUrl=sqs_queue, AttributeNames=["ApproximateNumberOfMessages"]
+    )["Attributes"]
+    assert attributes["ApproximateNumberOfMessages"] == "100"
+
+
+def test_producer_merges_messages_into_full_batches():
+    client_mock = _client_mock()
+    with aws_sqs_batchlib.Producer(
+        "queue", sqs_client=client_mock, linger=60
+    ) as producer:
+        futures = [producer.send(MessageBody=f"{i}") for i in range(23)]
+        assert futures[0].result(timeout=5) == {"Id": "0", "MessageId": "0"}
+
+    assert [future.result()["MessageId"] for future in futures] == [
+        f"{i}" for i in range(23)
+    ]
+    batches = _sent(client_mock)
+    assert all(len(batch) == 10 for batch in batches[:-1])
+    assert len(batches[-1]) == 3
+
+
+def test_producer_limits_payload_size():
+    client_mock = _client_mock()
+    body = "x" * (aws_sqs_batchlib.MAX_PAYLOAD_SIZE // 3)
+    with aws_sqs_batchlib.Producer("queue", sqs_client=client_mock) as producer:
+        futures = [producer.send(MessageBody=body) for _ in range(4)]
+        oversized = producer.send(MessageBody=body * 4)
+
+    assert all(future.exception() is None for future in futures)
+    assert all(len(batch) <= 3 for batch in _sent(client_mock))
+    with pytest.raises(aws_sqs_batchlib.BatchEntryError) as excinfo:
+        oversized.result()
+    assert excinfo.value.failure["Code"] == "InvalidParameterValue"
+
+
+def test_producer_backpressure():
+    block = threading.Event()
+    client_mock = _client_mock(block)
+    producer = aws_sqs_batchlib.Producer(
+        "queue", sqs_client=client_mock, linger=0, max_pending=2
+    )
+
+    # First message is being sent (blocked), the next two fill the buffer
+    producer.send(MessageBody="0")
+    while not client_mock.send_message_batch.called:
+        time.sleep(0.001)
+    producer.send(MessageBody="1")
+    producer.send(MessageBody="2")
+
+    sent = threading.Event()
+    thread = threading.Thread(
+        target=lambda: (producer.send(MessageBody="3"), sent.set())
+    )
+    thread.start()
+    assert not sent.wait(timeout=0.1)
+
+    block.set()
+    assert sent.wait(timeout=5)
+    thread.join()
+    producer.close()
+
+    assert sorted(sum(_sent(client_mock), [])) == ["0", "1", "2", "3"]
+
+
+def test_producer_flush():
+    client_mock = _client_mock()
+    producer = aws_sqs_batchlib.Producer("queue", sqs_client=client_mock, linger=60)
+    future = producer.send(MessageBody="1", MessageAttributes={})
+    producer.flush()
+    assert future.done()
+    assert len(producer) == 0
+
+    producer.close()
+    with pytest.raises(RuntimeError):
+        producer.send(MessageBody="2")
@@ -0,0 +1,184 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import asyncio
+import collections
+import threading
+import time
+import unittest.mock
+
+import boto3
+import pytest
+
+import aws_sqs_batchlib
+import aws_sqs_batchlib.aio
+from aws_sqs_batchlib.retry import RETRIES_EXHAUSTED, RetryPolicy
+
+
+def _failing_client(fail_attempts, sleep=0.0):
+    """SQS client mock that fails entries with a retryable error.
+
+    fail_attempts maps entry Ids to the number of attempts that fail (-1 to
+    always fail).
+    """
+    attempts = collections.Counter()
+    calls = []
+    lock = threading.Lock()
+
+    def send_message_batch(QueueUrl, Entries):  # pylint: disable=invalid-name
+        time.sleep(sleep)
+        successful, failed = [], []
+        with lock:
+            calls.append((time.monotonic(), [entry["Id"] for entry in Entries]))
+            for entry in Entries:
+                attempts[entry["Id"]] += 1
+                limit = fail_attempts.get(entry["Id"], 0)
+                if limit < 0 or attempts[entry["Id"]] <= limit:
+                    failed.append(
+                        {
+                            "Id": entry["Id"],
+                            "SenderFault": False,
+                            "Code": "InternalFailure",
+                            "Message": "InternalFailure",
+                        }
+                    )
+                else:
+                    successful.append({"Id": entry["Id"]})
+        return {"Successful": successful, "Failed": failed}
+
+    client_mock = unittest.mock.Mock(spec=boto3.client("sqs", region_name="eu-north-1"))
+    client_mock.send_message_batch.side_effect = send_message_batch
+    return client_mock, attempts, calls
+
+
+class _FixedDelayPolicy(RetryPolicy):
+    """Retry policy without jitter for tests that depend on the delay."""
+
+    def __init__(self, delay):
+        super().__init__(base_delay=delay, max_delay=delay)
+
+    def delay(self, attempt):
+        return self.max_delay
+
+
+def _entries(count):
+    return [{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(count)]
+
+
+def test_retry_max_attempts():
+    client_mock, attempts, _ = _failing_client({"3": -1, "5": 2})
+
+    resp = aws_sqs_batchlib.send_message_batch(
+        QueueUrl="queue",
+        Entries=_entries(10),
+        sqs_client=client_mock,
+        retry_policy=RetryPolicy(max_attempts=4, base_delay=0.001),
+    )
+
+    assert sorted(res["Id"] for res in resp["Successful"]) == sorted(
+        str(i) for i in range(10) if i != 3
+    )
+    assert [res["Id"] for res in resp["Failed"]] == ["3"]
+    assert resp["Failed"][0]["Code"] == RETRIES_EXHAUSTED
+    assert resp["Failed"][0]["SenderFault"] is False
+    assert "InternalFailure" in resp["Failed"][0]["Message"]
+    assert attempts["3"] == 4
+    assert attempts["5"] == 3
+
+
+def test_retry_budget():
+    client_mock, attempts, _ = _failing_client({f"{i}": -1 for i in range(5)})
+
+    resp = aws_sqs_batchlib.send_message_batch(
+        QueueUrl="queue",
+        Entries=_entries(10),
+        sqs_client=client_mock,
+        retry_policy=RetryPolicy(base_delay=0.001, budget=7),
+    )
+
+    assert len(resp["Successful"]) == 5
+    assert sorted(res["Id"] for res in resp["Failed"]) == [f"{i}" for i in range(5)]
+    assert all(res["Code"] == RETRIES_EXHAUSTED for res in resp["Failed"])
+    assert sum(attempts.values()) == 10 + 7
+
+
+def test_retry_backoff_delay():
+    client_mock, _, calls = _failing_client({"0": 3})
+
+    aws_sqs_batchlib.send_message_batch(
+        QueueUrl="queue",
+        Entries=_entries(1),
+        sqs_client=client_mock,
+        retry_policy=RetryPolicy(base_delay=0.05, max_delay=0.1),
+    )
+
+    assert len(calls) == 4
+    with unittest.mock.patch("random.uniform", lambda a, b: b):
+        policy = RetryPolicy(base_delay=0.05, max_delay=0.1)
+        assert [policy.delay(attempt) for attempt in range(1, 5)] == [
+            0.05,
+            0.1,
+            0.1,
+            0.1,
+        ]
+
+
+def test_retry_sequential_keeps_order():
+    client_mock, _, calls = _failing_client({"2": 1})
+
+    resp = aws_sqs_batchlib.send_message_batch(
+        QueueUrl="queue",
+        Entries=_entries(25),
+        sqs_client=client_mock,
+        retry_policy=RetryPolicy(base_delay=0.02),
+    )
+
+    assert len(resp["Successful"]) == 25
+    # Retried entry is sent before the rest of the entries
+    assert [ids for _, ids in calls][:2] == [
+        [f"{i}" for i in range(10)],
+        ["2", *(f"{i}" for i in range(10, 19))],
+    ]
+
+
+def test_retry_concurrent_other_chunks_progress():
+    client_mock, _, calls = _failing_client({"0": 1}, sleep=0.01)
+
+    resp = aws_sqs_batchlib.send_message_batch(
+        QueueUrl="queue",
+        Entries=_entries(100),
+        sqs_client=client_mock,
+        max_workers=2,
+        retry_policy=_FixedDelayPolicy(0.2),
+    )
+
+    assert len(resp["Successful"]) == 100
+    retried_at = [i for i, (_, ids) in enumerate(calls) if "0" in ids][1]
+    # Other entries were sent while the retried entry waited
+    assert retried_at > 2
+
+
+def test_retry_async():
+    client_mock, attempts, _ = _failing_client({"1": -1, "4": 1})
+
+    resp = asyncio.run(
+        aws_sqs_batchlib.aio.send_message_batch(
+            QueueUrl="queue",
+            Entries=_entries(30),
+            sqs_client=client_mock,
+            max_workers=3,
+            retry_policy=RetryPolicy(max_attempts=3, base_delay=0.001),
+        )
+    )
+
+    assert len(resp["Successful"]) == 29
+    assert [(res["Id"], res["Code"]) for res in resp["Failed"]] == [
+        ("1", RETRIES_EXHAUSTED)
+    ]
+    assert attempts["1"] == 3
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{"max_attempts": 0}, {"base_delay": -1}, {"budget": -1}]
+)
+def test_retry_policy_invalid_arguments(kwargs):
+    with pytest.raises(ValueError):
+        RetryPolicy(**kwargs)
@@ -0,0 +1,266 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import time
+
+import botocore.exceptions
+import pytest
+
+import aws_sqs_batchlib
+from aws_sqs_batchlib.retry import RetryPolicy
+from aws_sqs_batchlib.testing import FakeSQSClient
+
+
+def _queue(sqs):
+    return sqs.create_queue(QueueName="test")["QueueUrl"]
+
+
+def _attributes(sqs, queue_url):
+    attributes = sqs.get_queue_attributes(QueueUrl=queue_url)["Attributes"]
+    return (
+        int(attributes["ApproximateNumberOfMessages"]),
+        int(attributes["ApproximateNumberOfMessagesNotVisible"]),
+    )
+
+
+def _entries(count):
+    return [{"Id": f"{i}", "MessageBody": f"{i}"} for i in range(count)]
+
+
+def test_send_receive_delete():
+    sqs = FakeSQSClient()
+    queue_url = _queue(sqs)
+
+    res = aws_sqs_batchlib.send_message_batch(
+        QueueUrl=queue_url, Entries=_entries(25), sqs_client=sqs
+    )
+    assert len(res["Successful"]) == 25
+    assert _attributes(sqs, queue_url) == (25, 0)
+
+    messages = aws_sqs_batchlib.receive_message(
+        QueueUrl=queue_url, MaxNumberOfMessages=25, WaitTimeSeconds=1, sqs_client=sqs
+    )["Messages"]
+    assert [m["Body"] for m in messages] == [f"{i}" for i in range(25)]
+    assert messages[0]["Attributes"]["ApproximateReceiveCount"] == "1"
+    assert _attributes(sqs, queue_url) == (0, 25)
+
+    res = aws_sqs_batchlib.delete_message_batch(
+        QueueUrl=queue_url,
+        Entries=[
+            {"Id": m["MessageId"], "ReceiptHandle": m["ReceiptHandle"]}
+            for m in messages
+        ],
+        sqs_client=sqs,
+    )
+    assert len(res["Successful"]) == 25
+    assert _attributes(sqs, queue_url) == (0, 0)
+    assert sqs.requests["SendMessageBatch"] == 3
+    assert sqs.requests["DeleteMessageBatch"] == 3
+
+
+def test_receive_waits_for_messages():
+    sqs = FakeSQSClient()
+    queue_url = _queue(sqs)
+
+    start = time.monotonic()
+    assert not sqs.receive_message(QueueUrl=queue_url, WaitTimeSeconds=0)
+    assert not sqs.receive_message(QueueUrl=queue_url, WaitTimeSeconds=1)
+    assert time.monotonic() - start >= 1
+
+    sqs.send_message_batch(
+        QueueUrl=queue_url,
+        Entries=[{"Id": "0", "MessageBody": "0", "DelaySeconds": 0.2}],
+    )
+    assert not sqs.receive_message(QueueUrl=queue_url)
+    res = sqs.receive_message(QueueUrl=queue_url, WaitTimeSeconds=1)
+    assert res["Messages"][0]["Body"] == "0"
+
+
+def test_visibility_timeout_redelivers_messages():
+    sqs = FakeSQSClient(visibility_timeout=0.1)
+    queue_url = _queue(sqs)
+    sqs.send_message_batch(QueueUrl=queue_url, Entries=_entries(1))
+
+    first = sqs.receive_message(QueueUrl=queue_url)["Messages"][0]
+    assert not sqs.receive_message(QueueUrl=queue_url)
+    second = sqs.receive_message(QueueUrl=queue_url, WaitTimeSeconds=1)["Messages"][0]
+
+    assert second["MessageId"] == first["MessageId"]
+    assert second["ReceiptHandle"] != first["ReceiptHandle"]
+    assert second["Attributes"]["ApproximateReceiveCount"] == "2"
+
+    # Stale receipt handles can still delete the message
+    res = sqs.delete_message_batch(
+        QueueUrl=queue_url,
+        Entries=[
+            {"Id": "0", "ReceiptHandle": first["ReceiptHandle"]},
+            {"Id": "1", "ReceiptHandle": second["ReceiptHandle"]},
+        ],
+    )
+    assert len(res["Successful"]) == 2
+    assert _attributes(sqs, queue_url) == (0, 0)
+
+
+def test_change_visibility():
+    sqs = FakeSQSClient()
+    queue_url = _queue(sqs)
+    sqs.send_message_batch(QueueUrl=queue_url, Entries=_entries(2))
+    messages = sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=2)[
+        "Messages"
+    ]
+
+    res = aws_sqs_batchlib.change_message_visibility_batch(
+        QueueUrl=queue_url,
+        Entries=[
+            {
+                "Id": "0",
+                "ReceiptHandle": messages[0]["ReceiptHandle"],
+                "VisibilityTimeout": 0,
+            },
+            {"Id": "1", "ReceiptHandle": "invalid", "VisibilityTimeout": 0},
+        ],
+        sqs_client=sqs,
+    )
+
+    assert [s["Id"] for s in res["Successful"]] == ["0"]
+    assert res["Failed"] == [
+        {
+            "Id": "1",
+            "SenderFault": True,
+            "Code": "ReceiptHandleIsInvalid",
+            "Message": "ReceiptHandleIsInvalid",
+        }
+    ]
+    assert _attributes(sqs, queue_url) == (1, 1)
+    res = sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=2)
+    assert [m["Body"] for m in res["Messages"]] == ["0"]
+
+
+def test_duplicate_delivery():
+    sqs = FakeSQSClient(duplicate_rate=1)
+    queue_url = _queue(sqs)
+    sqs.send_message_batch(QueueUrl=queue_url, Entries=_entries(1))
+
+    first = sqs.receive_message(QueueUrl=queue_url)["Messages"][0]
+    second = sqs.receive_message(QueueUrl=queue_url)["Messages"][0]
+
+    assert second["MessageId"] == first["MessageId"]
+    assert second["Attributes"]["ApproximateReceiveCount"] == "2"
+
+
+def test_failure_injection_is_retried():
+    sqs = FakeSQSClient(failure_rate=0.3, seed=1)
+    queue_url = _queue(sqs)
+
+    res = aws_sqs_batchlib.send_message_batch(
+        QueueUrl=queue_url,
+        Entries=_entries(100),
+        sqs_client=sqs,
+        retry_policy=RetryPolicy(base_delay=0),
+    )
+
+    assert len(res["Successful"]) == 100
+    assert not res["Failed"]
+    assert sqs.requests["SendMessageBatch"] > 10
+    assert _attributes(sqs, queue_url) == (100, 0)
+
+
+def test_throttling():
+    sqs = FakeSQSClient(throttle_rate=1)
+    queue_url = _queue(sqs)
+
+    with pytest.raises(botocore.exceptions.ClientError) as exc_info:
+        sqs.receive_message(QueueUrl=queue_url)
+    assert exc_info.value.response["Error"]["Code"] == "ThrottlingException"
+
+    sqs.throttle_rate = 0.3
+    res = aws_sqs_batchlib.send_message_batch(
+        QueueUrl=queue_url,
+        Entries=_entries(100),
+        sqs_client=sqs,
+        retry_policy=RetryPolicy(base_delay=0),
+    )
+    assert len(res["Successful"]) == 100
+    assert _attributes(sqs, queue_url) == (100, 0)
+
+
+def test_latency_percentiles():
+    sqs = FakeSQSClient(latency={0: 0.01, 50: 0.02, 100: 0.05}, seed=1)
+    queue_url = _queue(sqs)
+
+    latencies = []
+    for _ in range(10):
+        start = time.monotonic()
+        sqs.receive_message(QueueUrl=queue_url)
+        latencies.append(time.monotonic() - start)
+
+    assert min(latencies) >= 0.01
+    assert max(latencies) < 0.2
+
+
+def test_invalid_requests():
+    sqs = FakeSQSClient()
+    queue_url = _queue(sqs)
+
+    for entries, code in [
+        ([], "EmptyBatchRequest"),
+        (_entries(11), "TooManyEntriesInBatchRequest"),
+        (_entries(1) * 2, "BatchEntryIdsNotDistinct"),
+        ([{"Id": "0", "MessageBody": "a" * 1024 * 1025}], "BatchRequestTooLong"),
+    ]:
+        with pytest.raises(botocore.exceptions.ClientError) as exc_info:
+            sqs.send_message_batch(QueueUrl=queue_url, Entries=entries)
+        assert exc_info.value.response["Error"]["Code"] == code
+
+    with pytest.raises(botocore.exceptions.ClientError):
+        sqs.receive_message(QueueUrl=queue_url + "-missing")
+
+    with pytest.raises(ValueError):
+        FakeSQSClient(failure_rate=2)
+    with pytest.raises(ValueError):
+        FakeSQSClient(latency={101: 1})
+
+
+def test_concurrent_load_with_faults():
+    sqs = FakeSQSClient(
+        latency={50: 0.001, 99: 0.01},
+        throttle_rate=0.05,
+        failure_rate=0.05,
+        duplicate_rate=0.05,
+        seed=1,
+    )
+    queue_url = _queue(sqs)
+    retry_policy = RetryPolicy(base_delay=0.001, max_attempts=100)
+
+    res = aws_sqs_batchlib.send_message_batch(
+        QueueUrl=queue_url,
+        Entries=_entries(1000),
+        sqs_client=sqs,
+        max_workers=8,
+        retry_policy=retry_policy,
+    )
+    assert len(res["Successful"]) == 1000
+
+    received = {}
+    while len(received) < 1000:
+        messages = aws_sqs_batchlib.receive_message(
+            QueueUrl=queue_url,
+            MaxNumberOfMessages=1000,
+            WaitTimeSeconds=1,
+            sqs_client=sqs,
+            pollers=4,
+            limiter=aws_sqs_batchlib.AdaptiveLimiter(),
+        )["Messages"]
+        res = aws_sqs_batchlib.delete_message_batch(
+            QueueUrl=queue_url,
+            Entries=[
+                {"Id": f"{i}", "ReceiptHandle": m["ReceiptHandle"]}
+                for i, m in enumerate(messages)
+            ],
+            sqs_client=sqs,
+            max_workers=8,
+            retry_policy=retry_policy,
+        )
+        assert not res["Failed"]
+        received.update((m["MessageId"], m["Body"]) for m in messages)
+
+    assert sorted(received.values(), key=int) == [f"{i}" for i in range(1000)]
+    assert _attributes(sqs, queue_url) == (0, 0)